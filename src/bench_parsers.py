@@ -0,0 +1,82 @@
+# bench_parsers.py
+# Benchmark de backends de parseo sobre páginas guardadas.
+# Uso:
+#   python src/bench_parsers.py                      # páginas del caché de HTML
+#   python src/bench_parsers.py --dir fixtures/      # *.html sueltos (listado o ficha)
+import os, sys, time, glob, argparse
+from config import HTML_CACHE_DIR
+from parsers import PARSERS, get_parser
+
+
+def _cargar_paginas(cache_dir=None, directorio=None, limite=None):
+    """[(tipo, link, html)] desde un directorio de .html o desde el caché de HTML."""
+    paginas = []
+    if directorio:
+        for path in sorted(glob.glob(os.path.join(directorio, "*.htm*"))):
+            with open(path, encoding="utf-8") as fh:
+                html = fh.read()
+            tipo = "listado" if "ga-dimension-list" in html else "detalle"
+            paginas.append((tipo, path, html))
+    else:
+        from html_cache import HtmlCache, read_objeto
+        cache = HtmlCache(cache_dir)
+        for tipo in ("listado", "detalle"):
+            for link, path in cache.ultimas(tipo)[:limite]:
+                try: paginas.append((tipo, link, read_objeto(path)))
+                except (OSError, EOFError): pass
+        cache.close()
+    return paginas[:limite] if limite else paginas
+
+
+def _parsear(parser, paginas):
+    out = []
+    for tipo, link, html in paginas:
+        if tipo == "listado":
+            out.append((parser.ids(html), parser.paginas(html)))
+        else:
+            out.append(parser.detalle(html, link))
+    return out
+
+
+def benchmark(paginas, repeticiones=3):
+    """Páginas/s por backend y paridad de salida contra bs4 (el parseo original)."""
+    referencia = _parsear(get_parser("bs4"), paginas)
+    resultados = {}
+    for nombre in PARSERS:
+        parser = get_parser(nombre)
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            salida = _parsear(parser, paginas)
+            mejor = min(mejor, time.perf_counter() - t0)
+        difs = [paginas[i][1] for i, (a, b) in enumerate(zip(salida, referencia)) if a != b]
+        resultados[parser.nombre] = {"pag_s": len(paginas) / mejor if mejor else float("inf"),
+                                     "segundos": mejor, "diferencias": difs}
+    return resultados
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de parsers HTML (bs4 vs lxml)")
+    ap.add_argument("--dir", help="directorio con páginas .html guardadas")
+    ap.add_argument("--cache", default=HTML_CACHE_DIR, help="directorio del caché de HTML")
+    ap.add_argument("--limite", type=int, help="máximo de páginas")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    paginas = _cargar_paginas(args.cache, args.dir, args.limite)
+    if not paginas:
+        print("⚠️ No hay páginas para medir (usá --dir o llená el caché scrapeando)")
+        return 1
+    print(f"📄 {len(paginas)} páginas ({sum(t == 'detalle' for t, _, _ in paginas)} fichas)")
+    res = benchmark(paginas, args.repeticiones)
+    base = res["bs4"]["pag_s"]
+    for nombre, r in res.items():
+        paridad = "✅ idéntico" if not r["diferencias"] else f"❌ {len(r['diferencias'])} diferencias"
+        print(f"  {nombre:>5}: {r['pag_s']:8.1f} pág/s  (x{r['pag_s'] / base:.1f} vs bs4)  {paridad}")
+        for link in r["diferencias"][:5]:
+            print(f"         ↳ {link}")
+    return 0 if all(not r["diferencias"] for r in res.values()) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
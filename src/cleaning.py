@@ -5,138 +5,203 @@ pd.options.display.float_format = '{:,.0f}'.format
 
 import unicodedata
 import re
-
-def clean_data(df, cotizacion_usd=1350):  # ajustá el tipo de cambio aquí
-    df = df.copy()
+from functools import lru_cache
+from config import CLEANING_ENGINE
+
+CANON_CACHE = 65536   # barrios crudos distintos recordados entre llamadas
+
+def _strip_accents(s: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
+
+# Canonical (con acentos correctos)
+MAIN_BARRIOS_CANONICAL = {
+    "agronomia":"Agronomía","almagro":"Almagro","balvanera":"Balvanera","barracas":"Barracas",
+    "belgrano":"Belgrano","boedo":"Boedo","caballito":"Caballito","chacarita":"Chacarita",
+    "coghlan":"Coghlan","colegiales":"Colegiales","constitucion":"Constitución","flores":"Flores",
+    "floresta":"Floresta","la boca":"La Boca","liniers":"Liniers","mataderos":"Mataderos",
+    "monserrat":"Monserrat","montserrat":"Monserrat","monte castro":"Monte Castro",
+    "nunez":"Núñez","nuñez":"Núñez","palermo":"Palermo","parque avellaneda":"Parque Avellaneda",
+    "parque chacabuco":"Parque Chacabuco","parque chas":"Parque Chas","parque patricios":"Parque Patricios",
+    "paternal":"La Paternal","pompeya":"Nueva Pompeya","puerto madero":"Puerto Madero",
+    "recoleta":"Recoleta","retiro":"Retiro","saavedra":"Saavedra","san cristobal":"San Cristóbal",
+    "san nicolas":"San Nicolás","san telmo":"San Telmo","velez sarsfield":"Vélez Sarsfield",
+    "versalles":"Versalles","villa crespo":"Villa Crespo","villa devoto":"Villa Devoto",
+    "villa general mitre":"Villa General Mitre","villa luro":"Villa Luro","villa ortuzar":"Villa Ortúzar",
+    "villa ortúzar":"Villa Ortúzar","villa pueyrredon":"Villa Pueyrredón","villa pueyrredón":"Villa Pueyrredón",
+    "villa real":"Villa Real","villa riachuelo":"Villa Riachuelo","villa santa rita":"Villa Santa Rita",
+    "villa soldati":"Villa Soldati","villa urquiza":"Villa Urquiza"
+}
+
+# Subzonas → barrio principal (normalizado sin acentos y en minúsculas)
+SUBAREA_TO_BARRIO = {
+    # Belgrano
+    "belgrano r":"belgrano","belgrano c":"belgrano","belgrano chico":"belgrano","barrancas de belgrano":"belgrano",
+    # Palermo
+    "palermo chico":"palermo","palermo soho":"palermo","palermo hollywood":"palermo","palermo nuevo":"palermo",
+    "palermo botanico":"palermo","palermo botánico":"palermo","palermo viejo":"palermo",
+    # Caballito
+    "caballito norte":"caballito","caballito sur":"caballito","parque rivadavia":"caballito",
+    # Núñez / San Nicolás variantes
+    "nunez":"nunez","nuñez":"nunez","san nicolás":"san nicolas","san nicolas microcentro":"san nicolas",
+    # Otras subzonas comunes
+    "parque lezama":"san telmo","abasto":"balvanera","once":"balvanera",
+    "las cañitas":"palermo","barrio parque":"palermo",
+}
+
+_CAPITAL = {"capital federal","caba","ciudad autonoma de buenos aires","ciudad autónoma de buenos aires"}
+
+# Una sola alternación precompilada con todos los barrios (claves largas primero, para
+# que a igual posición gane el nombre completo). Entre varios matches gana el que
+# aparece antes en MAIN_BARRIOS_CANONICAL, igual que el loop original clave por clave.
+_RANGO_BARRIO = {k: i for i, k in enumerate(MAIN_BARRIOS_CANONICAL)}
+_RE_BARRIOS = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(MAIN_BARRIOS_CANONICAL, key=len, reverse=True)) + r")\b")
+
+def _buscar_barrio(texto):
+    claves = [m.group(0) for m in _RE_BARRIOS.finditer(texto)]
+    if not claves:
+        return None
+    return MAIN_BARRIOS_CANONICAL[min(claves, key=_RANGO_BARRIO.__getitem__)]
+
+@lru_cache(maxsize=CANON_CACHE)
+def _canonicalize(barrio_raw: str) -> str:
+    """Devuelve el barrio principal canónico (con acentos) a partir de una cadena cruda."""
+    if not barrio_raw or pd.isna(barrio_raw):
+        return np.nan
+
+    s = str(barrio_raw).strip()
+    # Partes tipo "Subzona, Barrio" o "Barrio, Capital Federal"
+    parts = [p.strip() for p in s.split(",") if p.strip()]
+    # Normalizamos a ascii-lower para matchear
+    parts_norm = [_strip_accents(p).lower() for p in parts]
+
+    # Si la última parte es un barrio válido, usamos esa
+    if parts_norm:
+        tail = parts_norm[-1]
+        if tail in MAIN_BARRIOS_CANONICAL:
+            return MAIN_BARRIOS_CANONICAL[tail]
+        # Si termina en "Capital Federal"/"CABA", usamos la primera parte (subzona → barrio)
+        if tail in _CAPITAL:
+            head = parts_norm[0]
+            # ¿Subzona conocida?
+            if head in SUBAREA_TO_BARRIO:
+                barrio_norm = SUBAREA_TO_BARRIO[head]
+                return MAIN_BARRIOS_CANONICAL.get(barrio_norm, barrio_raw)
+            # Si la subzona ya es un barrio exacto
+            if head in MAIN_BARRIOS_CANONICAL:
+                return MAIN_BARRIOS_CANONICAL[head]
+            # Heurística: si contiene el nombre de un barrio dentro
+            encontrado = _buscar_barrio(head)
+            if encontrado:
+                return encontrado
+            # Si no, devolvemos capitalizado de la primera parte
+            return parts[0].title()
+
+        # Si la última parte no es capital federal, puede ser “Subzona, Caballito”
+        # intentamos mapear subzona→barrio
+        if tail in SUBAREA_TO_BARRIO:
+            barrio_norm = SUBAREA_TO_BARRIO[tail]
+            return MAIN_BARRIOS_CANONICAL.get(barrio_norm, parts[-1].title())
+
+    # Sin coma: puede ser "Belgrano R" o "Caballito Norte"
+    only = parts_norm[0] if parts_norm else _strip_accents(s).lower()
+    if only in MAIN_BARRIOS_CANONICAL:
+        return MAIN_BARRIOS_CANONICAL[only]
+    if only in SUBAREA_TO_BARRIO:
+        barrio_norm = SUBAREA_TO_BARRIO[only]
+        return MAIN_BARRIOS_CANONICAL.get(barrio_norm, s.title())
+
+    # Heurística final: buscar un barrio dentro del texto
+    encontrado = _buscar_barrio(only)
+    if encontrado:
+        return encontrado
+
+    return s.title()
+
+# ---- Motor de parseo texto → número: patrones precompilados, una pasada por columna
+# y cada valor distinto se parsea una sola vez (los textos crudos se repiten muchísimo).
+_RE_NUM = re.compile(r"(\d+)")
+_RE_MONEDA = re.compile(r"^\s*(\D+)\s*\d")
+NUM_COLS = ["Dormitorios","Baños","Ambientes","Cocheras","Toilettes","Sup. cubierta","Antiguedad"]
+COORD_COLS = ["lat", "lon"]   # mapa del aviso (parsers); los datasets viejos no las tienen
+
+def _parse_numero(v):
+    # Equivale a astype(str).str.extract(r"(\d+)").astype(float)
+    m = _RE_NUM.search(str(v))
+    return (float(m.group(1)) if m else np.nan,)
+
+def _parse_expensas(v):
+    m = _RE_NUM.search(str(v))
+    return (float(m.group(1)) * 1000 if m else 0.0,)
+
+def _parse_precio(v):
+    s = str(v).replace(".", "")
+    m = _RE_MONEDA.search(s)
+    n = _RE_NUM.search(s)
+    return (float(n.group(1)) if n else np.nan, m.group(1).strip() if m else np.nan)
+
+def _parse_barrio(v):
+    # "Departamento en Palermo, Capital Federal" -> "Palermo, Capital Federal" + canónico
+    s = str(v).split("en")[-1].strip()
+    b = np.nan if s == "None" else s
+    return (b, _canonicalize(b))
+
+def _parsear_columna(serie, fn, n_out):
+    """Aplica `fn` (valor -> tupla de n_out) una vez por valor distinto y mapea a las filas.
+    Los faltantes (None/NaN) se parsean como None."""
+    codigos, unicos = pd.factorize(serie)
+    tablas = [np.empty(len(unicos) + 1, dtype=object) for _ in range(n_out)]
+    for i, u in enumerate(list(unicos) + [None]):  # el último slot es el del código -1
+        for k, r in enumerate(fn(u)):
+            tablas[k][i] = r
+    return [t[codigos] for t in tablas]
+
+def clean_data(df, cotizacion_usd=1350, copy=True, engine=CLEANING_ENGINE,
+               descartar_sin_total=True):  # ajustá el tipo de cambio aquí
+    """engine="polars" usa la implementación columnar equivalente (ver cleaning_polars.py).
+    descartar_sin_total=False conserva las filas sin precio ni expensas (Total 0), p. ej. para tasarlas."""
+    if engine == "polars":
+        from cleaning_polars import clean_data_polars
+        return clean_data_polars(df, cotizacion_usd, descartar_sin_total)
+    # copy=False: se modifica `df` in-place (micro-batches del modo streaming)
+    if copy: df = df.copy()
 
     # Normalizar columnas esperadas
-    for col in ["Dormitorios","Baños","Ambientes","Cocheras","Toilettes","Sup. cubierta","Antiguedad"]:
+    for col in NUM_COLS:
         if col not in df.columns: df[col] = None
 
     # Numéricas desde texto (e.g. "2 dormitorios" -> 2)
-    num_cols = ["Dormitorios","Baños","Ambientes","Cocheras","Toilettes","Sup. cubierta","Antiguedad"]
-    for c in num_cols:
-        df[c] = df[c].astype(str).str.extract(r"(\d+)").astype(float)
+    for c in NUM_COLS:
+        df[c] = _parsear_columna(df[c], _parse_numero, 1)[0].astype(float)
+
+    # Coordenadas: texto → float (sin mapa o ilegibles quedan NaN)
+    for c in COORD_COLS:
+        if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    # Barrio: extraer el barrio si viene con "en Barrio X"
-    df["Barrio"] = df["Barrio"].astype(str).str.split("en").str[-1].str.strip().replace("None", np.nan)
+    # Barrio: extraer el barrio si viene con "en Barrio X" (y su versión canónica, en la misma pasada)
+    barrio, canon = _parsear_columna(df["Barrio"], _parse_barrio, 2)
+    df["Barrio"] = pd.Series(barrio, index=df.index, dtype=object)
 
     # Expensas
-    df["expensas"] = df["expensas"].astype(str).str.extract(r"(\d+)").astype(float) * 1000
-    df["expensas"] = df["expensas"].fillna(0)
+    df["expensas"] = _parsear_columna(df["expensas"], _parse_expensas, 1)[0].astype(float)
 
     # Precio y moneda
-    df["precio"] = df["precio"].astype(str).str.replace(".", "", regex=False)
-    df["Moneda"] = df["precio"].str.extract(r"^\s*(\D+)\s*\d")
-    df["precio"] = df["precio"].str.extract(r"(\d+)").astype(float)
-    df["Moneda"] = df["Moneda"].astype(str).str.strip()
+    precio, moneda = _parsear_columna(df["precio"], _parse_precio, 2)
+    df["precio"] = precio.astype(float)
+    df["Moneda"] = pd.Series(moneda, index=df.index)
     df.loc[df["Moneda"].str.contains("USD", case=False, na=False), "precio"] *= cotizacion_usd
 
     # Cambiar año 2025
-    df["Antiguedad"] = pd.to_numeric(df["Antiguedad"], errors="coerce")
     df.loc[df["Antiguedad"].isin([2025, 2025.0]), "Antiguedad"] = 1.0
 
 
     # Totales
     df["Total"] = (df["precio"].fillna(0) + df["expensas"].fillna(0)).round(0)
 
-    def _strip_accents(s: str) -> str:
-        return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
-
-    # Canonical (con acentos correctos)
-    MAIN_BARRIOS_CANONICAL = {
-        "agronomia":"Agronomía","almagro":"Almagro","balvanera":"Balvanera","barracas":"Barracas",
-        "belgrano":"Belgrano","boedo":"Boedo","caballito":"Caballito","chacarita":"Chacarita",
-        "coghlan":"Coghlan","colegiales":"Colegiales","constitucion":"Constitución","flores":"Flores",
-        "floresta":"Floresta","la boca":"La Boca","liniers":"Liniers","mataderos":"Mataderos",
-        "monserrat":"Monserrat","montserrat":"Monserrat","monte castro":"Monte Castro",
-        "nunez":"Núñez","nuñez":"Núñez","palermo":"Palermo","parque avellaneda":"Parque Avellaneda",
-        "parque chacabuco":"Parque Chacabuco","parque chas":"Parque Chas","parque patricios":"Parque Patricios",
-        "paternal":"La Paternal","pompeya":"Nueva Pompeya","puerto madero":"Puerto Madero",
-        "recoleta":"Recoleta","retiro":"Retiro","saavedra":"Saavedra","san cristobal":"San Cristóbal",
-        "san nicolas":"San Nicolás","san telmo":"San Telmo","velez sarsfield":"Vélez Sarsfield",
-        "versalles":"Versalles","villa crespo":"Villa Crespo","villa devoto":"Villa Devoto",
-        "villa general mitre":"Villa General Mitre","villa luro":"Villa Luro","villa ortuzar":"Villa Ortúzar",
-        "villa ortúzar":"Villa Ortúzar","villa pueyrredon":"Villa Pueyrredón","villa pueyrredón":"Villa Pueyrredón",
-        "villa real":"Villa Real","villa riachuelo":"Villa Riachuelo","villa santa rita":"Villa Santa Rita",
-        "villa soldati":"Villa Soldati","villa urquiza":"Villa Urquiza"
-    }
-
-    # Subzonas → barrio principal (normalizado sin acentos y en minúsculas)
-    SUBAREA_TO_BARRIO = {
-        # Belgrano
-        "belgrano r":"belgrano","belgrano c":"belgrano","belgrano chico":"belgrano","barrancas de belgrano":"belgrano",
-        # Palermo
-        "palermo chico":"palermo","palermo soho":"palermo","palermo hollywood":"palermo","palermo nuevo":"palermo",
-        "palermo botanico":"palermo","palermo botánico":"palermo","palermo viejo":"palermo",
-        # Caballito
-        "caballito norte":"caballito","caballito sur":"caballito","parque rivadavia":"caballito",
-        # Núñez / San Nicolás variantes
-        "nunez":"nunez","nuñez":"nunez","san nicolás":"san nicolas","san nicolas microcentro":"san nicolas",
-        # Otras subzonas comunes
-        "parque lezama":"san telmo","abasto":"balvanera","once":"balvanera",
-        "las cañitas":"palermo","barrio parque":"palermo",
-    }
-
-    def _canonicalize(barrio_raw: str) -> str:
-        """Devuelve el barrio principal canónico (con acentos) a partir de una cadena cruda."""
-        if not barrio_raw or pd.isna(barrio_raw):
-            return np.nan
-
-        s = str(barrio_raw).strip()
-        # Partes tipo "Subzona, Barrio" o "Barrio, Capital Federal"
-        parts = [p.strip() for p in s.split(",") if p.strip()]
-        # Normalizamos a ascii-lower para matchear
-        parts_norm = [_strip_accents(p).lower() for p in parts]
-
-        # Si la última parte es un barrio válido, usamos esa
-        if parts_norm:
-            tail = parts_norm[-1]
-            if tail in MAIN_BARRIOS_CANONICAL:
-                return MAIN_BARRIOS_CANONICAL[tail]
-            # Si termina en "Capital Federal"/"CABA", usamos la primera parte (subzona → barrio)
-            if tail in {"capital federal","caba","ciudad autonoma de buenos aires","ciudad autónoma de buenos aires"}:
-                head = parts_norm[0]
-                # ¿Subzona conocida?
-                if head in SUBAREA_TO_BARRIO:
-                    barrio_norm = SUBAREA_TO_BARRIO[head]
-                    return MAIN_BARRIOS_CANONICAL.get(barrio_norm, barrio_raw)
-                # Si la subzona ya es un barrio exacto
-                if head in MAIN_BARRIOS_CANONICAL:
-                    return MAIN_BARRIOS_CANONICAL[head]
-                # Heurística: si contiene el nombre de un barrio dentro
-                for key in MAIN_BARRIOS_CANONICAL:
-                    if re.search(rf"\b{re.escape(key)}\b", head):
-                        return MAIN_BARRIOS_CANONICAL[key]
-                # Si no, devolvemos capitalizado de la primera parte
-                return parts[0].title()
-
-            # Si la última parte no es capital federal, puede ser “Subzona, Caballito”
-            # intentamos mapear subzona→barrio
-            if tail in SUBAREA_TO_BARRIO:
-                barrio_norm = SUBAREA_TO_BARRIO[tail]
-                return MAIN_BARRIOS_CANONICAL.get(barrio_norm, parts[-1].title())
-
-        # Sin coma: puede ser "Belgrano R" o "Caballito Norte"
-        only = parts_norm[0] if parts_norm else _strip_accents(s).lower()
-        if only in MAIN_BARRIOS_CANONICAL:
-            return MAIN_BARRIOS_CANONICAL[only]
-        if only in SUBAREA_TO_BARRIO:
-            barrio_norm = SUBAREA_TO_BARRIO[only]
-            return MAIN_BARRIOS_CANONICAL.get(barrio_norm, s.title())
-
-        # Heurística final: buscar un barrio dentro del texto
-        for key in MAIN_BARRIOS_CANONICAL:
-            if re.search(rf"\b{re.escape(key)}\b", only):
-                return MAIN_BARRIOS_CANONICAL[key]
-
-        return s.title()
-
     # ---- Crear columna unificada sin tocar 'Barrio' original
-    df["Barrio_simplificado"] = df["Barrio"].apply(_canonicalize)
+    df["Barrio_simplificado"] = pd.Series(canon, index=df.index)
 
     # Quitar filas muy vacías / sin precio
-    df = df[df["Total"] > 0].reset_index(drop=True)
+    if descartar_sin_total:
+        df = df[df["Total"] > 0].reset_index(drop=True)
     return df
-
-    
@@ -0,0 +1,116 @@
+# cleaning_polars.py
+# Implementación en Polars del mismo contrato que cleaning.clean_data (mismas
+# columnas, tipos y valores). Polars es opcional: sólo se importa si se usa
+# CLEANING_ENGINE = "polars" / clean_data(..., engine="polars").
+#
+# Paridad contra pandas:
+#   python src/cleaning_polars.py                  # filas crudas del store SQLite
+#   python src/cleaning_polars.py --csv crudo.csv  # o de un CSV sin limpiar
+import sys, argparse
+import numpy as np
+import pandas as pd
+from cleaning import NUM_COLS, COORD_COLS, _canonicalize
+
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover - dependencia opcional
+    pl = None
+
+
+def _texto(c):
+    return pl.col(c).cast(pl.Utf8)
+
+
+def clean_data_polars(df, cotizacion_usd=1350, descartar_sin_total=True):
+    if pl is None:
+        raise ImportError("clean_data(engine='polars') necesita `pip install polars`")
+
+    faltan = [c for c in NUM_COLS if c not in df.columns]
+    nuevas = [c for c in ["Moneda", "Total", "Barrio_simplificado"] if c not in df.columns]
+    orden = list(df.columns) + faltan + nuevas
+
+    lf = pl.from_pandas(df.reset_index(drop=True), nan_to_null=True).lazy()
+    lf = lf.with_columns([pl.lit(None, dtype=pl.Utf8).alias(c) for c in faltan])
+
+    precio_txt = _texto("precio").str.replace_all(".", "", literal=True)
+    barrio = _texto("Barrio").str.split("en").list.last().str.strip_chars()
+    lf = lf.with_columns(
+        # Numéricas desde texto (e.g. "2 dormitorios" -> 2)
+        *[_texto(c).str.extract(r"(\d+)", 1).cast(pl.Float64).alias(c) for c in NUM_COLS],
+        *[_texto(c).str.strip_chars().cast(pl.Float64, strict=False).alias(c) for c in COORD_COLS if c in df.columns],
+        pl.when(barrio == "None").then(None).otherwise(barrio).alias("Barrio"),
+        (_texto("expensas").str.extract(r"(\d+)", 1).cast(pl.Float64) * 1000).fill_null(0.0).alias("expensas"),
+        precio_txt.str.extract(r"(\d+)", 1).cast(pl.Float64).alias("precio"),
+        precio_txt.str.extract(r"^\s*(\D+)\s*\d", 1).str.strip_chars().alias("Moneda"),
+    ).with_columns(
+        pl.when(pl.col("Moneda").str.to_lowercase().str.contains("usd"))
+          .then(pl.col("precio") * cotizacion_usd).otherwise(pl.col("precio")).alias("precio"),
+        # Cambiar año 2025
+        pl.when(pl.col("Antiguedad") == 2025).then(1.0).otherwise(pl.col("Antiguedad")).alias("Antiguedad"),
+    ).with_columns(
+        (pl.col("precio").fill_null(0) + pl.col("expensas").fill_null(0)).round(0).alias("Total"),
+    )
+    if descartar_sin_total:
+        lf = lf.filter(pl.col("Total") > 0)
+    out = lf.collect()
+
+    # Barrio canónico: la misma función de pandas, una vez por valor distinto
+    unicos = out.get_column("Barrio").drop_nulls().unique().to_list()
+    canon = [_canonicalize(b) for b in unicos]
+    out = out.with_columns(pl.col("Barrio").replace_strict(
+        unicos, [None if c is np.nan or (isinstance(c, float) and np.isnan(c)) else c for c in canon],
+        default=None, return_dtype=pl.Utf8).alias("Barrio_simplificado"))
+
+    res = out.select(orden).to_pandas()
+    # Mismos tipos que la versión pandas: faltantes como NaN y Barrio como object
+    for c in res.columns:
+        if res[c].dtype == object or pd.api.types.is_string_dtype(res[c]):
+            res[c] = pd.Series(res[c].where(res[c].notna(), np.nan).to_numpy(dtype=object), index=res.index,
+                               dtype=object if c == "Barrio" else None)
+    return res
+
+
+def verificar_paridad(df_raw, cotizacion_usd=1350):
+    """Compara clean_data (pandas) contra clean_data_polars. Devuelve la lista de columnas distintas."""
+    from cleaning import clean_data
+    a = clean_data(df_raw, cotizacion_usd=cotizacion_usd, engine="pandas")
+    b = clean_data_polars(df_raw, cotizacion_usd)
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        print(f"❌ Forma distinta: pandas {a.shape} {list(a.columns)} vs polars {b.shape} {list(b.columns)}")
+        return ["<forma>"]
+    distintas = []
+    for c in a.columns:
+        try:
+            pd.testing.assert_series_equal(a[c], b[c], check_dtype=False)
+        except AssertionError:
+            distintas.append(c)
+    return distintas
+
+
+def main(argv=None):
+    from config import STORE_PATH
+    ap = argparse.ArgumentParser(description="Paridad de limpieza pandas vs polars")
+    ap.add_argument("--csv", help="CSV con filas crudas del scraper")
+    ap.add_argument("--store", default=STORE_PATH, help="store SQLite con filas crudas")
+    args = ap.parse_args(argv)
+
+    if args.csv:
+        raw = pd.read_csv(args.csv, dtype=str)
+    else:
+        from store import ListingStore
+        with ListingStore(args.store) as st:
+            ids = [p for (p,) in st.con.execute("SELECT pid FROM filas")]
+            raw = pd.DataFrame(st.filas(ids))
+    if raw.empty:
+        print("⚠️ No hay filas crudas para comparar")
+        return 1
+    distintas = verificar_paridad(raw)
+    if distintas:
+        print(f"❌ {len(raw)} filas: columnas con diferencias: {distintas}")
+        return 2
+    print(f"✅ {len(raw)} filas: pandas y polars dan el mismo resultado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
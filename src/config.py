@@ -10,12 +10,135 @@ BARRIOS_CABA = [
     "villa-riachuelo","villa-santa-rita","villa-soldati","villa-urquiza"
 ]
 
+BASE_URL = "https://www.argenprop.com"
+
 # URL por barrio (alquiler - departamentos)
-def url_barrio(barrio_slug: str) -> str:
-    return f"https://www.argenprop.com/departamento-alquiler-barrio-{barrio_slug}"
+def url_barrio(barrio_slug: str, base_url: str = BASE_URL) -> str:
+    return f"{base_url}/departamento-alquiler-barrio-{barrio_slug}"
+
+# Página N del listado de un barrio (la 1 es la URL del barrio)
+def url_pagina(barrio_slug: str, pagina: int, base_url: str = BASE_URL) -> str:
+    url1 = url_barrio(barrio_slug, base_url)
+    return url1 if pagina == 1 else f"{url1}-pagina-{pagina}"
+
+# Ficha de un aviso por id: muchas comparten la raíz /{filtros}--{id}, así que
+# usamos una ruta neutra de deptos en CABA para abrir por id
+def url_detalle(pid, base_url: str = BASE_URL) -> str:
+    return f"{base_url}/departamento-alquiler--{pid}"
 
 # Parámetros de scraping
 MAX_PROPS_TOTAL = 1500        # límite total de propiedades para CABA
 MAX_PROPS_POR_BARRIO = 80      # por barrio, para balancear
 N_DRIVERS = 4                   # paralelismo (pool de drivers)
 HEADLESS = True
+DRIVER_MAX_PAGINAS = 150        # reciclar cada driver tras N páginas
+
+# Motor de scraping: "selenium" (Chrome) o "http" (asyncio, sin navegador)
+SCRAPER_ENGINE = "selenium"
+HTTP_CONCURRENCIA = 200         # requests simultáneos (pool keep-alive)
+HTTP_TIMEOUT = 20               # segundos por request
+HTTP_REINTENTOS = 2
+
+# Store local (SQLite): reanudar scraping y refrescar sólo avisos nuevos/vencidos
+STORE_PATH = "output/data/argenprop.sqlite"   # None para desactivar
+STORE_TTL_HORAS = 24            # refetch de avisos con más de N horas
+STORE_TTL_DESCUBRIMIENTO_HORAS = 1   # reusar los IDs de un listado de hace menos de N horas
+                                     # (retomar una corrida cortada); 0 = recorrer siempre
+STORE_BATCH = 50                # filas por commit
+
+# Caché de HTML crudo (para re-parsear offline con engine="replay")
+HTML_CACHE_DIR = "output/cache/html"   # None para desactivar
+HTML_CACHE_MAX_MB = 2048
+
+# Backend de parseo HTML: "lxml" (XPath precompilados) o "bs4" (BeautifulSoup, original)
+PARSER_BACKEND = "lxml"
+
+# Esperas y throttling adaptativo (AIMD)
+ESPERA_MAX = 10                 # segundos máx. esperando los selectores que leemos
+HTTP_CONCURRENCIA_INICIAL = 20  # arranque del AIMD; sube hasta HTTP_CONCURRENCIA
+
+# Perfil liviano de Chrome: bloquea lo que no leemos y mide bytes/tiempo por página
+BROWSER_LIVIANO = True
+BROWSER_BLOQUEAR_TIPOS = ["image", "font", "media"]   # también: "stylesheet"
+BROWSER_BLOQUEAR_DOMINIOS = [
+    "googletagmanager.com", "google-analytics.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "facebook.net", "connect.facebook.com", "hotjar.com", "criteo.com",
+    "taboola.com", "outbrain.com", "adnxs.com", "clarity.ms", "newrelic.com", "nr-data.net",
+]
+BROWSER_MAX_MEMORIA_MB = 512    # heap de JS por instancia
+
+# Modo streaming: filas por micro-batch de limpieza + features
+PIPELINE_BATCH = 100
+
+# Motor de limpieza: "pandas" o "polars" (mismo resultado; ver cleaning_polars.py)
+CLEANING_ENGINE = "pandas"
+
+# Dataset en disco: "parquet" (tipos compactos, zstd, lectura por columnas/filtros) o "csv"
+DATASET_FORMATO = "parquet"
+DATASET_COMPRESION = "zstd"
+DATASET_ROW_GROUP = 50_000      # filas por row group (granularidad del predicate pushdown)
+
+# Runner por etapas (python src/main.py --fuente ...): caché por hash de contenido
+ETAPAS_CACHE_DIR = "output/cache/etapas"
+ETAPAS_CACHE_MAX = 5            # artefactos guardados por etapa (los más recientes)
+ETAPAS_WORKERS = 3              # etapas independientes en paralelo (procesos)
+
+# Modelo entrenado (joblib) y scoring por lotes (python src/ml_model.py predecir ...)
+MODELO_DIR = "output/models"
+PREDICT_CHUNK = 5000            # filas por lote de scoring
+PREDICT_WORKERS = 4             # lotes en paralelo (threads: el predict del RF libera el GIL)
+
+# Motor de entrenamiento: "rf" (Random Forest, one-hot) o "hgb"
+# (HistGradientBoosting: categóricas nativas, early stopping). Ver `python src/ml_model.py comparar`
+MODELO_MOTOR = "rf"
+MODELO_DENSO_MAX_MB = 1024      # one-hot del rf: float32 denso hasta este tamaño, CSR disperso por encima
+MODELO_PRESUPUESTO_S = 300      # tope de reloj para el entrenamiento (segundos)
+HGB_MAX_ITER = 1000
+
+# SHAP con costo acotado (insights_advanced / explicaciones.py)
+SHAP_FONDO = 100                # filas del fondo resumido
+SHAP_FONDO_METODO = "kmeans"    # "kmeans" (centroides ponderados) o "muestra"
+SHAP_MAX_FILAS = 2000           # tope de filas explicadas (modelo lineal)
+SHAP_MAX_FILAS_ARBOL = 500      # tope de filas explicadas con TreeExplainer
+SHAP_MAX_ARBOLES = 50           # árboles del bosque usados (SHAP del bosque = promedio por árbol)
+
+# Detector de outliers persistido (outliers.py): se reentrena sólo a pedido o con drift
+OUTLIERS_CONTAMINACION = 0.08
+OUTLIERS_MAX_SAMPLES = "auto"   # filas por árbol del IsolationForest ("auto" = min(256, n))
+OUTLIERS_N_JOBS = -1            # árboles en paralelo al entrenar y puntuar
+OUTLIERS_DRIFT_PSI = 0.2        # PSI máximo de una feature antes de reentrenar
+
+# HTML de gráficos (render.py): "compartido" (un plotly.min.js para todos), "dashboard"
+# (un HTML por etapa con todas sus figuras), "cdn" o "embebido" (plotly.js en cada archivo)
+PLOTS_PLOTLYJS = "compartido"
+PLOTS_WEBGL_DESDE = 5000        # scatter con más filas: trazas WebGL (scattergl)
+PLOTS_MAX_PUNTOS = 20000        # tope de puntos por scatter (muestra por densidad, ver render.scatter)
+PLOTS_GRILLA = 100              # celdas por eje de la grilla de la muestra
+
+# Gazetteer de barrios (gazetteer.py): None = GeoJSON aproximado incluido (Voronoi de
+# centroides; sólo para mapas y Barrio_geo, no completa Barrio_simplificado); para
+# límites oficiales, la ruta al GeoJSON de data.buenosaires.gob.ar
+BARRIOS_GEOJSON = None
+GAZETTEER_GRILLA = 256          # celdas por eje del índice espacial
+
+# Avisos casi duplicados (dedup.py, etapa "dedup"): MinHash/LSH + confirmación por tolerancias
+DEDUP_PERMUTACIONES = 32        # largo de la firma MinHash
+DEDUP_BANDAS = 16               # bandas LSH de 2 valores: ~99% de recall con similitud 0.5
+DEDUP_VENTANA = 4               # vecinos comparados dentro de cada balde (orden m², precio)
+DEDUP_TOL_M2 = 0.03             # diferencia relativa máxima de m² entre duplicados
+DEDUP_TOL_PRECIO = 0.03         # ídem precio
+DEDUP_SIMILITUD = 0.5           # fracción mínima de la firma MinHash que coincide
+
+# Historial (historial.py): un snapshot Parquet por fecha de scraping (sólo se agregan) y un
+# job incremental con el estado por aviso, eventos (altas, bajas, cambios) y agregados por barrio
+HISTORIAL_DIR = "output/historial"   # None para desactivar
+HISTORIAL_CAMBIO_MIN = 0.001         # variación relativa de precio por debajo de la cual no hay cambio
+
+# Cubo de agregados (cubo.py): conteo, suma, suma de cuadrados y boceto de cuantiles por
+# barrio × ambientes × antigüedad × fecha; los gráficos de agregados salen del cubo
+CUBO_ERROR_RELATIVO = 0.01      # error relativo máximo de los cuantiles (ancho de los baldes log)
+CUBO_ESTADO_DIR = "output/cache/cubo"  # cubo de la corrida anterior + huella de sus filas (None: rearmarlo)
+
+# Regresiones por grupo en forma cerrada (regresion.py): rectas de tendencia y elasticidades
+REGRESION_NIVEL = 0.95          # nivel de los intervalos de confianza de la pendiente
+REGRESION_MIN_N = 10            # filas mínimas por barrio para reportar su elasticidad
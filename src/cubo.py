@@ -0,0 +1,282 @@
+# cubo.py
+# Cubo de agregados compartido por los reportes (analysis_interactive, insights_advanced)
+# y el historial. Una sola tabla larga, con una fila por
+#   (barrio, Ambientes, Antig_binned, fecha) × métrica × balde
+# y columnas n, suma, suma2 (suma de cuadrados), minimo y maximo. Los baldes son
+# logarítmicos de ancho relativo 2 * CUBO_ERROR_RELATIVO (boceto tipo DDSketch): sumando n
+# sobre los baldes salen conteos, medias y desvíos exactos, y los cuantiles con error
+# relativo acotado. Todo es sumable, así que:
+#   - cualquier corte (por barrio, por barrio oficial, total) es un groupby sobre el cubo,
+#     cuyo tamaño depende de los grupos y no de las filas,
+#   - filas nuevas se incorporan con cubo.agregar(df) sin recalcular lo anterior.
+# La etapa "cubo" usa actualizar(): guarda el cubo y la huella (hash) de cada fila en
+# CUBO_ESTADO_DIR y en la corrida siguiente agrega sólo las filas nuevas y recalcula sólo
+# las celdas que perdieron filas (mínimo y máximo no se pueden restar).
+#
+#   cubo = Cubo.desde_filas(clean)
+#   cubo.resumen(["barrio"])                     # filas, Total_media, precio_m2_std, ...
+#   cubo.cuantiles(["barrio"], "m2", [0.25, 0.5, 0.75])
+import os, json, hashlib
+import numpy as np
+import pandas as pd
+from config import CUBO_ERROR_RELATIVO, CUBO_ESTADO_DIR
+
+DIMENSIONES = ["barrio", "Ambientes", "Antig_binned", "fecha"]
+METRICAS = ["Total", "precio_m2", "m2", "expensas_ratio"]
+FILAS = "filas"                 # pseudo-métrica: filas de la celda (n), con un Link de ejemplo
+_CERO = -(2 ** 31)              # balde de valores <= 0
+_ESTADISTICOS = {"n": "sum", "suma": "sum", "suma2": "sum", "minimo": "min", "maximo": "max", "ejemplo": "first"}
+
+
+def _gamma(error=CUBO_ERROR_RELATIVO):
+    return (1 + error) / (1 - error)
+
+
+def baldes(valores, error=CUBO_ERROR_RELATIVO):
+    """Balde logarítmico de cada valor finito (_CERO para los <= 0)."""
+    v = np.asarray(valores, dtype=np.float64)
+    pos = v > 0
+    b = np.full(len(v), _CERO, dtype=np.int64)
+    b[pos] = np.ceil(np.log(v[pos]) / np.log(_gamma(error))).astype(np.int64)
+    return b
+
+
+def _columna_barrio(df):
+    return next((c for c in ("Barrio_simplificado", "barrio", "Barrio") if c in df.columns), None)
+
+
+def _dimensiones(df, fecha):
+    # Dimensiones como texto/float planos (sin categorías): el cubo se une y guarda igual
+    col = _columna_barrio(df)
+    dims = pd.DataFrame(index=df.index)
+    dims["barrio"] = df[col].astype(object).where(df[col].notna(), None) if col else None
+    dims["Ambientes"] = pd.to_numeric(df["Ambientes"], errors="coerce").astype("float64") \
+        if "Ambientes" in df.columns else np.nan
+    dims["Antig_binned"] = df["Antig_binned"].astype(object).where(df["Antig_binned"].notna(), None) \
+        if "Antig_binned" in df.columns else None
+    dims["fecha"] = fecha if fecha is None else str(fecha)
+    return dims
+
+
+class Cubo:
+    """Tabla larga de agregados sumables (ver arriba). `datos` es un DataFrame común: se
+    puede guardar, cachear como artefacto de etapa o concatenar."""
+
+    def __init__(self, datos=None, error=CUBO_ERROR_RELATIVO):
+        columnas = DIMENSIONES + ["metrica", "balde"] + list(_ESTADISTICOS)
+        self.datos = pd.DataFrame(columns=columnas) if datos is None else datos
+        self.error = error
+
+    def __len__(self):
+        return len(self.datos)
+
+    @classmethod
+    def desde_filas(cls, df, fecha=None, metricas=METRICAS, error=CUBO_ERROR_RELATIVO):
+        """Cubo de las filas de `df` (todas con la misma `fecha` de snapshot, o None)."""
+        dims = _dimensiones(df, fecha)
+        celda = dims.groupby(DIMENSIONES, dropna=False, sort=False).ngroup().to_numpy()
+        claves = dims.groupby(celda, sort=False).first()  # dimensiones de cada celda
+        partes = []
+        link = df["Link"].astype(object).to_numpy() if "Link" in df.columns else np.full(len(df), None)
+        filas = pd.DataFrame({"celda": celda, "ejemplo": link}).groupby("celda", sort=False)
+        partes.append(pd.DataFrame({"celda": filas.size().index, "metrica": FILAS, "balde": 0,
+                                    "n": filas.size().to_numpy(), "suma": np.nan, "suma2": np.nan,
+                                    "minimo": np.nan, "maximo": np.nan,
+                                    "ejemplo": filas["ejemplo"].first().to_numpy()}))
+        for m in metricas:
+            if m not in df.columns:
+                continue
+            v = pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=np.float64)
+            ok = np.isfinite(v)
+            g = pd.DataFrame({"celda": celda[ok], "balde": baldes(v[ok], error), "v": v[ok]})
+            g["v2"] = g["v"] ** 2
+            a = g.groupby(["celda", "balde"], sort=False).agg(
+                n=("v", "size"), suma=("v", "sum"), suma2=("v2", "sum"), minimo=("v", "min"), maximo=("v", "max"))
+            partes.append(a.reset_index().assign(metrica=m, ejemplo=None))
+        largo = pd.concat(partes, ignore_index=True)
+        datos = claves.reindex(largo["celda"].to_numpy()).reset_index(drop=True)
+        datos = pd.concat([datos, largo.drop(columns="celda")], axis=1)
+        return cls(datos[DIMENSIONES + ["metrica", "balde"] + list(_ESTADISTICOS)], error)
+
+    def unir(self, *otros):
+        """Cubo con las filas de éste y de `otros` (mismas celdas y baldes se suman)."""
+        datos = pd.concat([self.datos] + [o.datos for o in otros], ignore_index=True)
+        return Cubo(self._reducir(datos, DIMENSIONES), self.error)
+
+    def agregar(self, df, fecha=None):
+        """Incorpora filas nuevas (p. ej. un micro-batch o un snapshot)."""
+        return self.unir(Cubo.desde_filas(df, fecha, error=self.error))
+
+    def recodificar(self, dimension, mapa):
+        """Cubo con `dimension` traducida por `mapa` (dict o función; None descarta la fila),
+        p. ej. barrios del aviso → barrio oficial del gazetteer."""
+        datos = self.datos.copy()
+        f = mapa.get if isinstance(mapa, dict) else mapa
+        unicos = pd.unique(datos[dimension].dropna())
+        datos[dimension] = datos[dimension].map({u: f(u) for u in unicos})
+        return Cubo(self._reducir(datos[datos[dimension].notna()], DIMENSIONES), self.error)
+
+    def filtrar(self, **iguales):
+        """Cubo con las celdas cuyas dimensiones valen lo indicado (valor o lista)."""
+        m = pd.Series(True, index=self.datos.index)
+        for c, v in iguales.items():
+            m &= self.datos[c].isin(v if isinstance(v, (list, tuple, set)) else [v])
+        return Cubo(self.datos[m], self.error)
+
+    @staticmethod
+    def _reducir(datos, por):
+        out = (datos.groupby(list(por) + ["metrica", "balde"], dropna=False, sort=False)
+               .agg(_ESTADISTICOS).reset_index())
+        out.loc[out["metrica"] == FILAS, ["suma", "suma2"]] = np.nan  # el groupby las deja en 0
+        return out
+
+    def _por_grupo(self, por, metrica):
+        por = list(por or [])
+        d = self.datos[self.datos["metrica"] == metrica]
+        if not por:
+            d = d.assign(_todo="total")
+            por = ["_todo"]
+        return d, por
+
+    def resumen(self, por=None, metricas=METRICAS):
+        """Una fila por grupo de `por` (lista de dimensiones; None = total) con `filas`, un
+        `ejemplo` (Link) y, por métrica, _n, _media, _std, _min y _max (exactos)."""
+        d, claves = self._por_grupo(por, FILAS)
+        out = d.groupby(claves, dropna=False).agg(filas=("n", "sum"), ejemplo=("ejemplo", "first"))
+        for m in metricas:
+            d, _ = self._por_grupo(por, m)
+            g = d.groupby(claves, dropna=False).agg(n=("n", "sum"), s=("suma", "sum"), s2=("suma2", "sum"),
+                                                    mn=("minimo", "min"), mx=("maximo", "max"))
+            var = (g["s2"] - g["s"] ** 2 / g["n"]) / (g["n"] - 1)
+            out = out.join(pd.DataFrame({f"{m}_n": g["n"], f"{m}_media": g["s"] / g["n"],
+                                         f"{m}_std": np.sqrt(var.clip(lower=0)),
+                                         f"{m}_min": g["mn"], f"{m}_max": g["mx"]}), how="left")
+        return out.reset_index(drop=not por)
+
+    def cuantiles(self, por, metrica, qs=(0.25, 0.5, 0.75)):
+        """Cuantiles por grupo (una columna por q), como pandas (interpolación lineal entre
+        rangos) con error relativo <= CUBO_ERROR_RELATIVO: dentro de cada balde los valores se
+        suponen repartidos entre su mínimo y su máximo."""
+        d, claves = self._por_grupo(por, metrica)
+        d = self._reducir(d, claves).sort_values(claves + ["balde"], kind="stable")
+        gid = d.groupby(claves, dropna=False, sort=False).ngroup().to_numpy()
+        grupos = d.groupby(claves, dropna=False, sort=False).size().index
+        n = d["n"].to_numpy(dtype=np.float64)
+        acum = pd.Series(n).groupby(gid).cumsum().to_numpy()
+        totales = np.bincount(gid, weights=n)
+        mn, mx = d["minimo"].to_numpy(), d["maximo"].to_numpy()
+
+        def valor(rango):
+            # Valor del elemento `rango` (0-based, uno por grupo) de cada grupo
+            llega = acum > rango[gid]
+            i = pd.Series(np.arange(len(d))[llega]).groupby(gid[llega]).first().to_numpy()
+            k = rango - (acum[i] - n[i])          # posición dentro del balde
+            return mn[i] + np.where(n[i] > 1, k / np.maximum(n[i] - 1, 1), 0) * (mx[i] - mn[i])
+
+        out = pd.DataFrame(index=grupos)
+        for q in qs:
+            r = q * (totales - 1)
+            lo, hi = valor(np.floor(r)), valor(np.ceil(r))
+            out[q] = lo + (r - np.floor(r)) * (hi - lo)
+        if not por:
+            return out.iloc[0]
+        return out
+
+    def histograma(self, metrica, bins=50, rango=None):
+        """(bordes, conteos) de `metrica` en `bins` intervalos lineales, desde los baldes."""
+        d = self._reducir(self.datos[self.datos["metrica"] == metrica].assign(_todo=0), ["_todo"])
+        valor = (d["suma"] / d["n"]).to_numpy()
+        rango = rango or (d["minimo"].min(), d["maximo"].max())
+        conteos, bordes = np.histogram(valor, bins=bins, range=rango, weights=d["n"].to_numpy())
+        return bordes, conteos.astype(np.int64)
+
+    def guardar(self, path):
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        self.datos.to_parquet(f"{path}.parcial", index=False)
+        os.replace(f"{path}.parcial", path)
+        return path
+
+    @classmethod
+    def cargar(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def construir(df, fecha=None):
+    """Cubo de un dataset limpio, con el tamaño resultante."""
+    cubo = Cubo.desde_filas(df, fecha)
+    print(f"🧊 Cubo: {len(df)} filas → {len(cubo)} filas de agregados")
+    return cubo
+
+
+def _huellas(df):
+    # Hash de cada fila sobre las columnas que lee el cubo (dimensiones, métricas y Link)
+    cols = [c for c in [_columna_barrio(df), "Ambientes", "Antig_binned", *METRICAS, "Link"]
+            if c and c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def _celdas(dims):
+    # Hash de la celda de cada fila (del dataset o del cubo); None y NaN son la misma celda
+    d = dims[DIMENSIONES].astype(object)
+    return pd.util.hash_pandas_object(d.where(d.notna(), None).astype(str), index=False).to_numpy()
+
+
+def _firma(fecha, error):
+    # El estado guardado sirve sólo con el mismo código, ancho de baldes y fecha
+    with open(os.path.abspath(__file__), "rb") as f:
+        codigo = hashlib.sha256(f.read()).hexdigest()
+    return {"codigo": codigo, "error": error, "fecha": None if fecha is None else str(fecha)}
+
+
+def _cargar_estado(directorio, firma):
+    try:
+        with open(os.path.join(directorio, "firma.json"), encoding="utf-8") as f:
+            if json.load(f) != firma:
+                return None
+        return (Cubo.cargar(os.path.join(directorio, "cubo.parquet")),
+                pd.read_parquet(os.path.join(directorio, "filas.parquet")))
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_estado(directorio, firma, cubo, filas):
+    # Sin firma mientras se escribe: un estado a medias no se vuelve a leer
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, "firma.json")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    cubo.guardar(os.path.join(directorio, "cubo.parquet"))
+    filas.to_parquet(os.path.join(directorio, "filas.parquet"), index=False)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(firma, f)
+
+
+def actualizar(df, fecha=None, directorio=CUBO_ESTADO_DIR, error=CUBO_ERROR_RELATIVO):
+    """Cubo de un dataset limpio (etapa "cubo") partiendo del de la corrida anterior: igual a
+    Cubo.desde_filas(df), pero agrega sólo las filas nuevas y recalcula sólo las celdas que
+    perdieron filas. Sin estado previo (o con otro código/error/fecha) lo arma entero."""
+    if not directorio:
+        return construir(df, fecha)
+    firma = _firma(fecha, error)
+    filas = pd.DataFrame({"huella": _huellas(df), "celda": _celdas(_dimensiones(df, fecha))})
+    previo = _cargar_estado(directorio, firma)
+    if previo is None:
+        cubo, nuevas, celdas = Cubo.desde_filas(df, fecha, error=error), len(df), None
+    else:
+        anterior, filas_prev = previo
+        # Multiconjunto de huellas: una fila repetida k veces antes y k + 2 ahora suma 2
+        antes = filas_prev.groupby("huella").size()
+        dif = filas.groupby("huella").size().sub(antes, fill_value=0)
+        tocadas = pd.unique(filas_prev.loc[filas_prev["huella"].isin(dif.index[dif < 0]), "celda"])
+        en_tocadas = np.isin(filas["celda"].to_numpy(), tocadas)
+        orden = filas.groupby("huella").cumcount().to_numpy()
+        nueva = orden >= antes.reindex(filas["huella"]).fillna(0).to_numpy()
+        base = Cubo(anterior.datos[~np.isin(_celdas(anterior.datos), tocadas)], error)
+        a_sumar = en_tocadas | nueva
+        cubo = base.agregar(df[a_sumar], fecha) if a_sumar.any() else base
+        nuevas, celdas = int((nueva & ~en_tocadas).sum()), len(tocadas)
+    _guardar_estado(directorio, firma, cubo, filas)
+    detalle = "armado entero" if celdas is None else f"+{nuevas} filas nuevas, {celdas} celdas recalculadas"
+    print(f"🧊 Cubo: {len(df)} filas ({detalle}) → {len(cubo)} filas de agregados")
+    return cubo
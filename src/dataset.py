@@ -0,0 +1,163 @@
+# dataset.py
+# Capa de almacenamiento del dataset procesado. Parquet con tipos explícitos
+# (categorías para textos repetidos, float32 para conteos) y compresión; al cargar
+# se leen sólo las columnas pedidas y los filtros se empujan a los row groups.
+# CSV queda como formato de exportación (DATASET_FORMATO = "csv").
+import os, importlib.util
+import pandas as pd
+from config import DATASET_FORMATO, DATASET_COMPRESION, DATASET_ROW_GROUP
+
+# pyarrow se importa recién al leer/escribir Parquet (no en el arranque); sin pyarrow se usa CSV
+HAY_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _arrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+EXTENSIONES = {"parquet": ".parquet", "csv": ".csv"}
+
+ANTIG_LABELS = ["0", "1-5", "6-10", "11-20", "21-40", "41-80", "+80"]
+
+# Tipos del dataset (columnas ausentes se ignoran; las no listadas quedan como vienen).
+# Precios y totales siguen en float64: float32 pierde precisión por encima de 16M.
+ESQUEMA = {
+    **{c: "category" for c in ["Barrio", "Barrio_simplificado", "Barrio_geo", "Moneda", "Disposición",
+                               "Orientación", "Estado", "Apto profesional", "Permite mascota"]},
+    **{c: "float32" for c in ["Dormitorios", "Baños", "Ambientes", "Cocheras", "Toilettes",
+                              "Sup. cubierta", "Antiguedad", "m2"]},
+    **{c: "float64" for c in ["precio", "expensas", "Total", "precio_m2", "expensas_ratio", "amb_m2", "log_total",
+                              "lat", "lon"]},
+    "Antig_binned": pd.CategoricalDtype(ANTIG_LABELS, ordered=True),
+}
+
+
+def formato_efectivo(formato=DATASET_FORMATO):
+    if formato == "parquet" and not HAY_PYARROW:
+        print("⚠️ pyarrow no está instalado: el dataset se guarda como CSV")
+        return "csv"
+    return formato
+
+
+def ruta_dataset(directorio, nombre, formato=DATASET_FORMATO):
+    return os.path.join(directorio, nombre + EXTENSIONES[formato_efectivo(formato)])
+
+
+def buscar_dataset(directorio, nombre, formato=DATASET_FORMATO):
+    """Ruta del dataset existente, prefiriendo el formato configurado (o None)."""
+    orden = [formato_efectivo(formato)] + [f for f in EXTENSIONES if f != formato]
+    for f in orden:
+        p = os.path.join(directorio, nombre + EXTENSIONES[f])
+        if os.path.exists(p):
+            return p
+    return None
+
+
+def _a_categoria(s, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):  # categorías fijas (Antig_binned)
+        return s.astype(str).where(s.notna(), None).astype(dtype)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Tras filtrar (o un batch) no arrastramos categorías sin filas
+        return s.cat.remove_unused_categories()
+    # Texto: los NaN quedan como faltantes, no como la categoría "nan"
+    return s.astype(object).where(s.notna(), None).astype("category")
+
+
+def tipar(df):
+    """Aplica ESQUEMA in-place sobre las columnas presentes y devuelve el df."""
+    for c, dtype in ESQUEMA.items():
+        if c not in df.columns:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype) or dtype == "category":
+            df[c] = _a_categoria(df[c], dtype)
+        else:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(dtype)
+    return df
+
+
+def esquema_arrow(columnas):
+    """Esquema Arrow fijo para escribir por batches (ParquetSink) sin depender del primer batch."""
+    pa, _ = _arrow()
+    campos = []
+    for c in columnas:
+        dtype = ESQUEMA.get(c)
+        if dtype in ("float32", "float64"):
+            tipo = pa.float32() if dtype == "float32" else pa.float64()
+        elif dtype is not None:
+            tipo = pa.dictionary(pa.int32(), pa.string(), ordered=getattr(dtype, "ordered", False))
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(c, tipo))
+    return pa.schema(campos)
+
+
+def tabla_arrow(df, schema):
+    """df (ya tipado) → tabla con `schema`; textos fuera de ESQUEMA se pasan como str."""
+    pa, _ = _arrow()
+    df = df.copy(deep=False)
+    for campo in schema:
+        c = campo.name
+        if pa.types.is_string(campo.type) and c in df.columns:
+            df[c] = df[c].astype(object).where(df[c].notna(), None).map(lambda v: v if v is None else str(v))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def guardar_dataset(df, path, formato=None):
+    """Guarda `df` tipado. El formato sale de la extensión de `path` salvo que se indique."""
+    formato = formato_efectivo(formato or ("csv" if path.endswith(".csv") else "parquet"))
+    d = os.path.dirname(path)
+    if d: os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.parcial"
+    if formato == "csv":
+        df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    else:
+        tipado = tipar(df.copy(deep=False))
+        tipado.to_parquet(tmp, engine="pyarrow", index=False,
+                          compression=DATASET_COMPRESION, row_group_size=DATASET_ROW_GROUP)
+    os.replace(tmp, path)
+    return path
+
+
+def exportar_csv(path_parquet, path_csv=None):
+    """Exporta un dataset Parquet a CSV (mismas columnas, utf-8-sig para Excel)."""
+    path_csv = path_csv or os.path.splitext(path_parquet)[0] + ".csv"
+    return guardar_dataset(cargar_dataset(path_parquet), path_csv, formato="csv")
+
+
+_OPERADORES = {
+    "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v, "<=": lambda s, v: s <= v, ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def _filtrar(df, filtros):
+    # Mismo formato que pyarrow: [(col, op, valor), ...] (AND)
+    mascara = pd.Series(True, index=df.index)
+    for col, op, valor in filtros:
+        mascara &= _OPERADORES[op](df[col], valor).fillna(False).astype(bool)
+    return df[mascara].reset_index(drop=True)
+
+
+def cargar_dataset(path, columnas=None, filtros=None):
+    """Carga el dataset tipado.
+
+    columnas: lista de columnas a leer (proyección; en Parquet no se lee el resto).
+    filtros:  [(col, op, valor), ...] con op en ==, !=, <, <=, >, >=, in, not in.
+              En Parquet se empujan a los row groups; en CSV se aplican al cargar.
+    """
+    if path.endswith(".csv"):
+        necesarias = None
+        if columnas is not None:
+            necesarias = list(dict.fromkeys(list(columnas) + [c for c, _, _ in filtros or []]))
+        df = pd.read_csv(path, usecols=necesarias)
+        if filtros:
+            df = _filtrar(df, filtros)
+        return tipar(df[list(columnas)] if columnas is not None else df)
+
+    if not HAY_PYARROW:
+        raise ImportError(f"Leer {path} necesita `pip install pyarrow`")
+    df = pd.read_parquet(path, engine="pyarrow", columns=columnas,
+                         filters=[tuple(f) for f in filtros] if filtros else None)
+    return tipar(df)
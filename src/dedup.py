@@ -0,0 +1,219 @@
+# dedup.py
+# Avisos casi duplicados: el mismo depto publicado por varias inmobiliarias con IDs
+# distintos. Tiempo ~lineal en filas:
+#   0. las filas idénticas salvo Link/ID se agrupan directo (hash de fila),
+#   1. tokens por aviso: barrio, ambientes, dormitorios, baños, cocheras, antigüedad y
+#      bandas de m², precio y expensas en dos grillas corridas media banda (dos valores
+#      cercanos comparten al menos una); más 3-gramas de palabras de título/descripción
+#      si esas columnas existen,
+#   2. firma MinHash de DEDUP_PERMUTACIONES valores y LSH por DEDUP_BANDAS bandas: sólo
+#      se comparan avisos que coinciden en alguna banda, y dentro de cada balde sólo
+#      los DEDUP_VENTANA vecinos en orden de (m², precio), no todos contra todos,
+#   3. cada par candidato se confirma con tolerancias (mismo barrio y ambientes, m² y
+#      precio dentro de DEDUP_TOL_*, firmas parecidas) y los grupos salen de las
+#      componentes conexas.
+# Se conservan todas las filas con `cluster_dup`, `publicaciones` (tamaño del grupo) y
+# `es_canonica` (la publicación más completa de cada grupo); canonicas() filtra.
+#   python src/dedup.py output/data/caba_base_completa.parquet
+import sys, argparse, time
+import numpy as np
+import pandas as pd
+from config import (DEDUP_PERMUTACIONES, DEDUP_BANDAS, DEDUP_VENTANA, DEDUP_TOL_M2, DEDUP_TOL_PRECIO,
+                    DEDUP_SIMILITUD)
+
+_TEXTOS = ["Titulo", "Título", "Descripcion", "Descripción"]
+_CONTEOS = ["Ambientes", "Dormitorios", "Baños", "Cocheras"]
+
+
+def _mezclar(x):
+    # splitmix64: hash de 64 bits de enteros (vectorizado; el overflow es parte del hash)
+    x = np.asarray(x, dtype=np.uint64)
+    x = (x + np.uint64(0x9E3779B97F4A7C15))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _codigo(serie):
+    # Hash del valor (NaN → -1), el mismo en cualquier corrida: la firma de un aviso no
+    # depende de qué otras filas vinieron con él
+    codigos, unicos = pd.factorize(serie.astype(object).where(serie.notna(), None), use_na_sentinel=True)
+    h = pd.util.hash_array(np.asarray([str(u) for u in unicos], dtype=object)) >> np.uint64(1)
+    return np.append(h.astype(np.int64), -1)[codigos]
+
+
+def _bandas(valores, tol):
+    # Bandas log de ancho 2*tol en dos grillas corridas media banda (NaN / <= 0 → -1)
+    v = pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64)
+    ok = np.isfinite(v) & (v > 0)
+    x = np.where(ok, np.log(np.where(ok, v, 1.0)) / np.log1p(2 * tol), 0.0)
+    return np.where(ok, np.floor(x), -1).astype(np.int64), np.where(ok, np.floor(x + 0.5), -1).astype(np.int64)
+
+
+def _barrio(df):
+    # Código del barrio normalizado (sin acentos ni mayúsculas), -1 si falta
+    from gazetteer import clave_barrio
+    col = "Barrio_simplificado" if "Barrio_simplificado" in df.columns else "Barrio"
+    codigos, unicos = pd.factorize(df[col].astype(object))
+    return _codigo(pd.Series([clave_barrio(u) for u in unicos], dtype=object))[codigos]
+
+
+def tokens(df, barrio=None):
+    """Matriz (filas, tokens) de hashes de 64 bits de los atributos normalizados."""
+    cols = [_barrio(df) if barrio is None else barrio]
+    cols += [_codigo(df[c]) if c in df.columns else np.full(len(df), -1, np.int64) for c in _CONTEOS]
+    antig = df["Antiguedad"] if "Antiguedad" in df.columns else pd.Series(np.nan, index=df.index)
+    cols.append(_codigo((antig // 5)))
+    for c, tol in (("m2", DEDUP_TOL_M2), ("precio", DEDUP_TOL_PRECIO), ("expensas", DEDUP_TOL_PRECIO)):
+        if c in df.columns:
+            cols.extend(_bandas(df[c], tol))
+    # Cada token = hash(número de atributo, valor): el mismo valor en otra columna es otro token
+    return np.column_stack([_mezclar(np.uint64(k) ^ v.astype(np.uint64)) for k, v in enumerate(cols)])
+
+
+def _tokens_texto(df):
+    # (fila, hash) de los 3-gramas de palabras de los textos disponibles (o None)
+    cols = [c for c in _TEXTOS if c in df.columns]
+    if not cols:
+        return None
+    texto = df[cols].astype(object).fillna("").agg(" ".join, axis=1).str.lower()
+    filas, hashes = [], []
+    for i, t in enumerate(texto.to_numpy()):
+        palabras = t.split()
+        gramas = {" ".join(palabras[k:k + 3]) for k in range(max(len(palabras) - 2, 0))}
+        if gramas:
+            filas.extend([i] * len(gramas))
+            hashes.extend(gramas)
+    if not filas:
+        return None
+    return np.asarray(filas, dtype=np.int64), pd.util.hash_array(np.asarray(hashes, dtype=object))
+
+
+def firmas(df, permutaciones=DEDUP_PERMUTACIONES, random_state=42, barrio=None):
+    """Firma MinHash (filas, permutaciones). Cada permutación es un hash multiply-shift
+    h(t) = (a*t + b) >> 32 (a impar de 64 bits) y la firma es su mínimo sobre los tokens."""
+    H = tokens(df, barrio)
+    texto = _tokens_texto(df)
+    rng = np.random.default_rng(random_state)
+    a = rng.integers(0, 2 ** 63, permutaciones, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, permutaciones, dtype=np.uint64)
+    desplazar = np.uint64(32)
+    sig = np.empty((len(df), permutaciones), dtype=np.uint32)
+    for j in range(permutaciones):
+        sig[:, j] = ((a[j] * H + b[j]) >> desplazar).min(axis=1)
+        if texto is not None:
+            filas, h = texto
+            m = np.full(len(df), np.iinfo(np.uint32).max, dtype=np.uint64)
+            np.minimum.at(m, filas, (a[j] * h + b[j]) >> desplazar)
+            sig[:, j] = np.minimum(sig[:, j], m)
+    return sig
+
+
+def _candidatos(sig, orden, bandas=DEDUP_BANDAS, ventana=DEDUP_VENTANA):
+    # Por banda: balde = hash de sus valores; pares entre cada aviso y sus `ventana`
+    # siguientes del mismo balde en `orden` (a lo sumo n * ventana pares por banda)
+    n, r = len(sig), sig.shape[1] // bandas
+    claves = []
+    for k in range(bandas):
+        balde = np.zeros(n, dtype=np.uint64)
+        for v in sig[:, k * r:(k + 1) * r].T:
+            balde = _mezclar(balde ^ v.astype(np.uint64))
+        idx = np.lexsort((orden, balde))
+        for d in range(1, ventana + 1):
+            mismo = balde[idx[d:]] == balde[idx[:-d]]
+            if not mismo.any():
+                break
+            i, j = idx[:-d][mismo], idx[d:][mismo]
+            claves.append(np.minimum(i, j).astype(np.int64) * n + np.maximum(i, j))
+    claves = np.unique(np.concatenate(claves)) if claves else np.empty(0, dtype=np.int64)
+    return np.column_stack([claves // n, claves % n])
+
+
+def _rel(x, y):
+    return np.abs(x - y) / np.maximum(np.maximum(np.abs(x), np.abs(y)), 1e-9)
+
+
+def _confirmar(df, sig, pares, barrio):
+    i, j = pares[:, 0], pares[:, 1]
+    ok = (barrio[i] == barrio[j]) & (barrio[i] >= 0)
+    for c, tol in (("m2", DEDUP_TOL_M2), ("precio", DEDUP_TOL_PRECIO)):
+        v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+        ok &= _rel(v[i], v[j]) <= tol  # NaN compara False: sin m² o precio no hay duplicado
+    for c in _CONTEOS:
+        if c in df.columns:
+            v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+            ok &= (v[i] == v[j]) | np.isnan(v[i]) | np.isnan(v[j])
+    ok &= (sig[i] == sig[j]).mean(axis=1) >= DEDUP_SIMILITUD
+    return pares[ok]
+
+
+def deduplicar(df):
+    """Copia de `df` con `cluster_dup`, `publicaciones` y `es_canonica` (ver arriba)."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    t0 = time.perf_counter()
+    out = df.reset_index(drop=True).copy()
+    n = len(out)
+    if n == 0:
+        return out.assign(cluster_dup=pd.Series(dtype="int64"), publicaciones=pd.Series(dtype="int64"),
+                          es_canonica=pd.Series(dtype=bool))
+    # Filas idénticas en todo salvo Link/ID (re-publicaciones exactas) se unen directo y
+    # el LSH corre sólo sobre una de cada una
+    columnas = [c for c in out.columns if c not in ("Link", "ID", "id")]
+    _, rep, exacta = np.unique(pd.util.hash_pandas_object(out[columnas], index=False).to_numpy(),
+                               return_index=True, return_inverse=True)
+    u = out.iloc[rep].reset_index(drop=True)
+    barrio = _barrio(u)
+    sig = firmas(u, barrio=barrio)
+    m2 = pd.to_numeric(u["m2"], errors="coerce").fillna(-1).to_numpy()
+    precio = pd.to_numeric(u["precio"], errors="coerce").fillna(-1).to_numpy()
+    orden = np.lexsort((precio, m2)).argsort()  # rango de cada fila en orden (m², precio)
+    pares = _confirmar(u, sig, _candidatos(sig, orden), barrio)
+    grafo = coo_matrix((np.ones(len(pares)), (pares[:, 0], pares[:, 1])), shape=(len(u), len(u)))
+    _, grupo = connected_components(grafo, directed=False)
+    grupo = grupo[exacta.ravel()]
+
+    # Canónica: la publicación con más datos; a igualdad, el Link menor (estable entre corridas)
+    completos = out.notna().sum(axis=1).to_numpy()
+    link = out["Link"].astype(str).to_numpy() if "Link" in out.columns else np.arange(n).astype(str)
+    idx = np.lexsort((link, -completos, grupo))
+    primera = np.r_[True, grupo[idx[1:]] != grupo[idx[:-1]]]
+    canonica = np.empty(len(np.unique(grupo)), dtype=np.int64)
+    canonica[grupo[idx[primera]]] = idx[primera]
+    out["cluster_dup"] = pd.util.hash_array(link[canonica[grupo]].astype(object)).astype(np.int64)
+    out["publicaciones"] = np.bincount(grupo)[grupo]
+    out["es_canonica"] = np.zeros(n, dtype=bool)
+    out.loc[canonica, "es_canonica"] = True
+    dup = n - len(canonica)
+    print(f"🧬 Duplicados: {dup} publicaciones repetidas en {int((np.bincount(grupo) > 1).sum())} grupos "
+          f"({n - len(u)} exactas, {len(pares)} pares casi iguales, {time.perf_counter() - t0:.1f}s)")
+    return out
+
+
+def canonicas(df):
+    """Una fila por grupo de duplicados (si `df` no pasó por deduplicar, tal cual)."""
+    if "es_canonica" not in df.columns:
+        return df
+    return df[df["es_canonica"]]
+
+
+def main(argv=None):
+    from dataset import cargar_dataset, guardar_dataset
+    ap = argparse.ArgumentParser(description="Avisos casi duplicados (MinHash/LSH)")
+    ap.add_argument("entrada", help="dataset con features (CSV o Parquet)")
+    ap.add_argument("--salida", help="dataset con cluster_dup / publicaciones / es_canonica")
+    ap.add_argument("--filas", type=int, help="re-muestrear a N filas (con reemplazo) para probar escala")
+    args = ap.parse_args(argv)
+    df = cargar_dataset(args.entrada)
+    if args.filas:
+        df = df.sample(args.filas, replace=args.filas > len(df), random_state=42).reset_index(drop=True)
+    out = deduplicar(df)
+    grupos = out[out["publicaciones"] > 1].sort_values(["cluster_dup", "es_canonica"], ascending=[True, False])
+    print(grupos[["cluster_dup", "es_canonica", "Barrio_simplificado", "m2", "precio", "Link"]].head(12).to_string())
+    if args.salida:
+        guardar_dataset(out, args.salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# explicaciones.py
+# Atribuciones SHAP con costo acotado:
+#   - fondo resumido (muestra o k-means ponderado) en lugar del dataset entero,
+#   - tope de filas explicadas,
+#   - forma cerrada para modelos lineales (sin shap),
+#   - TreeExplainer para el modelo de ml_model, cacheado por versión del modelo.
+import os, copy, json, hashlib
+import numpy as np
+import pandas as pd
+from config import (SHAP_FONDO, SHAP_FONDO_METODO, SHAP_MAX_FILAS, SHAP_MAX_FILAS_ARBOL, SHAP_MAX_ARBOLES,
+                    MODELO_DIR)
+
+
+def limitar_filas(X, max_filas=SHAP_MAX_FILAS, random_state=42):
+    """Hasta `max_filas` filas (muestra fija) de un DataFrame."""
+    if max_filas and len(X) > max_filas:
+        return X.sample(max_filas, random_state=random_state)
+    return X
+
+
+def resumir_fondo(X, metodo=SHAP_FONDO_METODO, n=SHAP_FONDO, random_state=42):
+    """Fondo para las atribuciones: (filas, pesos). metodo = "muestra" o "kmeans"
+    (centroides ponderados por el tamaño de su cluster)."""
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) <= n:
+        return X, np.full(len(X), 1.0 / len(X))
+    if metodo == "kmeans":
+        from sklearn.cluster import KMeans
+        km = KMeans(n_clusters=n, random_state=random_state, n_init=1).fit(X)
+        pesos = np.bincount(km.labels_, minlength=n).astype(np.float64)
+        return km.cluster_centers_, pesos / pesos.sum()
+    idx = np.random.default_rng(random_state).choice(len(X), n, replace=False)
+    return X[idx], np.full(n, 1.0 / n)
+
+
+def shap_lineal(model, X, fondo):
+    """SHAP exacto de un modelo lineal con features independientes:
+    phi_ij = coef_j * (x_ij - E_fondo[x_j]). Costo O(filas x features)."""
+    filas, pesos = fondo
+    media = np.average(filas, axis=0, weights=pesos)
+    return (np.asarray(X, dtype=np.float64) - media) * np.ravel(model.coef_)
+
+
+def _por_variable(columnas, importancia, esquema):
+    # Las columnas one-hot (Barrio_Palermo, ...) se suman a su variable original
+    out = {}
+    for col, v in zip(columnas, importancia):
+        base = next((c for c in esquema["categorias"] if col.startswith(f"{c}_")), col)
+        out[base] = out.get(base, 0.0) + float(v)
+    return pd.Series(out).sort_values(ascending=False)
+
+
+def _submuestra_bosque(model, max_arboles=SHAP_MAX_ARBOLES):
+    # La predicción de un bosque es el promedio de sus árboles y SHAP es lineal en el
+    # modelo: el SHAP de k árboles es un estimador insesgado del de todo el bosque.
+    # (No vale para boosting, donde los árboles se suman en secuencia.)
+    from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+    if not isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)) or len(model.estimators_) <= max_arboles:
+        return model
+    sub = copy.copy(model)
+    paso = len(model.estimators_) / max_arboles
+    sub.estimators_ = [model.estimators_[int(i * paso)] for i in range(max_arboles)]
+    sub.n_estimators = max_arboles
+    return sub
+
+
+def importancia_modelo(artefacto, df, max_filas=SHAP_MAX_FILAS_ARBOL, modelo_dir=MODELO_DIR):
+    """|SHAP| medio por variable del modelo entrenado (ml_model), con TreeExplainer sobre
+    hasta `max_filas` filas y SHAP_MAX_ARBOLES árboles. Se guarda en
+    `modelo_dir/shap_<version>.json`; si la versión y las filas son las mismas, se lee de ahí."""
+    from ml_model import codificar
+    esquema = artefacto["esquema"]
+    muestra = limitar_filas(df[esquema["numericas"] + list(esquema["categorias"])], max_filas)
+    clave = hashlib.sha256(pd.util.hash_pandas_object(muestra, index=False).values.tobytes()).hexdigest()
+    path = os.path.join(modelo_dir, f"shap_{artefacto['version']}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            guardado = json.load(f)
+        if guardado.get("clave") == clave:
+            return pd.Series(guardado["importancia"]).sort_values(ascending=False)
+
+    import shap  # ~4 s de import: sólo si no hay caché para esta versión
+    X = codificar(muestra, esquema)
+    X = X.toarray() if hasattr(X, "toarray") else X
+    model = artefacto["modelo"]
+    try:
+        # tree_path_dependent: no necesita fondo; costo lineal en filas y árboles explicados
+        valores = shap.TreeExplainer(_submuestra_bosque(model)).shap_values(X, check_additivity=False)
+    except Exception as e:
+        print(f"⚠️ TreeExplainer no soporta este modelo ({e}); se usa el explainer genérico con fondo resumido")
+        filas, _ = resumir_fondo(X)
+        valores = shap.Explainer(model.predict, filas)(X).values
+    importancia = _por_variable(esquema["columnas"], np.abs(valores).mean(axis=0), esquema)
+
+    os.makedirs(modelo_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": artefacto["version"], "clave": clave, "filas": len(muestra),
+                   "importancia": importancia.to_dict()}, f, indent=1, ensure_ascii=False)
+    return importancia
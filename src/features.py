@@ -2,8 +2,8 @@
 import pandas as pd
 import numpy as np
 
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
+def add_features(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    out = df.copy() if copy else df
 
     # m²: si no hay Sup. cubierta, dejamos NaN
     out["m2"] = out["Sup. cubierta"].replace(0, np.nan)
@@ -24,4 +24,15 @@ def add_features(df: pd.DataFrame) -> pd.DataFrame:
 
     # Log-precio (para análisis/ML)
     out["log_total"] = np.log1p(out["Total"])
+
+    # Barrio por coordenadas (gazetteer.py), en su propia columna. Sólo completa
+    # Barrio_simplificado (modelo, cubo, mapas) si los polígonos son límites oficiales:
+    # con el GeoJSON aproximado incluido puede errar por varias cuadras
+    if "lat" in out.columns and "lon" in out.columns and out["lat"].notna().any():
+        from gazetteer import gazetteer
+        gz = gazetteer()
+        out["Barrio_geo"] = gz.asignar(out["lat"], out["lon"])
+        if not gz.aproximado:
+            out["Barrio_simplificado"] = out["Barrio_simplificado"].astype(object).fillna(
+                pd.Series(out["Barrio_geo"], index=out.index))
     return out
@@ -0,0 +1,333 @@
+# gazetteer.py
+# Barrios de CABA como polígonos (un solo lugar para mapas y geolocalización):
+#   - carga un GeoJSON de barrios (por defecto el incluido, barrios_caba.geojson),
+#   - índice de grilla: las celdas que caen enteras dentro de un barrio se resuelven por
+#     tabla; sólo los puntos en celdas de borde pasan por point-in-polygon (vectorizado),
+#   - busca barrios por nombre con o sin acentos y con las subzonas de cleaning,
+#   - capas coropléticas de folium con la geometría ya preparada.
+#
+# El GeoJSON incluido es APROXIMADO: Voronoi de los centroides de los 48 barrios oficiales
+# recortado a un contorno simplificado de la ciudad (propiedad "fuente"). Sirve para mapas
+# y para asignar avisos cerca del centro de cada barrio; en los límites puede errar por
+# varias cuadras, así que con él Barrio_geo queda sólo como columna aparte y no completa
+# Barrio_simplificado (ver features.add_features y Gazetteer.aproximado). Para límites
+# oficiales, bajar el GeoJSON de barrios de data.buenosaires.gob.ar y apuntar
+# BARRIOS_GEOJSON a ese archivo (se lee la propiedad "nombre", "BARRIO" o "barrio").
+#   python src/gazetteer.py info
+#   python src/gazetteer.py generar   # regenera el GeoJSON aproximado
+import os, sys, json, argparse, unicodedata, re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from config import BARRIOS_GEOJSON, GAZETTEER_GRILLA
+
+_SRC = os.path.dirname(os.path.abspath(__file__))
+GEOJSON_INCLUIDO = os.path.join(_SRC, "barrios_caba.geojson")
+
+# (lat, lon) aproximados del centro de cada barrio oficial
+CENTROIDES = {
+    "Agronomía": (-34.593, -58.487), "Almagro": (-34.610, -58.420), "Balvanera": (-34.610, -58.402),
+    "Barracas": (-34.647, -58.379), "Belgrano": (-34.563, -58.459), "Boedo": (-34.630, -58.415),
+    "Caballito": (-34.616, -58.440), "Chacarita": (-34.588, -58.454), "Coghlan": (-34.560, -58.475),
+    "Colegiales": (-34.575, -58.449), "Constitución": (-34.626, -58.384), "Flores": (-34.635, -58.463),
+    "Floresta": (-34.628, -58.483), "La Boca": (-34.634, -58.363), "La Paternal": (-34.598, -58.469),
+    "Liniers": (-34.642, -58.522), "Mataderos": (-34.660, -58.505), "Monte Castro": (-34.619, -58.505),
+    "Monserrat": (-34.613, -58.380), "Nueva Pompeya": (-34.652, -58.417), "Núñez": (-34.544, -58.463),
+    "Palermo": (-34.578, -58.425), "Parque Avellaneda": (-34.647, -58.480),
+    "Parque Chacabuco": (-34.634, -58.437), "Parque Chas": (-34.585, -58.478),
+    "Parque Patricios": (-34.638, -58.400), "Puerto Madero": (-34.612, -58.362),
+    "Recoleta": (-34.589, -58.397), "Retiro": (-34.592, -58.375), "Saavedra": (-34.553, -58.487),
+    "San Cristóbal": (-34.624, -58.402), "San Nicolás": (-34.603, -58.381), "San Telmo": (-34.621, -58.372),
+    "Vélez Sarsfield": (-34.632, -58.492), "Versalles": (-34.630, -58.521), "Villa Crespo": (-34.599, -58.440),
+    "Villa del Parque": (-34.605, -58.492), "Villa Devoto": (-34.601, -58.512),
+    "Villa General Mitre": (-34.611, -58.469), "Villa Lugano": (-34.676, -58.472),
+    "Villa Luro": (-34.638, -58.503), "Villa Ortúzar": (-34.580, -58.468), "Villa Pueyrredón": (-34.580, -58.503),
+    "Villa Real": (-34.620, -58.525), "Villa Riachuelo": (-34.690, -58.468),
+    "Villa Santa Rita": (-34.615, -58.481), "Villa Soldati": (-34.665, -58.445),
+    "Villa Urquiza": (-34.573, -58.488),
+}
+
+# Contorno simplificado de la ciudad (lat, lon): costa del río, Riachuelo y General Paz
+CONTORNO = [
+    (-34.527, -58.460), (-34.535, -58.445), (-34.555, -58.420), (-34.570, -58.395), (-34.580, -58.375),
+    (-34.595, -58.360), (-34.605, -58.340), (-34.625, -58.335), (-34.635, -58.355), (-34.645, -58.370),
+    (-34.655, -58.385), (-34.660, -58.410), (-34.665, -58.430), (-34.680, -58.450), (-34.690, -58.460),
+    (-34.705, -58.462), (-34.690, -58.500), (-34.665, -58.530), (-34.635, -58.532), (-34.615, -58.531),
+    (-34.600, -58.525), (-34.585, -58.512), (-34.565, -58.502), (-34.545, -58.490), (-34.535, -58.475),
+]
+
+
+# Zonas informales que no son barrios oficiales ni subzonas de cleaning
+ALIAS = {"barrio norte": "Recoleta", "congreso": "Balvanera", "parque centenario": "Caballito",
+         "parque las heras": "Palermo", "microcentro": "San Nicolás", "tribunales": "San Nicolás"}
+
+
+def ruta_geojson(path=None):
+    """GeoJSON que usa el gazetteer: `path`, BARRIOS_GEOJSON o el incluido."""
+    return path or BARRIOS_GEOJSON or GEOJSON_INCLUIDO
+
+
+def clave_barrio(nombre):
+    """Nombre comparable: sin acentos, minúsculas y espacios simples."""
+    if not isinstance(nombre, str):
+        return None
+    s = "".join(c for c in unicodedata.normalize("NFKD", nombre) if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s.strip().lower()) or None
+
+
+# ---- Geometría
+def _recortar(poligono, a, b, c):
+    # Sutherland–Hodgman contra el semiplano a*x + b*y <= c
+    out = []
+    n = len(poligono)
+    for i in range(n):
+        p, q = poligono[i], poligono[(i + 1) % n]
+        fp, fq = a * p[0] + b * p[1] - c, a * q[0] + b * q[1] - c
+        if fp <= 0:
+            out.append(p)
+        if (fp < 0 < fq) or (fq < 0 < fp):
+            t = fp / (fp - fq)
+            out.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+    return out
+
+
+def voronoi_barrios(centroides=CENTROIDES, contorno=CONTORNO):
+    """FeatureCollection con la celda de Voronoi de cada centroide recortada al contorno.
+    Las distancias se miden en un plano local (lon escalada por cos(lat))."""
+    escala = np.cos(np.radians(np.mean([lat for lat, _ in contorno])))
+    plano = lambda lat, lon: (lon * escala, lat)
+    puntos = {n: plano(*ll) for n, ll in centroides.items()}
+    base = [plano(*ll) for ll in contorno]
+    features = []
+    for nombre, (px, py) in puntos.items():
+        celda = base
+        for otro, (qx, qy) in puntos.items():
+            if otro == nombre or not celda:
+                continue
+            # Más cerca de p que de q: (q - p)·x <= (|q|² - |p|²) / 2
+            celda = _recortar(celda, qx - px, qy - py, (qx * qx + qy * qy - px * px - py * py) / 2)
+        anillo = [[round(x / escala, 6), round(y, 6)] for x, y in celda]
+        anillo.append(anillo[0])
+        features.append({"type": "Feature", "properties": {"nombre": nombre, "fuente": "aproximado (Voronoi)"},
+                         "geometry": {"type": "Polygon", "coordinates": [anillo]}})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _anillos(geometria):
+    # Todos los anillos (exteriores y agujeros) como arrays (n, 2) de (lon, lat)
+    if geometria["type"] == "Polygon":
+        poligonos = [geometria["coordinates"]]
+    elif geometria["type"] == "MultiPolygon":
+        poligonos = geometria["coordinates"]
+    else:
+        raise ValueError(f"Geometría no soportada: {geometria['type']}")
+    return [np.asarray(anillo, dtype=np.float64)[:, :2] for pol in poligonos for anillo in pol]
+
+
+def _dentro(x, y, anillos):
+    """Par/impar (ray casting) de los puntos (x, y) contra todos los anillos de un barrio:
+    un loop por arista, vectorizado sobre los puntos; los agujeros se restan solos."""
+    dentro = np.zeros(len(x), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for anillo in anillos:
+            x0, y0, x1, y1 = anillo[:-1, 0], anillo[:-1, 1], anillo[1:, 0], anillo[1:, 1]
+            for a, b, c, d in zip(x0, y0, x1, y1):
+                cruza = (b > y) != (d > y)
+                dentro ^= cruza & (x < (c - a) * (y - b) / (d - b) + a)
+    return dentro
+
+
+class Gazetteer:
+    """Polígonos de barrios + índice de grilla para asignar coordenadas a barrios."""
+
+    def __init__(self, path=None, grilla=GAZETTEER_GRILLA):
+        self.path = ruta_geojson(path)
+        with open(self.path, encoding="utf-8") as f:
+            self.geojson = json.load(f)
+        self.nombres, self.anillos = [], []
+        for feat in self.geojson["features"]:
+            props = feat.get("properties") or {}
+            nombre = props.get("nombre") or props.get("BARRIO") or props.get("barrio")
+            self.nombres.append(str(nombre).title() if str(nombre).isupper() else str(nombre))
+            self.anillos.append(_anillos(feat["geometry"]))
+        self.fuente = (self.geojson["features"][0].get("properties") or {}).get("fuente", "GeoJSON") \
+            if self.geojson["features"] else "GeoJSON"
+        self.aproximado = self.fuente.startswith("aproximado")  # el Voronoi de voronoi_barrios()
+        self._claves = {clave_barrio(n): i for i, n in enumerate(self.nombres)}
+        self._buscados = {}     # nombre → índice (buscar se llama con los mismos textos siempre)
+        self._base = None       # features de la capa sin propiedades (ver capa)
+        self._indexar(grilla)
+
+    # ---- Índice
+    def _celda(self, x, y):
+        cx = np.floor((x - self.x0) / self.dx).astype(np.int64)
+        cy = np.floor((y - self.y0) / self.dy).astype(np.int64)
+        fuera = (cx < 0) | (cy < 0) | (cx >= self.n) | (cy >= self.n)
+        return np.where(fuera, -1, cx * self.n + cy)
+
+    def _indexar(self, n):
+        todos = np.vstack([a for anillos in self.anillos for a in anillos])
+        self.x0, self.y0 = todos.min(axis=0)
+        x1, y1 = todos.max(axis=0)
+        self.n = n
+        self.dx, self.dy = (x1 - self.x0) / n * (1 + 1e-9), (y1 - self.y0) / n * (1 + 1e-9)
+        # Celdas de borde: las que toca el bounding box de alguna arista (de más, nunca de menos).
+        # Por barrio, máscara de las celdas de borde que toca
+        self.bordes_de = np.zeros((len(self.anillos), n * n), dtype=bool)
+        origen, celda = np.array([self.x0, self.y0]), np.array([self.dx, self.dy])
+        for i, anillos in enumerate(self.anillos):
+            for a in anillos:
+                # Aristas largas partidas en tramos de a lo sumo una celda: el bbox de cada tramo
+                # sigue a la arista y no marca de borde todo el rectángulo que la contiene
+                pasos = np.maximum(np.ceil(np.abs(np.diff(a, axis=0)) / celda).max(axis=1), 1).astype(int)
+                t = np.concatenate([np.arange(k) / k for k in pasos])
+                ini = np.repeat(a[:-1], pasos, axis=0)
+                pts = ini + t[:, None] * np.repeat(np.diff(a, axis=0), pasos, axis=0)
+                sig = np.vstack([pts[1:], a[-1:]])
+                c0 = np.floor((np.minimum(pts, sig) - origen) / celda).astype(np.int64)
+                c1 = np.floor((np.maximum(pts, sig) - origen) / celda).astype(np.int64)
+                # Cada tramo cubre pocas celdas por eje: un paso por desplazamiento dentro del bbox
+                alto = int((c1 - c0).max()) + 1
+                for ox in range(alto):
+                    for oy in range(alto):
+                        cx, cy = c0[:, 0] + ox, c0[:, 1] + oy
+                        ok = (cx <= c1[:, 0]) & (cy <= c1[:, 1]) & (cx >= 0) & (cy >= 0) & (cx < n) & (cy < n)
+                        self.bordes_de[i, cx[ok] * n + cy[ok]] = True
+        borde = self.bordes_de.any(axis=0)
+        # Celdas interiores: su centro decide el barrio de toda la celda (-1 = fuera de la ciudad)
+        self.tabla = np.full(n * n, -1, dtype=np.int64)
+        interiores = np.flatnonzero(~borde)
+        cx, cy = (interiores // n + 0.5) * self.dx + self.x0, (interiores % n + 0.5) * self.dy + self.y0
+        for i, anillos in enumerate(self.anillos):
+            # Sólo los centros dentro del bounding box del barrio pasan por point-in-polygon
+            todos = np.vstack(anillos)
+            (x0, y0), (x1, y1) = todos.min(axis=0), todos.max(axis=0)
+            cerca = np.flatnonzero((cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1))
+            self.tabla[interiores[cerca[_dentro(cx[cerca], cy[cerca], anillos)]]] = i
+        self.tabla[borde] = -2  # -2: hay que mirar los polígonos
+
+    # ---- Asignación
+    def indices(self, lat, lon):
+        """Índice del barrio de cada punto (-1 si cae fuera o no tiene coordenadas)."""
+        x, y = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+        ok = np.isfinite(x) & np.isfinite(y)
+        celda = np.full(len(x), -1, dtype=np.int64)
+        celda[ok] = self._celda(x[ok], y[ok])
+        res = np.where(celda >= 0, self.tabla[np.maximum(celda, 0)], -1)
+        pendientes = np.flatnonzero(res == -2)
+        res[pendientes] = -1
+        # Puntos en celdas de borde: point-in-polygon sólo contra los barrios que tocan su celda
+        for i, mascara in enumerate(self.bordes_de):
+            puntos = pendientes[mascara[celda[pendientes]]]
+            libres = puntos[res[puntos] == -1]
+            if len(libres):
+                res[libres[_dentro(x[libres], y[libres], self.anillos[i])]] = i
+        return res
+
+    def asignar(self, lat, lon):
+        """Nombre del barrio de cada punto (NaN si cae fuera o no tiene coordenadas)."""
+        idx = self.indices(lat, lon)
+        nombres = np.array(self.nombres + [np.nan], dtype=object)
+        return nombres[np.where(idx >= 0, idx, len(self.nombres))]
+
+    # ---- Nombres
+    def buscar(self, nombre):
+        """Índice del barrio por nombre (con o sin acentos, o una subzona conocida) o None."""
+        if not isinstance(nombre, str):
+            return None
+        if nombre not in self._buscados:
+            self._buscados[nombre] = self._buscar(nombre)
+        return self._buscados[nombre]
+
+    def _buscar(self, nombre):
+        from cleaning import _canonicalize
+        # El nombre entero y, si viene como "Subzona, Barrio", cada parte
+        for parte in [nombre] + [p for p in nombre.split(",")[::-1] if p.strip()]:
+            clave = clave_barrio(parte)
+            for candidato in (clave, clave_barrio(ALIAS.get(clave)), clave_barrio(_canonicalize(parte))):
+                if candidato in self._claves:
+                    return self._claves[candidato]
+        return None
+
+    def oficial(self, barrios):
+        """Series de nombres (texto del aviso, subzonas, sin acentos...) → nombre del barrio del
+        gazetteer (NaN si no corresponde a ninguno). Se resuelve una vez por valor distinto."""
+        barrios = pd.Series(barrios)
+        unicos = barrios.dropna().unique()
+        mapa = {b: self.nombres[i] for b in unicos if (i := self.buscar(str(b))) is not None}
+        return barrios.map(mapa).astype(object)
+
+    def centroide(self, nombre):
+        """(lat, lon) del centroide (área) del barrio, o None si no está."""
+        i = self.buscar(nombre)
+        if i is None:
+            return None
+        a = self.anillos[i][0]
+        x, y = a[:, 0], a[:, 1]
+        cruz = x[:-1] * y[1:] - x[1:] * y[:-1]
+        area = cruz.sum() / 2
+        return ((y[:-1] + y[1:]) * cruz).sum() / (6 * area), ((x[:-1] + x[1:]) * cruz).sum() / (6 * area)
+
+    # ---- Mapas
+    def capa(self, valores, color, tooltip=None, popup=None, nombre="Barrios"):
+        """folium.GeoJson con un polígono por barrio de `valores` (Series barrio → valor;
+        los barrios del gazetteer sin valor también se dibujan, con valor NaN).
+        color(valor) → color de relleno; tooltip/popup(barrio, valor) → texto/HTML.
+        Devuelve (capa, barrios de `valores` que no están en el gazetteer)."""
+        import folium
+        if self._base is None:
+            # Una vez por gazetteer (y gazetteer() es uno por proceso): cada capa sólo agrega
+            # las propiedades y comparte las geometrías
+            self._base = [{"type": "Feature", "geometry": f["geometry"]} for f in self.geojson["features"]]
+        indices = [self.buscar(b) for b in valores.index]
+        presentes = set(indices)
+        sin_valor = [(n, i) for i, n in enumerate(self.nombres) if i not in presentes]
+        features, faltan = [], []
+        for (barrio, i), v in zip(list(zip(valores.index, indices)) + sin_valor,
+                                  list(valores.to_numpy()) + [np.nan] * len(sin_valor)):
+            if i is None:
+                faltan.append(barrio)
+                continue
+            props = {"nombre": str(barrio), "color": color(v),
+                     "tooltip": tooltip(barrio, v) if tooltip else str(barrio),
+                     "popup": popup(barrio, v) if popup else ""}
+            features.append({**self._base[i], "properties": props})
+        capa = folium.GeoJson(
+            {"type": "FeatureCollection", "features": features}, name=nombre,
+            style_function=lambda f: {"fillColor": f["properties"]["color"], "color": "#555", "weight": 1,
+                                      "fillOpacity": 0.7},
+            tooltip=folium.GeoJsonTooltip(fields=["tooltip"], labels=False),
+            popup=folium.GeoJsonPopup(fields=["popup"], labels=False) if popup else None)
+        return capa, faltan
+
+
+@lru_cache(maxsize=4)
+def gazetteer(path=None):
+    """Gazetteer cacheado por archivo (el índice se arma una vez por proceso)."""
+    return Gazetteer(path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gazetteer de barrios de CABA")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info", help="barrios, fuente y tamaño del índice")
+    g = sub.add_parser("generar", help="regenerar el GeoJSON aproximado (Voronoi de centroides)")
+    g.add_argument("--salida", default=GEOJSON_INCLUIDO)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "generar":
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(voronoi_barrios(), f, ensure_ascii=False)
+        print(f"🗺️ {len(CENTROIDES)} barrios (aproximados) → {args.salida}")
+        return 0
+    gz = gazetteer()
+    bordes = int((gz.tabla == -2).sum())
+    print(f"🗺️ {len(gz.nombres)} barrios de {gz.path} ({gz.fuente})")
+    if gz.aproximado:
+        print("   ⚠️ límites aproximados: Barrio_geo no completa Barrio_simplificado (ver BARRIOS_GEOJSON)")
+    print(f"   grilla {gz.n}x{gz.n}: {bordes} celdas de borde, {int((gz.tabla >= 0).sum())} interiores")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
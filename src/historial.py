@@ -0,0 +1,396 @@
+# historial.py
+# Historia de los scrapes. Cada scrape agrega una partición Parquet por fecha (nunca se
+# reescribe) con una fila por aviso, identificado por el número de su Link:
+#   output/historial/snapshots/fecha=2026-10-18/snapshot.parquet
+# Un job incremental lee sólo las particiones posteriores a la última procesada y mantiene:
+#   estado/     una fila por aviso visto alguna vez (primera y última fecha, precio inicial
+#               y actual, cambios, activo); la partición es la última fecha procesada,
+#   eventos/    altas, cambios de precio (con su delta), bajas (con los días publicado) y
+#               reapariciones, con su fecha,
+#   agregados/  por fecha y barrio (y "CABA"): avisos, cuantiles de Total y precio/m²,
+#               altas, bajas, cambios y elasticidad precio–m² con su IC. Las series salen
+#               de acá sin tocar los snapshots,
+#   cubo/       el cubo de agregados (cubo.py) de cada fecha: barrio × ambientes × antigüedad.
+# eventos, agregados y cubo se particionan por mes (mes=2026-10). Cada fecha procesada escribe
+# su propio archivo (mes=2026-10/fecha=2026-10-18.parquet): nunca se reescribe lo de otros días
+# y re-procesar una fecha pisa sólo la suya. Al cerrar un mes (se procesa una fecha del
+# siguiente) sus días se compactan una vez en mes=2026-10/agregado.parquet (evento.parquet,
+# cubo.parquet), así una consulta de un año abre 12 archivos y no 365.
+#
+#   python src/historial.py agregar output/data/caba_duplicados.parquet --fecha 2026-10-18
+#   python src/historial.py actualizar
+#   python src/historial.py serie Palermo Belgrano --desde 2026-01-01
+#   python src/historial.py aviso 18323278
+#   python src/historial.py reconstruir      (rehace estado/eventos/agregados desde los snapshots)
+import os, sys, shutil, argparse
+from datetime import date
+import numpy as np
+import pandas as pd
+from config import HISTORIAL_DIR, HISTORIAL_CAMBIO_MIN, DATASET_COMPRESION, DATASET_ROW_GROUP
+
+SNAPSHOTS, ESTADO, EVENTOS, AGREGADOS, CUBO = "snapshots", "estado", "eventos", "agregados", "cubo"
+CIUDAD = "CABA"
+TIPOS = ["alta", "cambio", "baja", "reaparicion"]
+COLUMNAS = ["id", "Link", "barrio", "Moneda", "precio", "precio_publicado", "expensas", "Total", "m2",
+            "precio_m2", "expensas_ratio", "Ambientes", "Dormitorios", "Antig_binned", "lat", "lon",
+            "cotizacion_usd", "cluster_dup", "es_canonica"]
+
+
+def id_aviso(links):
+    """Número de aviso al final del Link (…-alquiler--18323278) como int64; para links sin
+    número, un hash negativo del Link."""
+    links = pd.Series(links, dtype=object).astype(str)
+    num = pd.to_numeric(links.str.extract(r"(\d+)/?(?:[?#].*)?$")[0], errors="coerce")
+    h = (pd.util.hash_array(links.to_numpy(dtype=object)) >> np.uint64(2)).astype(np.int64)
+    return np.where(num.notna(), num.fillna(0), -h - 1).astype(np.int64)
+
+
+_CLAVE = {SNAPSHOTS: "fecha", ESTADO: "fecha", EVENTOS: "mes", AGREGADOS: "mes", CUBO: "mes"}
+
+
+def _particion(directorio, sub, valor):
+    return os.path.join(directorio, sub, f"{_CLAVE[sub]}={valor}", f"{sub.rstrip('s')}.parquet")
+
+
+def fechas(directorio=HISTORIAL_DIR, sub=SNAPSHOTS):
+    """Valores de partición de `sub` (fechas AAAA-MM-DD, o meses AAAA-MM), ordenados."""
+    raiz = os.path.join(directorio, sub)
+    if not os.path.isdir(raiz):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(raiz) if d.startswith(f"{_CLAVE[sub]}="))
+
+
+def _escribir(df, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), f"{path}.parcial",
+                   compression=DATASET_COMPRESION, row_group_size=DATASET_ROW_GROUP)
+    os.replace(f"{path}.parcial", path)
+    return path
+
+
+def _guardar_dia(df, directorio, sub, fecha):
+    # Archivo propio de `fecha` dentro de su mes: re-procesar el día lo pisa, no lo duplica
+    path = os.path.join(directorio, sub, f"mes={fecha[:7]}", f"fecha={fecha}.parquet")
+    return _escribir(df.assign(fecha=fecha), path)
+
+
+def _archivos(directorio, sub):
+    # Archivos vigentes de `sub`: por mes, el compactado si existe y si no los de cada día
+    out = []
+    for mes in fechas(directorio, sub):
+        d = os.path.join(directorio, sub, f"mes={mes}")
+        compacto = _particion(directorio, sub, mes)
+        out += [compacto] if os.path.exists(compacto) else \
+            sorted(os.path.join(d, f) for f in os.listdir(d) if f.startswith("fecha=") and f.endswith(".parquet"))
+    return out
+
+
+def _compactar(directorio, sub, hasta_mes):
+    # Une en un archivo los días de cada mes anterior a `hasta_mes`. Mientras existe el
+    # compactado se ignoran los diarios, así que un corte entre escribir y borrar no duplica
+    for mes in fechas(directorio, sub):
+        if mes >= hasta_mes:
+            continue
+        d = os.path.join(directorio, sub, f"mes={mes}")
+        dias = sorted(f for f in os.listdir(d) if f.startswith("fecha=") and f.endswith(".parquet"))
+        if not dias:
+            continue
+        compacto = _particion(directorio, sub, mes)
+        if not os.path.exists(compacto):
+            _escribir(pd.concat([pd.read_parquet(os.path.join(d, f)) for f in dias], ignore_index=True), compacto)
+        for f in dias:
+            os.remove(os.path.join(d, f))
+
+
+def _texto(s):
+    return s.astype(object).where(s.notna(), None)
+
+
+def snapshot(df, cotizacion_usd=1350):
+    """Filas del historial de un dataset con features (o con dedup): una por aviso, por id."""
+    from gazetteer import gazetteer
+    df = df[df["Link"].notna()]
+    col = "Barrio_simplificado" if "Barrio_simplificado" in df.columns else "Barrio"
+    s = pd.DataFrame({"id": id_aviso(df["Link"]), "Link": df["Link"].astype(str).to_numpy(),
+                      "barrio": gazetteer().oficial(df[col].to_numpy()).to_numpy()})
+    for c in COLUMNAS[3:]:
+        if c in df.columns:
+            s[c] = _texto(df[c]).to_numpy() if c in ("Moneda", "Antig_binned") else df[c].to_numpy()
+    usd = s["Moneda"].astype(str).str.contains("USD", case=False).to_numpy() if "Moneda" in s else False
+    # Precio en la moneda del aviso: un cambio de cotización no es un cambio de precio
+    s["precio_publicado"] = np.where(usd, s["precio"] / cotizacion_usd, s["precio"])
+    s["cotizacion_usd"] = float(cotizacion_usd)
+    s = s[[c for c in COLUMNAS if c in s.columns]]
+    return s.drop_duplicates("id", keep="last").sort_values("id").reset_index(drop=True)
+
+
+def agregar_snapshot(df, fecha=None, cotizacion_usd=1350, directorio=HISTORIAL_DIR):
+    """Guarda el snapshot de `df` para `fecha` (hoy si no se indica). Las particiones no se
+    reescriben: si ya hay un snapshot de esa fecha se deja el existente y devuelve None."""
+    fecha = fecha or date.today().isoformat()
+    fecha = date.fromisoformat(fecha).isoformat()
+    path = _particion(directorio, SNAPSHOTS, fecha)
+    if os.path.exists(path):
+        print(f"⚠️ Ya hay un snapshot del {fecha} en el historial; no se reescribe")
+        return None
+    s = snapshot(df, cotizacion_usd)
+    _escribir(s, path)
+    print(f"🗂️ Historial: snapshot del {fecha} con {len(s)} avisos → {path}")
+    return path
+
+
+# ---------------------------------------------------------------- job incremental
+
+_ESTADO_VACIO = {"id": "int64", "barrio": object, "Moneda": object, "m2": "float64", "primera": object,
+                 "ultima": object, "precio_inicial": "float64", "precio": "float64", "Total": "float64",
+                 "cambios": "int64", "reapariciones": "int64", "activo": bool}
+
+
+def _cargar_estado(directorio):
+    # (estado, última fecha procesada) o (vacío, None)
+    hechas = fechas(directorio, ESTADO)
+    if not hechas:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in _ESTADO_VACIO.items()}), None
+    return pd.read_parquet(_particion(directorio, ESTADO, hechas[-1])), hechas[-1]
+
+
+def _guardar_estado(estado, fecha, directorio):
+    # Se escribe el nuevo y después se borra el anterior: un corte deja siempre uno válido
+    _escribir(estado, _particion(directorio, ESTADO, fecha))
+    for f in fechas(directorio, ESTADO):
+        if f < fecha:
+            shutil.rmtree(os.path.join(directorio, ESTADO, f"fecha={f}"))
+
+
+def _dias(desde, hasta):
+    return (pd.to_datetime(pd.Series(hasta)) - pd.to_datetime(pd.Series(desde))).dt.days.to_numpy()
+
+
+def _avanzar(estado, snap, fecha):
+    # Estado tras el snapshot de `fecha` y sus eventos; sólo mira el estado y ese snapshot
+    pos = pd.Index(estado["id"]).get_indexer(snap["id"])
+    visto = pos >= 0
+    p, s = pos[visto], snap[visto]
+    antes = estado.iloc[p]
+
+    precio, total = s["precio_publicado"].to_numpy(), s["Total"].to_numpy()
+    misma = (antes["Moneda"].to_numpy() == s["Moneda"].to_numpy())
+    # Delta en la moneda del aviso; si cambió de moneda, sobre el Total en pesos
+    ref_antes = np.where(misma, antes["precio"].to_numpy(), antes["Total"].to_numpy())
+    ref_ahora = np.where(misma, precio, total)
+    delta = (ref_ahora - ref_antes) / ref_antes
+    cambio = np.abs(delta) > HISTORIAL_CAMBIO_MIN   # NaN compara False
+    reaparece = ~antes["activo"].to_numpy(dtype=bool)
+    baja = estado["activo"].to_numpy(dtype=bool).copy()
+    baja[p] = False                                 # activos que no están en el snapshot
+
+    nuevos = snap[~visto]
+    eventos = pd.concat([
+        pd.DataFrame({"id": nuevos["id"], "tipo": "alta", "barrio": nuevos["barrio"],
+                      "precio_antes": np.nan, "precio_despues": nuevos["precio_publicado"],
+                      "delta_pct": np.nan, "dias": 0}),
+        pd.DataFrame({"id": s["id"].to_numpy()[cambio], "tipo": "cambio", "barrio": s["barrio"].to_numpy()[cambio],
+                      "precio_antes": antes["precio"].to_numpy()[cambio], "precio_despues": precio[cambio],
+                      "delta_pct": 100 * delta[cambio],
+                      "dias": _dias(antes["primera"].to_numpy()[cambio], [fecha] * int(cambio.sum()))}),
+        pd.DataFrame({"id": estado["id"].to_numpy()[baja], "tipo": "baja", "barrio": estado["barrio"].to_numpy()[baja],
+                      "precio_antes": estado["precio"].to_numpy()[baja], "precio_despues": np.nan,
+                      "delta_pct": np.nan,
+                      "dias": _dias(estado["primera"].to_numpy()[baja], estado["ultima"].to_numpy()[baja])}),
+        pd.DataFrame({"id": s["id"].to_numpy()[reaparece], "tipo": "reaparicion",
+                      "barrio": s["barrio"].to_numpy()[reaparece], "precio_antes": antes["precio"].to_numpy()[reaparece],
+                      "precio_despues": precio[reaparece], "delta_pct": 100 * delta[reaparece],
+                      "dias": _dias(antes["ultima"].to_numpy()[reaparece], [fecha] * int(reaparece.sum()))}),
+    ], ignore_index=True)
+    eventos["tipo"] = pd.Categorical(eventos["tipo"], categories=TIPOS)
+    eventos["barrio"] = _texto(eventos["barrio"])
+    eventos["dias"] = eventos["dias"].astype("int64")
+
+    estado = estado.copy()
+    estado.loc[baja, "activo"] = False
+    for c, v in (("barrio", s["barrio"]), ("Moneda", s["Moneda"]), ("m2", s["m2"]), ("precio", s["precio_publicado"]),
+                 ("Total", s["Total"])):
+        estado.iloc[p, estado.columns.get_loc(c)] = v.to_numpy()
+    estado.iloc[p, estado.columns.get_loc("ultima")] = fecha
+    estado.iloc[p, estado.columns.get_loc("activo")] = True
+    estado.iloc[p, estado.columns.get_loc("cambios")] = antes["cambios"].to_numpy() + cambio
+    estado.iloc[p, estado.columns.get_loc("reapariciones")] = antes["reapariciones"].to_numpy() + reaparece
+    altas = pd.DataFrame({"id": nuevos["id"], "barrio": nuevos["barrio"], "Moneda": nuevos["Moneda"],
+                          "m2": nuevos["m2"], "primera": fecha, "ultima": fecha,
+                          "precio_inicial": nuevos["precio_publicado"], "precio": nuevos["precio_publicado"],
+                          "Total": nuevos["Total"], "cambios": 0, "reapariciones": 0, "activo": True})
+    estado = pd.concat([estado, altas], ignore_index=True) if len(estado) else altas.reset_index(drop=True)
+    return estado.astype(_ESTADO_VACIO), eventos
+
+
+def _canonicas(snap):
+    # Filas con barrio y sin re-publicaciones (dedup), la base de agregados y cubo
+    base = snap[snap["barrio"].notna()]
+    if "es_canonica" in base.columns:
+        base = base[base["es_canonica"].fillna(True).astype(bool)]
+    return base
+
+
+def _agregados(snap, eventos):
+    # Métricas por barrio (y para toda la ciudad) de un snapshot y sus eventos
+    from regresion import elasticidades
+    base = _canonicas(snap)
+    base = pd.concat([base, base.assign(barrio=CIUDAD)], ignore_index=True)
+    g = base.groupby("barrio", sort=True)
+    q = g["Total"].quantile([0.25, 0.5, 0.75]).unstack()
+    out = pd.DataFrame({"avisos": g.size(), "total_p25": q[0.25], "total_mediana": q[0.5], "total_p75": q[0.75],
+                        "total_media": g["Total"].mean(), "precio_m2_mediana": g["precio_m2"].median()})
+    ev = eventos[eventos["barrio"].notna()]
+    ev = pd.concat([ev, ev.assign(barrio=CIUDAD)], ignore_index=True)
+    conteos = pd.crosstab(ev["barrio"], ev["tipo"]).reindex(columns=TIPOS, fill_value=0)
+    for t, c in zip(TIPOS, ["altas", "cambios", "bajas", "reapariciones"]):
+        out[c] = conteos[t].reindex(out.index).fillna(0).astype("int64") if len(conteos) else 0
+    cambios = ev[ev["tipo"] == "cambio"].groupby("barrio")["delta_pct"]
+    out["subas"] = cambios.apply(lambda d: int((d > 0).sum())).reindex(out.index).fillna(0).astype("int64")
+    out["cambio_pct_mediana"] = cambios.median().reindex(out.index)
+    out["dias_baja_mediana"] = ev[ev["tipo"] == "baja"].groupby("barrio")["dias"].median().reindex(out.index)
+    # Elasticidad precio–m² de cada barrio en este snapshot (todos los barrios de una vez)
+    el = elasticidades(base, por="barrio")
+    out["elasticidad"] = el["pendiente"].reindex(out.index)
+    out["elasticidad_ic_bajo"] = el["ic_bajo"].reindex(out.index)
+    out["elasticidad_ic_alto"] = el["ic_alto"].reindex(out.index)
+    return out.rename_axis("barrio").reset_index()
+
+
+def actualizar(directorio=HISTORIAL_DIR):
+    """Procesa los snapshots posteriores al último estado; devuelve las fechas procesadas."""
+    from cubo import Cubo
+    estado, ultima = _cargar_estado(directorio)
+    todas = fechas(directorio, SNAPSHOTS)
+    hechas = set(_leer(directorio, AGREGADOS, ["fecha"])["fecha"].dt.strftime("%Y-%m-%d")) if ultima else set()
+    tarde = [f for f in todas if ultima is not None and f < ultima and f not in hechas]
+    if tarde:
+        print(f"⚠️ Snapshots anteriores al estado ({', '.join(tarde)}): se incorporan con `reconstruir`")
+    nuevas = [f for f in todas if ultima is None or f > ultima]
+    for fecha in nuevas:
+        snap = pd.read_parquet(_particion(directorio, SNAPSHOTS, fecha))
+        estado, eventos = _avanzar(estado, snap, fecha)
+        _guardar_dia(eventos, directorio, EVENTOS, fecha)
+        _guardar_dia(_agregados(snap, eventos), directorio, AGREGADOS, fecha)
+        _guardar_dia(Cubo.desde_filas(_canonicas(snap), fecha).datos, directorio, CUBO, fecha)
+        _guardar_estado(estado, fecha, directorio)
+        for sub in (EVENTOS, AGREGADOS, CUBO):
+            _compactar(directorio, sub, fecha[:7])
+        n = eventos["tipo"].value_counts()
+        print(f"🗂️ Historial {fecha}: {n['alta']} altas, {n['cambio']} cambios de precio, {n['baja']} bajas, "
+              f"{n['reaparicion']} reapariciones ({int(estado['activo'].sum())} activos)")
+    return nuevas
+
+
+def reconstruir(directorio=HISTORIAL_DIR):
+    """Borra estado, eventos y agregados y los rehace desde todos los snapshots."""
+    for sub in (ESTADO, EVENTOS, AGREGADOS, CUBO):
+        shutil.rmtree(os.path.join(directorio, sub), ignore_errors=True)
+    return actualizar(directorio)
+
+
+# ---------------------------------------------------------------- consultas
+
+def _dataset(directorio, sub):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    raiz = os.path.join(directorio, sub)
+    archivos = _archivos(directorio, sub) if _CLAVE[sub] == "mes" else raiz
+    return ds.dataset(archivos, format="parquet", partition_base_dir=raiz,
+                      partitioning=ds.partitioning(pa.schema([(_CLAVE[sub], pa.string())]), flavor="hive"))
+
+
+def _leer(directorio, sub, columnas=None, desde=None, hasta=None, **iguales):
+    import pyarrow.dataset as ds
+    if not fechas(directorio, sub):
+        return pd.DataFrame(columns=["fecha"] + list(columnas or []))
+    filtro, clave = ds.scalar(True), _CLAVE[sub]
+    if desde:
+        desde = date.fromisoformat(desde).isoformat()
+        filtro &= ds.field(clave) >= (desde[:7] if clave == "mes" else desde)  # poda de particiones
+        filtro &= ds.field("fecha") >= desde
+    if hasta:
+        hasta = date.fromisoformat(hasta).isoformat()
+        filtro &= ds.field(clave) <= (hasta[:7] if clave == "mes" else hasta)
+        filtro &= ds.field("fecha") <= hasta
+    for c, v in iguales.items():
+        if v is not None:
+            filtro &= ds.field(c).isin(list(v)) if isinstance(v, (list, tuple, set)) else ds.field(c) == v
+    df = _dataset(directorio, sub).to_table(columns=columnas, filter=filtro).to_pandas()
+    df = df.drop(columns="mes", errors="ignore")
+    df["fecha"] = pd.to_datetime(df["fecha"])
+    return df.sort_values(["fecha"], kind="stable").reset_index(drop=True)
+
+
+def serie(barrios=None, desde=None, hasta=None, metricas=None, directorio=HISTORIAL_DIR):
+    """Serie diaria por barrio desde los agregados: columnas fecha, barrio y métricas
+    (avisos, total_mediana, precio_m2_mediana, altas, bajas, cambios, ...). `barrios`: uno,
+    una lista o None (todos, incluido "CABA"); los nombres pasan por el gazetteer."""
+    if isinstance(barrios, str):
+        barrios = [barrios]
+    if barrios is not None:
+        from gazetteer import gazetteer
+        oficiales = gazetteer().oficial(barrios)
+        barrios = [b if b == CIUDAD or pd.isna(o) else o for b, o in zip(barrios, oficiales)]
+    columnas = None if metricas is None else ["fecha", "barrio"] + list(metricas)
+    df = _leer(directorio, AGREGADOS, columnas, desde, hasta, barrio=barrios)
+    return df.sort_values(["barrio", "fecha"]).reset_index(drop=True)
+
+
+def cubo(desde=None, hasta=None, barrios=None, directorio=HISTORIAL_DIR):
+    """Cubo de agregados (cubo.py) de las fechas pedidas; la fecha es una dimensión más."""
+    from cubo import Cubo
+    return Cubo(_leer(directorio, CUBO, None, desde, hasta, barrio=barrios))
+
+
+def historia_aviso(id_o_link, directorio=HISTORIAL_DIR):
+    """Eventos de un aviso (por id o Link), en orden de fecha."""
+    pid = int(id_aviso([id_o_link])[0]) if not str(id_o_link).lstrip("-").isdigit() else int(id_o_link)
+    return _leer(directorio, EVENTOS, id=pid)
+
+
+def estado_actual(directorio=HISTORIAL_DIR):
+    """Una fila por aviso visto (última fecha procesada) con `dias` publicado."""
+    estado, _ = _cargar_estado(directorio)
+    return estado.assign(dias=_dias(estado["primera"], estado["ultima"]))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Historial de snapshots por fecha")
+    ap.add_argument("--dir", default=HISTORIAL_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("agregar", help="agregar un dataset con features como snapshot de una fecha")
+    a.add_argument("entrada")
+    a.add_argument("--fecha", help="AAAA-MM-DD (por defecto hoy)")
+    a.add_argument("--cotizacion", type=float, default=1350, help="ARS por USD usada en la limpieza")
+    sub.add_parser("actualizar", help="procesar los snapshots nuevos")
+    sub.add_parser("reconstruir", help="rehacer estado, eventos y agregados desde cero")
+    s = sub.add_parser("serie", help="serie diaria de uno o más barrios")
+    s.add_argument("barrios", nargs="*", help=f"barrios (vacío: {CIUDAD})")
+    s.add_argument("--desde")
+    s.add_argument("--hasta")
+    s.add_argument("--metricas", default="avisos,total_mediana,precio_m2_mediana,altas,bajas,cambios")
+    v = sub.add_parser("aviso", help="eventos de un aviso")
+    v.add_argument("aviso", help="número de aviso o Link")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "agregar":
+        from dataset import cargar_dataset
+        agregar_snapshot(cargar_dataset(args.entrada), args.fecha, args.cotizacion, args.dir)
+        actualizar(args.dir)
+    elif args.cmd == "actualizar":
+        actualizar(args.dir)
+    elif args.cmd == "reconstruir":
+        reconstruir(args.dir)
+    elif args.cmd == "serie":
+        df = serie(args.barrios or [CIUDAD], args.desde, args.hasta, args.metricas.split(","), args.dir)
+        print(df.to_string(index=False))
+    else:
+        print(historia_aviso(args.aviso, args.dir).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
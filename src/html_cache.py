@@ -0,0 +1,99 @@
+# html_cache.py
+# Caché en disco del HTML crudo de cada página bajada: objetos comprimidos y
+# direccionados por contenido (sha256), indexados por URL y fecha de fetch,
+# con desalojo por tamaño. Sirve para re-parsear offline (modo "replay").
+import os, gzip, time, hashlib, sqlite3, threading
+from config import HTML_CACHE_MAX_MB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paginas (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    url_final TEXT,
+    tipo TEXT NOT NULL,            -- listado | detalle
+    hash TEXT NOT NULL,
+    PRIMARY KEY (url, fetched_at)
+);
+CREATE TABLE IF NOT EXISTS objetos (
+    hash TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    ultimo_uso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_paginas_tipo ON paginas(tipo, url, fetched_at);
+"""
+
+
+class HtmlCache:
+    def __init__(self, root, max_mb=HTML_CACHE_MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.join(root, "objetos"), exist_ok=True)
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(_SCHEMA)
+        self._total = self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM objetos").fetchone()[0]
+
+    def _path(self, h):
+        return os.path.join(self.root, "objetos", h[:2], f"{h}.html.gz")
+
+    def put(self, url, html, url_final=None, tipo="detalle"):
+        """Guarda el HTML de `url` (dedup por contenido). Devuelve el hash."""
+        raw = html.encode("utf-8")
+        h = hashlib.sha256(raw).hexdigest()
+        ahora = time.time()
+        path = self._path(h)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as fh:
+                fh.write(raw)
+            os.replace(tmp, path)
+        with self._lock, self.con:
+            nuevo = self.con.execute("SELECT 1 FROM objetos WHERE hash = ?", (h,)).fetchone() is None
+            if nuevo:
+                n = os.path.getsize(path)
+                self.con.execute("INSERT INTO objetos VALUES (?, ?, ?)", (h, n, ahora))
+                self._total += n
+            else:
+                self.con.execute("UPDATE objetos SET ultimo_uso = ? WHERE hash = ?", (ahora, h))
+            self.con.execute("INSERT OR REPLACE INTO paginas VALUES (?, ?, ?, ?, ?)",
+                             (url, ahora, url_final or url, tipo, h))
+        if self._total > self.max_bytes:
+            self.evict()
+        return h
+
+    def get(self, h):
+        return read_objeto(self._path(h))
+
+    def ultimas(self, tipo="detalle"):
+        """[(url_final, path)] de la versión más reciente de cada URL de `tipo`."""
+        q = """
+            SELECT p.url_final, p.hash FROM paginas p
+            JOIN (SELECT url, MAX(fetched_at) AS f FROM paginas WHERE tipo = ? GROUP BY url) u
+              ON p.url = u.url AND p.fetched_at = u.f
+        """
+        with self._lock:
+            filas = self.con.execute(q, (tipo,)).fetchall()
+        return [(url, self._path(h)) for url, h in filas]
+
+    def evict(self):
+        """Borra los objetos menos usados hasta quedar en el 90% de `max_bytes`."""
+        objetivo = self.max_bytes * 0.9
+        with self._lock, self.con:
+            for h, n in self.con.execute("SELECT hash, bytes FROM objetos ORDER BY ultimo_uso").fetchall():
+                if self._total <= objetivo: break
+                try: os.remove(self._path(h))
+                except FileNotFoundError: pass
+                self.con.execute("DELETE FROM objetos WHERE hash = ?", (h,))
+                self.con.execute("DELETE FROM paginas WHERE hash = ?", (h,))
+                self._total -= n
+
+    def close(self):
+        with self._lock:
+            self.con.close()
+
+
+def read_objeto(path):
+    with gzip.open(path, "rb") as fh:
+        return fh.read().decode("utf-8")
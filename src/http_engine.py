@@ -0,0 +1,142 @@
+# http_engine.py
+# Motor de scraping sin navegador: los IDs de cada listado están en el atributo
+# data-ids-avisos-mostrados de #ga-dimension-list y la ficha es HTML estático
+# (property-main), así que alcanza con HTTP async + el mismo parseo que Selenium.
+import asyncio, queue, threading
+import aiohttp
+from config import (BASE_URL, MAX_PROPS_TOTAL, url_pagina, url_detalle,
+                    HTTP_CONCURRENCIA, HTTP_CONCURRENCIA_INICIAL, HTTP_TIMEOUT, HTTP_REINTENTOS)
+from parsers import parse_ids, parse_paginas, parse_detalle
+from scheduler import CrawlScheduler, ejecutar_async
+from throttle import AimdController, es_captcha
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "es-AR,es;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+# Resultado de un 404: el aviso (o el barrio) ya no existe. Es definitivo, así que
+# no se reintenta ni se manda al fallback de Selenium como un error de parseo.
+NO_EXISTE = object()
+
+
+def _session(concurrencia):
+    connector = aiohttp.TCPConnector(limit=concurrencia, limit_per_host=concurrencia,
+                                     keepalive_timeout=30, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                 timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+
+
+async def _fetch(session, ctrl, url):
+    """Devuelve (html, url_final), (NO_EXISTE, url) si da 404 o (None, url) si falla tras los reintentos.
+
+    Cada request pasa por el AIMD `ctrl`: 429/503 y captchas cuentan como saturación.
+    """
+    for intento in range(HTTP_REINTENTOS + 1):
+        espera = 0.5 * (intento + 1)
+        async with ctrl.slot_async() as res:
+            try:
+                async with session.get(url) as r:
+                    if r.status == 200:
+                        html = await r.text()
+                        if not es_captcha(html):
+                            return html, str(r.url)
+                        res.estado = "saturado"
+                    elif r.status in (429, 503):
+                        res.estado = "saturado"
+                        try: espera = max(espera, float(r.headers.get("Retry-After", 0)))
+                        except ValueError: pass
+                    elif r.status == 404:
+                        return NO_EXISTE, url
+                    else:
+                        res.estado = "error"
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                res.estado = "error"
+        await asyncio.sleep(min(espera, 30))
+    return None, url
+
+
+def _cachear(cache, url, html, url_final, tipo):
+    if cache and html and html is not NO_EXISTE: cache.put(url, html, url_final, tipo=tipo)
+
+
+async def _pagina(session, ctrl, barrio, pagina, base_url, cache):
+    url = url_pagina(barrio, pagina, base_url)
+    html, final = await _fetch(session, ctrl, url)
+    _cachear(cache, url, html, final, "listado")
+    if html is NO_EXISTE: return [], 1  # no hay más avisos: se cierra el barrio sin fallback
+    ids = parse_ids(html) if html else None  # None: no parseó (fallback a Selenium si es la pág. 1)
+    return ids, (parse_paginas(html) if html and pagina == 1 else None)
+
+
+async def _detalle(session, ctrl, pid, base_url, cache):
+    url = url_detalle(pid, base_url)
+    html, link = await _fetch(session, ctrl, url)
+    _cachear(cache, url, html, link, "detalle")
+    if html is NO_EXISTE: return pid, NO_EXISTE
+    return pid, (parse_detalle(html, link) if html else None)
+
+
+async def _ids_async(barrios, base_url, ctrl, cache, tope):
+    sched = CrawlScheduler(barrios, tope_total=tope)
+    async with _session(ctrl.maximo) as session:
+        ids = await ejecutar_async(sched, lambda b, p: _pagina(session, ctrl, b, p, base_url, cache), ctrl.maximo)
+    return ids, sched.fallidos
+
+
+async def _detalles_async(ids, base_url, ctrl, cache, emitir, cancelado):
+    async with _session(ctrl.maximo) as session:
+        tareas = [asyncio.create_task(_detalle(session, ctrl, pid, base_url, cache)) for pid in ids]
+        try:
+            for i, t in enumerate(asyncio.as_completed(tareas), 1):
+                emitir(await t)
+                if cancelado.is_set(): break
+                if i % 50 == 0: print(f"Scrapeados {i}/{len(ids)} detalles (http)... {ctrl.resumen()}")
+        finally:
+            for t in tareas: t.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def nuevo_throttle(inicial=HTTP_CONCURRENCIA_INICIAL, maximo=HTTP_CONCURRENCIA):
+    return AimdController(inicial, maximo=maximo)
+
+
+def scrape_ids_http(barrios, base_url=BASE_URL, ctrl=None, cache=None, tope=MAX_PROPS_TOTAL):
+    """IDs de todos los barrios. Devuelve (ids, barrios_que_no_parsearon)."""
+    return asyncio.run(_ids_async(barrios, base_url, ctrl or nuevo_throttle(), cache, tope))
+
+
+def iter_detalles_http(ids, base_url=BASE_URL, ctrl=None, cache=None):
+    """Genera (pid, row) a medida que termina cada ficha (row=None si falló, NO_EXISTE si dio 404).
+
+    El loop de asyncio corre en un thread aparte; el consumidor recibe los
+    resultados en su propio thread (así el store SQLite no cruza threads).
+    """
+    q = queue.Queue(maxsize=1000)
+    cancelado = threading.Event()
+    fin = object()
+
+    def _correr():
+        try:
+            asyncio.run(_detalles_async(ids, base_url, ctrl or nuevo_throttle(), cache, q.put, cancelado))
+        except BaseException as e:
+            q.put(e)
+        finally:
+            q.put(fin)
+
+    th = threading.Thread(target=_correr, name="http-detalles", daemon=True)
+    th.start()
+    try:
+        while (item := q.get()) is not fin:
+            if isinstance(item, BaseException): raise item
+            yield item
+    finally:
+        cancelado.set()
+        while th.is_alive():  # destrabar al productor si la cola quedó llena
+            try: q.get(timeout=0.1)
+            except queue.Empty: pass
+
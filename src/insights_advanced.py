@@ -1,35 +1,38 @@
 # insights_advanced.py
+# plotly, sklearn, folium y los módulos que los arrastran se importan dentro de
+# run_advanced_insights: importar este módulo no los carga (ver main --perfil-imports).
 import os
 import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from ml_model import train_model  # reutilizamos el modelo ya entrenado
-import shap
-import folium
-from branca.colormap import linear
-
-def run_advanced_insights(df, out_dir="output/plots"):
+from config import REGRESION_NIVEL
+
+def run_advanced_insights(df, out_dir="output/plots", cubo=None):
+    # cubo: agregados de df (etapa "cubo"); barras, boxplot, segmentación y umbrales salen de ahí
+    import plotly.express as px
+    from render import Figuras, scatter, box_cubo
+    from regresion import suficientes, ajustar, elasticidades
+    from cubo import construir
     os.makedirs(out_dir, exist_ok=True)
     print("🔬 Generando análisis avanzados...")
+    figs = Figuras(out_dir, "insights", titulo="Insights avanzados")
+    if cubo is None:
+        cubo = construir(df)
+    por_barrio = cubo.resumen(["barrio"])
 
     # 1️⃣ Precio promedio por m² según barrio
-    price_m2 = df.groupby("Barrio_simplificado")["precio_m2"].mean().sort_values(ascending=False).reset_index()
+    price_m2 = (por_barrio[["barrio", "precio_m2_media"]].dropna()
+                .rename(columns={"barrio": "Barrio_simplificado", "precio_m2_media": "precio_m2"})
+                .sort_values("precio_m2", ascending=False))
     fig1 = px.bar(price_m2, x="Barrio_simplificado", y="precio_m2",
                   title="💰 Precio promedio por m² según barrio", color="precio_m2",
                   color_continuous_scale="YlOrRd")
     fig1.update_layout(xaxis_tickangle=-45, yaxis_title="Precio promedio (ARS/m²)")
-    fig1.write_html(os.path.join(out_dir, "precio_m2_por_barrio.html"))
+    figs.agregar(fig1, "precio_m2_por_barrio.html")
 
     # 2️⃣ Distribución del tamaño (m²) por barrio
-    fig2 = px.box(df, x="Barrio_simplificado", y="m2",
-                  title="📏 Distribución del tamaño (m²) por barrio")
+    fig2 = box_cubo(cubo, "m2", title="📏 Distribución del tamaño (m²) por barrio")
     fig2.update_layout(xaxis_tickangle=-45)
-    fig2.write_html(os.path.join(out_dir, "distribucion_m2_barrio.html"))
+    figs.agregar(fig2, "distribucion_m2_barrio.html")
 #
 #   # 3️⃣ Mapa de calor (precios)
 #    pivot = df.pivot_table(values="precio_m2", index="Barrio_simplificado", aggfunc="mean").sort_values("precio_m2", ascending=False)
@@ -43,30 +46,38 @@ def run_advanced_insights(df, out_dir="output/plots"):
 #    fig3.write_html(os.path.join(out_dir, "heatmap_precios.html"))
 
     # 4️⃣ Densidad de publicación por barrio
-    dens = df["Barrio_simplificado"].value_counts().reset_index()
-    dens.columns = ["Barrio", "Publicaciones"]
+    dens = (por_barrio[["barrio", "filas"]].sort_values("filas", ascending=False)
+            .set_axis(["Barrio", "Publicaciones"], axis=1))
     fig4 = px.bar(dens, x="Barrio", y="Publicaciones", title="🏢 Densidad de publicaciones por barrio")
     fig4.update_layout(xaxis_tickangle=-45)
-    fig4.write_html(os.path.join(out_dir, "densidad_publicaciones.html"))
+    figs.agregar(fig4, "densidad_publicaciones.html")
 
     # 5️⃣ Precio vs antigüedad
-    fig5 = px.scatter(df, x="Antiguedad", y="precio_m2", color="Barrio_simplificado",
-                      title="🏗️ Precio promedio vs antigüedad del edificio",
-                      trendline="ols")
+    fig5 = scatter(df, x="Antiguedad", y="precio_m2", color="Barrio_simplificado",
+                   title="🏗️ Precio promedio vs antigüedad del edificio",
+                   trendline=True)
     fig5.update_layout(yaxis_title="Precio por m² (ARS)")
-    fig5.write_html(os.path.join(out_dir, "precio_vs_antiguedad.html"))
-
-    # 6️⃣ Elasticidad precio–m²
-    df_log = df.dropna(subset=["m2", "Total"])
-    X = np.log(df_log[["m2"]])
-    y = np.log(df_log["Total"])
-    reg = LinearRegression().fit(X, y)
-    elasticity = reg.coef_[0]
-    fig6 = px.scatter(df_log, x=np.log(df_log["m2"]), y=np.log(df_log["Total"]),
-                      title=f"📈 Elasticidad precio–m² (coef ≈ {elasticity:.2f})",
-                      trendline="ols")
+    figs.agregar(fig5, "precio_vs_antiguedad.html")
+
+    # 6️⃣ Elasticidad precio–m²: pendiente de log(Total) ~ log(m²), total y por barrio en un solo paso
+    df_log = df[(df["m2"] > 0) & (df["Total"] > 0)]
+    logs = pd.DataFrame({"log_m2": np.log(df_log["m2"].astype("float64")),
+                         "log_total": np.log(df_log["Total"].astype("float64"))})
+    total = ajustar(suficientes(logs, "log_m2", "log_total"))
+    elasticity = total["pendiente"].iloc[0]
+    fig6 = scatter(logs, x="log_m2", y="log_total", tendencias=total,
+                   title=f"📈 Elasticidad precio–m² (coef ≈ {elasticity:.2f}, "
+                         f"IC {REGRESION_NIVEL:.0%} {total['ic_bajo'].iloc[0]:.2f}–{total['ic_alto'].iloc[0]:.2f})")
     fig6.update_layout(xaxis_title="log(m²)", yaxis_title="log(precio total)")
-    fig6.write_html(os.path.join(out_dir, "elasticidad_preciom2.html"))
+    figs.agregar(fig6, "elasticidad_preciom2.html")
+
+    elas = elasticidades(df).dropna(subset=["pendiente"]).sort_values("pendiente", ascending=False)
+    fig6b = px.bar(elas.reset_index(), x="Barrio_simplificado", y="pendiente",
+                   error_y=elas["ic_alto"].to_numpy() - elas["pendiente"].to_numpy(),
+                   error_y_minus=elas["pendiente"].to_numpy() - elas["ic_bajo"].to_numpy(),
+                   hover_data=["n", "r2"], title=f"📈 Elasticidad precio–m² por barrio (IC {REGRESION_NIVEL:.0%})")
+    fig6b.update_layout(xaxis_tickangle=-45, yaxis_title="Elasticidad", xaxis_title="Barrio")
+    figs.agregar(fig6b, "elasticidad_por_barrio.html")
 
         # 7️⃣ Feature Importance explicada (SHAP)
     features = ["Dormitorios","Baños","Ambientes","Cocheras","Toilettes","m2","precio_m2","expensas_ratio","amb_m2"]
@@ -82,48 +93,68 @@ def run_advanced_insights(df, out_dir="output/plots"):
     else:
         X = df_model[features]
         y = df_model["Total"]
+        from sklearn.linear_model import LinearRegression
+        from explicaciones import resumir_fondo, shap_lineal, limitar_filas
         model = LinearRegression().fit(X, y)
 
-        try:
-            explainer = shap.Explainer(model, X)
-            shap_values = explainer(X)
-            shap_mean = np.abs(shap_values.values).mean(axis=0)
-            fig = px.bar(x=shap_mean, y=features,
-                        orientation="h", title="🧠 Importancia promedio (SHAP)")
-            fig.update_layout(xaxis_title="Magnitud media de impacto")
-            fig.write_html(os.path.join(out_dir, "feature_importance_shap.html"))
-        except Exception as e:
-            print(f"⚠️ No se pudo generar gráfico SHAP: {e}")
+        # Lineal: SHAP en forma cerrada contra un fondo resumido, sobre hasta SHAP_MAX_FILAS filas
+        fondo = resumir_fondo(X)
+        shap_values = shap_lineal(model, limitar_filas(X), fondo)
+        shap_mean = np.abs(shap_values).mean(axis=0)
+        fig = px.bar(x=shap_mean, y=features,
+                    orientation="h", title="🧠 Importancia promedio (SHAP)")
+        fig.update_layout(xaxis_title="Magnitud media de impacto")
+        figs.agregar(fig, "feature_importance_shap.html")
+
+    # 7️⃣b SHAP del modelo entrenado por ml_model (TreeExplainer, cacheado por versión)
+    from ml_model import cargar_modelo
+    from explicaciones import importancia_modelo
+    try:
+        artefacto = cargar_modelo()
+    except FileNotFoundError:
+        print("⚠️ No hay modelo guardado (ml_model.train_model): se omite la importancia SHAP del modelo.")
+    else:
+        imp = importancia_modelo(artefacto, df)
+        fig = px.bar(x=imp.values, y=imp.index, orientation="h",
+                     title=f"🧠 Importancia SHAP del modelo ({artefacto['version']})")
+        fig.update_layout(xaxis_title="|SHAP| medio (ARS)", yaxis=dict(autorange="reversed"))
+        figs.agregar(fig, "feature_importance_modelo.html")
+    figs.escribir()
 
 
-    # 8️⃣ Segmentación de barrios (KMeans)
-    seg = df.groupby("Barrio_simplificado")[["precio_m2","expensas_ratio","m2"]].mean().dropna()
+    # 8️⃣ Segmentación de barrios (KMeans), por barrio oficial (subzonas unificadas)
+    import folium
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    from gazetteer import gazetteer
+    gz = gazetteer()
+    oficial = dict(zip(por_barrio["barrio"], gz.oficial(por_barrio["barrio"])))
+    seg = (cubo.recodificar("barrio", lambda b: None if pd.isna(oficial.get(b)) else oficial[b])
+               .resumen(["barrio"], ["precio_m2", "expensas_ratio", "m2"]).set_index("barrio")
+               [["precio_m2_media", "expensas_ratio_media", "m2_media"]]
+               .rename(columns=lambda c: c.removesuffix("_media")).dropna())
     scaler = StandardScaler()
     X_seg = scaler.fit_transform(seg)
     kmeans = KMeans(n_clusters=4, random_state=42, n_init=10).fit(X_seg)
     seg["cluster"] = kmeans.labels_
 
-    # Mapa con colores por cluster
-    barrio_coords = {
-        "Palermo": [-34.578, -58.425], "Recoleta": [-34.595, -58.393],
-        "Belgrano": [-34.563, -58.459], "Caballito": [-34.616, -58.440],
-        "Almagro": [-34.610, -58.420], "Villa Urquiza": [-34.573, -58.487],
-        "Flores": [-34.635, -58.465], "Balvanera": [-34.610, -58.402],
-        "Boedo": [-34.630, -58.415], "San Telmo": [-34.621, -58.373],
-    }
+    # Mapa con colores por cluster: polígonos del gazetteer (todos los barrios, sin descartar ninguno)
     m = folium.Map(location=[-34.6037, -58.3816], zoom_start=11, tiles="cartodb positron")
     colors = ["#1f77b4","#2ca02c","#ff7f0e","#d62728"]
-    for b, row in seg.iterrows():
-        if b in barrio_coords:
-            lat, lon = barrio_coords[b]
-            cluster = row["cluster"]
-            popup = f"<b>{b}</b><br>Cluster {cluster}<br>Precio m²: ${row['precio_m2']:,.0f}"
-            folium.CircleMarker([lat, lon], radius=10, color=colors[int(cluster)],
-                                fill=True, fill_opacity=0.8, popup=popup).add_to(m)
+    capa, faltan = gz.capa(
+        seg["cluster"],
+        color=lambda c: "#dddddd" if pd.isna(c) else colors[int(c)],
+        tooltip=lambda b, c: f"{b} - sin datos" if pd.isna(c) else f"{b} - cluster {int(c)}",
+        popup=lambda b, c: "" if pd.isna(c) else
+            f"<b>{b}</b><br>Cluster {int(c)}<br>Precio m²: ${seg.loc[b, 'precio_m2']:,.0f}",
+    )
+    if faltan:
+        print(f"⚠️ Barrios sin polígono en el mapa de segmentación: {', '.join(map(str, faltan))}")
+    capa.add_to(m)
     m.save(os.path.join(out_dir, "segmentacion_barrios.html"))
 
     # 9️⃣ Outliers notables (según precio por m²)
-    q1, q3 = df["precio_m2"].quantile([0.25, 0.75])
+    q1, q3 = cubo.cuantiles(None, "precio_m2", [0.25, 0.75])
     iqr = q3 - q1
     upper = q3 + 1.5 * iqr
     outliers = df[df["precio_m2"] > upper][["Link","Barrio_simplificado","precio_m2","m2","Total"]].sort_values("precio_m2", ascending=False)
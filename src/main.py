@@ -1,54 +1,145 @@
-import os
-import pandas as pd
-from scraper import run_scraper_caba
-from cleaning import clean_data
-from features import add_features
-from analysis_interactive import plot_interactive
-from ml_model import train_model
-from insights_advanced import run_advanced_insights
+import os, sys, argparse
+from dataset import ruta_dataset, buscar_dataset, guardar_dataset, cargar_dataset
+from stages import StageRunner, ETAPAS, FINALES
+from outliers import sin_outliers
+from config import ETAPAS_WORKERS, SCRAPER_ENGINE, MODELO_MOTOR, HISTORIAL_DIR
+# scraper (selenium), pipeline (limpieza) y las etapas de análisis (sklearn, plotly,
+# folium, shap) se importan recién cuando se usan: ver `--perfil-imports`
 
 DATA_DIR = r"C:\Users\drobl\OneDrive\Escritorio\Guido\argenprop_scraper\output\data"
 PLOTS_DIR = r"C:\Users\drobl\OneDrive\Escritorio\Guido\argenprop_scraper\output\plots"
 
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(PLOTS_DIR, exist_ok=True)
-
-print("🏙️ Análisis de mercado inmobiliario CABA")
-print("¿Qué querés hacer?")
-print("1️⃣  Scrappear nuevamente Argenprop")
-print("2️⃣  Usar el último CSV guardado\n")
-
-choice = input("Elegí una opción (1 o 2): ").strip()
-
-if choice == "1":
-    print("🕸️ Scrapeando CABA (esto puede tardar unos minutos)...")
-    df_raw = run_scraper_caba()
-    print("🧹 Limpiando datos...")
-    df = clean_data(df_raw)
-    print("🧪 Generando features...")
-    df = add_features(df)
-    df.to_csv(os.path.join(DATA_DIR, "caba_base_completa.csv"), index=False, encoding="utf-8-sig")
-else:
-    file_path = os.path.join(DATA_DIR, "caba_base_completa.csv")
-    if not os.path.exists(file_path):
-        print("⚠️ No se encontró un CSV previo. Se realizará scraping.")
-        df_raw = run_scraper_caba()
-        df = clean_data(df_raw)
-        df = add_features(df)
-        df.to_csv(file_path, index=False, encoding="utf-8-sig")
-    else:
-        print(f"📂 Cargando datos desde {file_path} ...")
-        df = pd.read_csv(file_path)
-
-print("📊 Generando visualizaciones interactivas y eliminando outliers...")
-df_clean = plot_interactive(df, out_dir=PLOTS_DIR)
-df_clean.to_csv(os.path.join(DATA_DIR, "caba_limpio_sin_outliers.csv"), index=False, encoding="utf-8-sig")
-
-print("🤖 Entrenando modelo de predicción...")
-train_model(df_clean, out_dir=PLOTS_DIR)
-
-print("🔍 Generando insights avanzados...")
-run_advanced_insights(df_clean, out_dir=PLOTS_DIR)
-
-print("\n✅ Proyecto completado. Resultados guardados en /output/data y /output/plots")
+FUENTES = {"1": "scrape", "2": "dataset", "3": "replay", "4": "stream"}
 
+
+def _menu():
+    print("¿Qué querés hacer?")
+    print("1️⃣  Scrappear nuevamente Argenprop")
+    print("2️⃣  Usar el último dataset guardado")
+    print("3️⃣  Re-parsear el HTML cacheado (replay, sin red)")
+    print("4️⃣  Scrappear en modo streaming (limpia y guarda a medida que llegan)\n")
+    choice = input("Elegí una opción (1, 2, 3 o 4): ").strip()
+    return FUENTES.get(choice, "dataset")
+
+
+def _args(argv):
+    ap = argparse.ArgumentParser(
+        description="Pipeline CABA por etapas. Sin --fuente se muestra el menú interactivo.",
+        epilog="Ej. cron: python src/main.py --fuente scrape --engine http")
+    ap.add_argument("--fuente", choices=sorted(set(FUENTES.values())),
+                    help="de dónde salen los datos: scrape, replay (HTML cacheado), stream o dataset (último guardado)")
+    ap.add_argument("--engine", choices=["selenium", "http"], default=SCRAPER_ENGINE, help="motor de scraping")
+    ap.add_argument("--etapas", default=",".join(FINALES),
+                    help=f"etapas objetivo, separadas por coma; se corren también sus dependencias ({', '.join(ETAPAS)})")
+    ap.add_argument("--forzar", default="", help="etapas a recalcular aunque estén en caché (o 'todas')")
+    ap.add_argument("--workers", type=int, default=ETAPAS_WORKERS, help="etapas independientes en paralelo")
+    ap.add_argument("--cotizacion", type=float, default=1350, help="ARS por USD para la limpieza")
+    ap.add_argument("--motor", choices=["rf", "hgb"], default=MODELO_MOTOR, help="motor de entrenamiento del modelo")
+    ap.add_argument("--refit-outliers", action="store_true",
+                    help="reentrenar el detector de outliers (si no, sólo se reentrena con drift)")
+    ap.add_argument("--fecha", help="fecha del snapshot en el historial (AAAA-MM-DD, por defecto hoy)")
+    ap.add_argument("--data-dir", default=DATA_DIR)
+    ap.add_argument("--plots-dir", default=PLOTS_DIR)
+    ap.add_argument("--perfil-imports", action="store_true", help="mostrar el tiempo de import del arranque y salir")
+    return ap.parse_args(argv)
+
+
+def _lista(texto):
+    return [t.strip() for t in texto.split(",") if t.strip()]
+
+
+def _sin_datos(motivo):
+    # Sin filas no hay nada que analizar ni snapshot que guardar; el dataset anterior queda como estaba
+    print(f"⚠️ Sin datos nuevos: {motivo}. No se corre el análisis.")
+    return 1
+
+
+def main(argv=None):
+    args = _args(argv)
+    if args.perfil_imports:
+        from perfil_imports import perfil_imports
+        perfil_imports("main")
+        return 0
+    data_dir, plots_dir = args.data_dir, args.plots_dir
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(plots_dir, exist_ok=True)
+
+    print("🏙️ Análisis de mercado inmobiliario CABA")
+    fuente = args.fuente or _menu()
+    forzar = list(ETAPAS) if args.forzar == "todas" else _lista(args.forzar)
+    if args.refit_outliers:
+        forzar.append("outliers")
+    runner = StageRunner(out_dir=plots_dir, workers=args.workers, forzar=forzar,
+                         params={"cotizacion_usd": args.cotizacion, "motor": args.motor,
+                                 "refit_outliers": args.refit_outliers})
+    base_path = ruta_dataset(data_dir, "caba_base_completa")
+
+    if fuente == "dataset":
+        file_path = buscar_dataset(data_dir, "caba_base_completa")
+        if file_path is None:
+            print("⚠️ No se encontró un dataset previo. Se realizará scraping.")
+            fuente = "scrape"
+        else:
+            print(f"📂 Cargando datos desde {file_path} ...")
+            runner.semilla("features", cargar_dataset(file_path))
+
+    if fuente == "stream":
+        print("🌊 Scrapeando CABA en modo streaming...")
+        from scraper import iter_scraper_caba
+        from pipeline import stream_pipeline, nuevo_sink
+        escritas = stream_pipeline(iter_scraper_caba(engine=args.engine),
+                                   nuevo_sink(base_path), cotizacion_usd=args.cotizacion)
+        if not escritas:
+            return _sin_datos("el streaming no dejó ninguna fila válida")
+        runner.semilla("features", cargar_dataset(base_path))
+    elif fuente in ("scrape", "replay"):
+        from scraper import run_scraper_caba
+        if fuente == "scrape":
+            print("🕸️ Scrapeando CABA (esto puede tardar unos minutos)...")
+            df_raw = run_scraper_caba(engine=args.engine)
+        else:
+            df_raw = run_scraper_caba(engine="replay")
+        if df_raw.empty:
+            return _sin_datos("el scraping no devolvió publicaciones" if fuente == "scrape"
+                              else "no hay fichas en el caché de HTML")
+        # Orden canónico: los threads no garantizan orden y cambiaría la clave de caché
+        if "Link" in df_raw.columns:
+            df_raw = df_raw.sort_values("Link", kind="stable").reset_index(drop=True)
+        runner.semilla("scrape", df_raw)
+
+    runner.ejecutar(_lista(args.etapas))
+
+    if fuente in ("scrape", "replay") and "features" in runner.claves:
+        runner.publicar_df("features", base_path, guardar_dataset)
+    if "dedup" in runner.claves:
+        # Todas las publicaciones con su grupo de duplicados (cluster_dup, es_canonica)
+        runner.publicar_df("dedup", ruta_dataset(data_dir, "caba_duplicados"), guardar_dataset)
+    if "cubo" in runner.claves:
+        from cubo import Cubo
+        runner.publicar_df("cubo", os.path.join(data_dir, "caba_cubo.parquet"), lambda df, p: Cubo(df).guardar(p))
+    if "outliers" in runner.claves:
+        # Todas las filas con su score de anomalía, y el subconjunto limpio de siempre
+        runner.publicar_df("outliers", ruta_dataset(data_dir, "caba_base_puntuada"), guardar_dataset)
+        runner.publicar_df("outliers", ruta_dataset(data_dir, "caba_limpio_sin_outliers"),
+                           lambda df, p: guardar_dataset(sin_outliers(df), p))
+
+    # Cada scrape nuevo queda como snapshot fechado (replay y dataset re-procesan datos viejos)
+    if HISTORIAL_DIR and fuente in ("scrape", "stream"):
+        nombre = "dedup" if "dedup" in runner.claves else "features"
+        if nombre in runner.claves:
+            import historial
+            historial.agregar_snapshot(runner.cargar(nombre), args.fecha, args.cotizacion, HISTORIAL_DIR)
+            historial.actualizar(HISTORIAL_DIR)
+
+    print(f"⏭️  Sin cambios: {', '.join(runner.salteadas) or '-'} | ▶️ Corridas: {', '.join(runner.corridas) or '-'}")
+    if runner.fallidas:
+        for n, motivo in runner.fallidas.items():
+            print(f"❌ {n}: {motivo}")
+        return 1
+    print("\n✅ Proyecto completado. Resultados guardados en /output/data y /output/plots")
+    return 0
+
+
+# El guard es necesario para los ProcessPoolExecutor (replay y etapas) en Windows (spawn)
+if __name__ == "__main__":
+    sys.exit(main())
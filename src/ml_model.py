@@ -1,49 +1,215 @@
 # ml_model.py
-import os, numpy as np, pandas as pd, plotly.express as px
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-import plotly.express as px
-import pandas as pd
-import numpy as np
-import os
-
-def train_model(df, out_dir="output/plots"):
-    os.makedirs(out_dir, exist_ok=True)
+import os, sys, json, time, argparse, hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, pandas as pd
+from config import (MODELO_DIR, PREDICT_CHUNK, PREDICT_WORKERS, MODELO_MOTOR, MODELO_PRESUPUESTO_S,
+                    HGB_MAX_ITER, MODELO_DENSO_MAX_MB)
 
-    # Variables del modelo
-    feats = [
-        "Dormitorios", "Baños", "Ambientes", "Cocheras", "Toilettes",
-        "m2", "precio_m2", "expensas_ratio", "amb_m2", "Antig_binned", "Barrio"
-    ]
-    d = df[feats + ["Total"]].copy()
-    d = pd.get_dummies(d, columns=["Antig_binned", "Barrio"], dummy_na=True)
+# Variables del modelo: sólo lo que el aviso publica además del precio. precio_m2 y
+# expensas_ratio se calculan con Total (el objetivo) y no se pueden usar para predecirlo.
+NUMERICAS = ["Dormitorios", "Baños", "Ambientes", "Cocheras", "Toilettes",
+             "m2", "expensas", "amb_m2"]
+CATEGORICAS = ["Antig_binned", "Barrio"]
+OBJETIVO = "Total"
 
-    X = d.drop("Total", axis=1).fillna(0)
-    y = d["Total"]
 
-    # Entrenamiento
+# Motores de entrenamiento. "onehot": numéricas + one-hot, float32 denso mientras la
+# matriz entre en MODELO_DENSO_MAX_MB y CSR disperso por encima; "ordinal": numéricas +
+# código de categoría (NaN = faltante/no visto) para los que tratan categóricas de forma
+# nativa. La codificación (y si es densa) queda en el esquema guardado.
+HGB_MAX_CATEGORIAS = 254  # límite de HistGradientBoosting (255 bins, uno para NaN)
+
+
+def _esquema(df, codificacion="onehot", max_denso_mb=MODELO_DENSO_MAX_MB):
+    """Categorías vistas en el entrenamiento y orden final de columnas (lo que se guarda con el modelo)."""
+    categorias = {}
+    for c in CATEGORICAS:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cats = [str(v) for v in s.cat.categories]
+        else:
+            cats = sorted(str(v) for v in s.dropna().unique())
+        if codificacion == "ordinal" and len(cats) > HGB_MAX_CATEGORIAS:
+            # Las más frecuentes; el resto se trata como faltante
+            cats = [str(v) for v in s.astype(str).value_counts().index[:HGB_MAX_CATEGORIAS]]
+        categorias[c] = cats
+    if codificacion == "ordinal":
+        columnas = NUMERICAS + CATEGORICAS
+    else:
+        columnas = NUMERICAS + [f"{c}_{v}" for c in CATEGORICAS for v in categorias[c] + ["nan"]]
+    denso = codificacion == "ordinal" or len(df) * len(columnas) * 4 <= max_denso_mb * 2 ** 20
+    return {"numericas": NUMERICAS, "categorias": categorias, "columnas": columnas, "objetivo": OBJETIVO,
+            "codificacion": codificacion, "denso": denso}
+
+
+def _codigos(s, cats):
+    # Posición de cada valor en `cats`; -1 si falta o no se vio en el entrenamiento
+    return pd.Index(cats).get_indexer(s.astype(str))
+
+
+def codificar(df, esquema):
+    """Matriz de features con las categorías del esquema: mismas columnas y orden siempre.
+
+    onehot:  float32 denso si el esquema dice `denso` (los árboles de sklearn entrenan ~6x
+             más rápido sobre denso), si no CSR disperso; valores nuevos caen en `<col>_nan`.
+    ordinal: array denso; categorías como código entero y NaN para faltantes/no vistas.
+    """
+    from scipy import sparse
+    num = df[esquema["numericas"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    if esquema.get("codificacion", "onehot") == "ordinal":
+        cods = [_codigos(df[c], cats).astype(np.float64) for c, cats in esquema["categorias"].items()]
+        X = np.column_stack([num] + cods)
+        X[:, num.shape[1]:][X[:, num.shape[1]:] < 0] = np.nan
+        return X
+    bloques = [sparse.csr_matrix(np.nan_to_num(num, nan=0.0))]
+    filas = np.arange(len(df))
+    for c, cats in esquema["categorias"].items():
+        cod = _codigos(df[c], cats)
+        cod[cod < 0] = len(cats)  # columna <col>_nan
+        bloques.append(sparse.csr_matrix((np.ones(len(df)), (filas, cod)), shape=(len(df), len(cats) + 1)))
+    X = sparse.hstack(bloques, format="csr")
+    return X.toarray().astype(np.float32) if esquema.get("denso") else X
+
+
+def _con_presupuesto(model, paso, maximo, presupuesto, attr):
+    # warm_start: se agregan `paso` árboles/iteraciones por vuelta hasta `maximo`,
+    # early stopping (HGB) o hasta que la próxima vuelta no entre en `presupuesto` segundos
+    def _entrenar(X, y):
+        t0 = time.perf_counter()
+        setattr(model, attr, paso)
+        while True:
+            t_vuelta = time.perf_counter()
+            model.fit(X, y)
+            hechas = getattr(model, "n_iter_", None) or len(getattr(model, "estimators_", []))
+            if hechas < getattr(model, attr) or getattr(model, attr) >= maximo:
+                break
+            ahora = time.perf_counter()
+            if (ahora - t0) + (ahora - t_vuelta) > presupuesto:
+                print(f"⏱️ Presupuesto de {presupuesto:.0f}s: se corta en {hechas} {attr}")
+                break
+            setattr(model, attr, min(getattr(model, attr) + paso, maximo))
+        return model
+    return _entrenar
+
+
+def _motor_rf(presupuesto):
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=250, random_state=42, n_jobs=-1, warm_start=True)
+    return model, _con_presupuesto(model, 10, 250, presupuesto, "n_estimators")
+
+
+def _motor_hgb(presupuesto):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    model = HistGradientBoostingRegressor(
+        max_iter=HGB_MAX_ITER, learning_rate=0.1, early_stopping=True, validation_fraction=0.1,
+        n_iter_no_change=20, random_state=42, warm_start=True,
+        categorical_features=[False] * len(NUMERICAS) + [True] * len(CATEGORICAS))
+    return model, _con_presupuesto(model, 50, HGB_MAX_ITER, presupuesto, "max_iter")
+
+
+# nombre → (codificación, constructor(presupuesto) -> (modelo, entrenar(X, y)), título)
+MOTORES = {
+    "rf": ("onehot", _motor_rf, "Random Forest"),
+    "hgb": ("ordinal", _motor_hgb, "HistGradientBoosting"),
+}
+
+
+def entrenar(df, motor=MODELO_MOTOR, presupuesto=MODELO_PRESUPUESTO_S):
+    """Entrena `motor` con split 80/20. Devuelve (modelo, esquema, métricas, (y_test, pred))."""
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    codificacion, constructor, _ = MOTORES[motor]
+    d = df[NUMERICAS + CATEGORICAS + [OBJETIVO]]
+    d = d[d[OBJETIVO].notna()]
+    esquema = _esquema(d, codificacion)
+    if not esquema["denso"]:
+        print(f"🧮 One-hot de {len(d)}x{len(esquema['columnas'])} > {MODELO_DENSO_MAX_MB} MB: se entrena sobre CSR")
+    X = codificar(d, esquema)
+    y = d[OBJETIVO].to_numpy(dtype=np.float64)
     Xtr, Xte, ytr, yte = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=250, random_state=42, n_jobs=-1)
-    model.fit(Xtr, ytr)
+
+    model, ajustar = constructor(presupuesto)
+    t0 = time.perf_counter()
+    ajustar(Xtr, ytr)
+    segundos = time.perf_counter() - t0
     pred = model.predict(Xte)
 
-    # Métricas
     mae = mean_absolute_error(yte, pred)
     rmse = mean_squared_error(yte, pred) ** 0.5  # ✅ compatible con todas las versiones
-    print(f"🤖 RF — MAE: {mae:,.0f} | RMSE: {rmse:,.0f}")
+    iteraciones = getattr(model, "n_iter_", None) or len(model.estimators_)
+    metricas = {"motor": motor, "mae": float(mae), "rmse": float(rmse), "segundos": round(segundos, 2),
+                "iteraciones": int(iteraciones), "filas": len(d)}
+    return model, esquema, metricas, (yte, pred)
+
+
+def comparar_motores(df, motores=tuple(MOTORES), presupuesto=MODELO_PRESUPUESTO_S, memoria=True):
+    """Entrena cada motor sobre el mismo split y reporta tiempo, memoria pico y MAE/RMSE."""
+    import tracemalloc
+    filas = []
+    for motor in motores:
+        _, _, metricas, _ = entrenar(df, motor, presupuesto)
+        if memoria:
+            # Segunda pasada aparte: tracemalloc frena el entrenamiento y falsearía el tiempo.
+            # Ve los buffers de numpy/scipy; lo que aloca el C de los árboles queda afuera.
+            tracemalloc.start()
+            entrenar(df, motor, presupuesto)
+            metricas["memoria_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+        filas.append(metricas)
+        mem = f"{metricas['memoria_mb']:8.1f} MB" if memoria else "       - MB"
+        print(f"🤖 {motor.upper():>4} | {metricas['segundos']:7.1f}s | {mem} | "
+              f"MAE {metricas['mae']:>12,.0f} | RMSE {metricas['rmse']:>12,.0f} | {metricas['iteraciones']} it.")
+    return pd.DataFrame(filas)
+
 
+def guardar_modelo(model, esquema, metricas, df, modelo_dir=MODELO_DIR):
+    """Guarda modelo + esquema + versión en `modelo_dir` y apunta `actual.json` a esta versión."""
+    import sklearn, joblib
+    os.makedirs(modelo_dir, exist_ok=True)
+    h = hashlib.sha256(json.dumps(esquema["columnas"]).encode())
+    h.update(pd.util.hash_pandas_object(df[NUMERICAS + CATEGORICAS + [OBJETIVO]], index=False).values.tobytes())
+    version = f"{datetime.now():%Y%m%d-%H%M%S}-{h.hexdigest()[:8]}"
+    artefacto = {"modelo": model, "esquema": esquema, "version": version, "metricas": metricas,
+                 "filas": len(df), "sklearn": sklearn.__version__}
+    path = os.path.join(modelo_dir, f"modelo_{version}.joblib")
+    joblib.dump(artefacto, f"{path}.parcial", compress=3)
+    os.replace(f"{path}.parcial", path)
+    with open(os.path.join(modelo_dir, "actual.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "path": os.path.basename(path), "metricas": metricas}, f, indent=1)
+    print(f"💾 Modelo {version} guardado en {path}")
+    return path
+
+
+def cargar_modelo(path=None, modelo_dir=MODELO_DIR):
+    """Artefacto guardado por `train_model` (por defecto la versión de `actual.json`)."""
+    if path is None:
+        with open(os.path.join(modelo_dir, "actual.json"), encoding="utf-8") as f:
+            path = os.path.join(modelo_dir, json.load(f)["path"])
+    import joblib
+    return joblib.load(path)
+
+
+def train_model(df, out_dir="output/plots", modelo_dir=MODELO_DIR, motor=MODELO_MOTOR,
+                presupuesto=MODELO_PRESUPUESTO_S):
+    from render import Figuras, scatter  # plotly se importa recién al graficar
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Entrenamiento
+    model, esquema, metricas, (yte, pred) = entrenar(df, motor, presupuesto)
+    titulo = MOTORES[motor][2]
+    print(f"🤖 {motor.upper()} — MAE: {metricas['mae']:,.0f} | RMSE: {metricas['rmse']:,.0f} "
+          f"| {metricas['segundos']:.1f}s, {metricas['iteraciones']} iteraciones")
+
+    if modelo_dir:
+        guardar_modelo(model, esquema, metricas, df, modelo_dir)
 
     # 📈 Gráfico interactivo real vs predicho
     resultados = pd.DataFrame({"Real": yte, "Predicho": pred})
-    fig_pred = px.scatter(
+    fig_pred = scatter(
         resultados, x="Real", y="Predicho",
-        title="Predicción vs Valor Real (Random Forest)",
-        trendline="ols",
+        title=f"Predicción vs Valor Real ({titulo})",
+        trendline=True,
         opacity=0.7
     )
     fig_pred.update_layout(
@@ -52,6 +218,96 @@ def train_model(df, out_dir="output/plots"):
         xaxis=dict(tickformat=".0f"),
         yaxis=dict(tickformat=".0f")
     )
-    fig_pred.write_html(os.path.join(out_dir, "pred_vs_real.html"))
+    figs = Figuras(out_dir, "modelo", titulo=f"Modelo de predicción ({titulo})")
+    figs.agregar(fig_pred, "pred_vs_real.html")
+    paths = figs.escribir()
+
+    print(f"📈 Gráficos generados: {', '.join(os.path.basename(p) for p in paths)}")
+
+
+def _preparar(df):
+    # Avisos crudos del scraper → misma limpieza y features que el entrenamiento, sin
+    # descartar los que no tienen precio (son justamente los que hay que tasar)
+    if "m2" in df.columns:
+        return df
+    from cleaning import clean_data
+    from features import add_features
+    out = add_features(clean_data(df, descartar_sin_total=False), copy=False)
+    out.index = df.index
+    return out
+
+
+def predict_batch(df, artefacto=None, chunk=PREDICT_CHUNK, workers=PREDICT_WORKERS):
+    """Predice `Total` para `df` (crudo o ya con features) en lotes de `chunk` filas,
+    `workers` lotes en paralelo, con la codificación guardada junto al modelo.
+
+    Devuelve una fila por cada fila de `df`, en el mismo orden e índice (también las
+    que no tienen precio)."""
+    artefacto = artefacto or cargar_modelo()
+    model, esquema = artefacto["modelo"], artefacto["esquema"]
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1  # el paralelismo es por lote
+    df = _preparar(df)
+
+    def _lote(inicio):
+        parte = df.iloc[inicio:inicio + chunk]
+        return model.predict(codificar(parte, esquema))
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        preds = list(ex.map(_lote, range(0, len(df), chunk)))
+    out = df.copy()
+    out["Total_predicho"] = np.concatenate(preds) if preds else np.array([], dtype=float)
+    out["modelo_version"] = artefacto["version"]
+    return out
+
+
+def main(argv=None):
+    from dataset import cargar_dataset, guardar_dataset
+    ap = argparse.ArgumentParser(description="Scoring por lotes con el modelo guardado (sin reentrenar)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("predecir", help="predecir Total para un CSV/Parquet de avisos (crudos o con features)")
+    p.add_argument("entrada")
+    p.add_argument("--salida", help="CSV o Parquet de salida (default: <entrada>_predicho.parquet)")
+    p.add_argument("--modelo", help="archivo .joblib (default: la versión de actual.json)")
+    p.add_argument("--modelo-dir", default=MODELO_DIR)
+    p.add_argument("--chunk", type=int, default=PREDICT_CHUNK)
+    p.add_argument("--workers", type=int, default=PREDICT_WORKERS)
+    sub.add_parser("info", help="versión y métricas del modelo actual").add_argument("--modelo-dir", default=MODELO_DIR)
+    c = sub.add_parser("comparar", help="tiempo, memoria y MAE/RMSE de cada motor sobre un dataset con features")
+    c.add_argument("entrada")
+    c.add_argument("--motores", default=",".join(MOTORES))
+    c.add_argument("--presupuesto", type=float, default=MODELO_PRESUPUESTO_S, help="segundos por motor")
+    c.add_argument("--filas", type=int, help="re-muestrear a N filas (con reemplazo) para probar escala")
+    c.add_argument("--salida", help="CSV con la tabla comparativa")
+    c.add_argument("--sin-memoria", action="store_true", help="no medir memoria (evita la segunda pasada)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "comparar":
+        df = cargar_dataset(args.entrada)
+        if args.filas:
+            df = df.sample(args.filas, replace=args.filas > len(df), random_state=42).reset_index(drop=True)
+        tabla = comparar_motores(df, [m.strip() for m in args.motores.split(",")], args.presupuesto,
+                                 memoria=not args.sin_memoria)
+        if args.salida:
+            tabla.to_csv(args.salida, index=False)
+        return 0
+
+    if args.cmd == "info":
+        with open(os.path.join(args.modelo_dir, "actual.json"), encoding="utf-8") as f:
+            print(json.dumps(json.load(f), indent=1))
+        return 0
+
+    artefacto = cargar_modelo(args.modelo, args.modelo_dir)
+    # CSV sin tipar: puede traer avisos crudos (precio "$ 550.000") que limpia _preparar
+    df = cargar_dataset(args.entrada) if args.entrada.endswith(".parquet") else pd.read_csv(args.entrada)
+    t0 = datetime.now()
+    out = predict_batch(df, artefacto, chunk=args.chunk, workers=args.workers)
+    segundos = (datetime.now() - t0).total_seconds()
+    salida = args.salida or os.path.splitext(args.entrada)[0] + "_predicho.parquet"
+    guardar_dataset(out, salida)
+    print(f"🤖 Modelo {artefacto['version']}: {len(out)} avisos en {segundos:.1f}s → {salida}")
+    return 0
+
 
-    print("📈 Gráficos generados: importancia_variables.html y pred_vs_real.html")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# outliers.py
+# Detector de outliers (StandardScaler + IsolationForest) entrenado una vez y guardado
+# con versión en MODELO_DIR. Cada corrida:
+#   - carga el detector actual; se reentrena sólo si se pide o si las features se
+#     corrieron respecto de las de entrenamiento (PSI > OUTLIERS_DRIFT_PSI),
+#   - puntúa las filas de forma incremental: los scores ya calculados con esta versión
+#     se leen de un caché por hash de fila, sólo se puntúan las filas nuevas,
+#   - agrega `anomalia` (más alto = más raro) y `es_outlier` en vez de borrar filas.
+#
+#   python src/outliers.py info
+#   python src/outliers.py reentrenar output/data/caba_base_completa.parquet
+import os, sys, json, hashlib, argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import (MODELO_DIR, OUTLIERS_CONTAMINACION, OUTLIERS_MAX_SAMPLES, OUTLIERS_N_JOBS,
+                    OUTLIERS_DRIFT_PSI)
+
+FEATS = ["Dormitorios", "Baños", "Ambientes", "Cocheras", "Toilettes", "m2", "precio_m2", "expensas_ratio", "amb_m2"]
+_BINS_PSI = 10
+
+
+def _matriz(df):
+    return df[FEATS].astype("float64").fillna(0)
+
+
+def _hash_filas(X):
+    return pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+
+def _referencia(X):
+    # Cortes por deciles de cada feature y la proporción de filas en cada tramo
+    ref = {}
+    for c in X.columns:
+        cortes = np.unique(np.quantile(X[c].to_numpy(), np.linspace(0, 1, _BINS_PSI + 1)[1:-1]))
+        ref[c] = {"cortes": cortes.tolist(), "p": _proporciones(X[c].to_numpy(), cortes).tolist()}
+    return ref
+
+
+def _proporciones(v, cortes):
+    return np.bincount(np.searchsorted(cortes, v, side="right"), minlength=len(cortes) + 1) / max(len(v), 1)
+
+
+def _psi(p, q, eps=1e-4):
+    p, q = np.clip(p, eps, None), np.clip(q, eps, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class DetectorOutliers:
+    """StandardScaler + IsolationForest con la referencia de las features de entrenamiento."""
+
+    def __init__(self, contaminacion=OUTLIERS_CONTAMINACION, max_samples=OUTLIERS_MAX_SAMPLES,
+                 n_jobs=OUTLIERS_N_JOBS, random_state=42):
+        self.contaminacion = contaminacion
+        self.max_samples = max_samples
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.version = None
+
+    def fit(self, df):
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import IsolationForest
+        X = _matriz(df)
+        self.scaler = StandardScaler().fit(X)
+        self.iso = IsolationForest(contamination=self.contaminacion, max_samples=self.max_samples,
+                                   n_jobs=self.n_jobs, random_state=self.random_state)
+        self.iso.fit(self.scaler.transform(X))
+        self.referencia = _referencia(X)
+        self.filas = len(X)
+        h = hashlib.sha256(_hash_filas(X).tobytes())
+        self.version = f"{datetime.now():%Y%m%d-%H%M%S}-{h.hexdigest()[:8]}"
+        return self
+
+    def score_samples(self, df):
+        """Score de IsolationForest (más bajo = más anómalo); outlier si < self.iso.offset_."""
+        X = self.scaler.transform(_matriz(df))
+        return self.iso.score_samples(X) if len(X) else np.array([], dtype=float)
+
+    def drift(self, df):
+        """PSI de cada feature de `df` contra la distribución de entrenamiento."""
+        X = _matriz(df)
+        return {c: _psi(np.asarray(r["p"]), _proporciones(X[c].to_numpy(), np.asarray(r["cortes"])))
+                for c, r in self.referencia.items()}
+
+    def guardar(self, directorio=MODELO_DIR):
+        import joblib
+        os.makedirs(directorio, exist_ok=True)
+        path = os.path.join(directorio, f"outliers_{self.version}.joblib")
+        joblib.dump(vars(self), f"{path}.parcial")  # dict: no depende de dónde se importó la clase
+        os.replace(f"{path}.parcial", path)
+        # Los scores cacheados de versiones anteriores ya no se usan
+        for f in os.listdir(directorio):
+            if f.startswith("outliers_") and f.endswith("_scores.pkl") and self.version not in f:
+                os.remove(os.path.join(directorio, f))
+        with open(os.path.join(directorio, "outliers_actual.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "path": os.path.basename(path), "filas": self.filas,
+                       "contaminacion": self.contaminacion, "max_samples": self.max_samples}, f, indent=1)
+        return path
+
+    @classmethod
+    def cargar(cls, directorio=MODELO_DIR):
+        """Detector de `outliers_actual.json` (o None si todavía no hay uno)."""
+        try:
+            with open(os.path.join(directorio, "outliers_actual.json"), encoding="utf-8") as f:
+                actual = json.load(f)
+        except (OSError, ValueError):
+            return None
+        import joblib
+        det = cls.__new__(cls)
+        det.__dict__.update(joblib.load(os.path.join(directorio, actual["path"])))
+        return det
+
+
+def _puntuar_incremental(det, X, directorio):
+    # Caché {hash de fila: score} por versión: el score de una fila depende sólo de sus features
+    path = os.path.join(directorio, f"outliers_{det.version}_scores.pkl")
+    cache = pd.read_pickle(path) if os.path.exists(path) else pd.Series(dtype="float64")
+    hashes = _hash_filas(X)
+    scores = pd.Series(hashes).map(cache)
+    nuevas = scores.isna().to_numpy()
+    if nuevas.any():
+        unicos, idx = np.unique(hashes[nuevas], return_index=True)
+        calculados = det.score_samples(X[nuevas].iloc[idx])
+        scores[nuevas] = pd.Series(calculados, index=unicos).reindex(hashes[nuevas]).to_numpy()
+        cache = pd.concat([cache, pd.Series(calculados, index=unicos)])
+        cache.to_pickle(f"{path}.parcial")
+        os.replace(f"{path}.parcial", path)
+    return scores.to_numpy(), int(nuevas.sum())
+
+
+def puntuar(df, refit=False, directorio=MODELO_DIR):
+    """Copia de `df` con `anomalia` y `es_outlier` según el detector guardado.
+    Se reentrena (y se guarda una versión nueva) si refit=True, si no hay detector o si hay drift."""
+    det = None if refit else DetectorOutliers.cargar(directorio)
+    motivo = "pedido" if refit else ("no había detector" if det is None else None)
+    if det is not None and len(df):
+        psi = det.drift(df)
+        peor = max(psi, key=psi.get)
+        if psi[peor] > OUTLIERS_DRIFT_PSI:
+            motivo = f"drift en {peor}: PSI {psi[peor]:.2f} > {OUTLIERS_DRIFT_PSI}"
+    if motivo:
+        det = DetectorOutliers().fit(df)
+        det.guardar(directorio)
+        print(f"🧽 Detector de outliers reentrenado ({motivo}) → versión {det.version}")
+
+    scores, nuevas = _puntuar_incremental(det, _matriz(df), directorio)
+    print(f"🧽 Outliers {det.version}: {nuevas} filas puntuadas, {len(df) - nuevas} del caché")
+    out = df.copy()
+    out["anomalia"] = -scores
+    out["es_outlier"] = scores < det.iso.offset_
+    return out
+
+
+def sin_outliers(puntuado):
+    """Filas no marcadas como outlier y con barrio: el dataset limpio de gráficos, modelo e insights."""
+    clean = puntuado[~puntuado["es_outlier"]].copy()
+
+    # 🔹 Aseguramos que la columna de barrios simplificados exista
+    if "Barrio_simplificado" not in clean.columns:
+        clean["Barrio_simplificado"] = clean["Barrio"].fillna("Sin barrio").str.strip().str.title()
+
+    # 🔹 Normalizamos valores nulos y eliminamos sin barrio
+    clean["Barrio_simplificado"] = clean["Barrio_simplificado"].replace("", np.nan)
+    return clean.dropna(subset=["Barrio_simplificado"])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Detector de outliers persistido")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info", help="versión del detector actual").add_argument("--dir", default=MODELO_DIR)
+    r = sub.add_parser("reentrenar", help="reentrenar el detector sobre un dataset con features")
+    r.add_argument("entrada")
+    r.add_argument("--dir", default=MODELO_DIR)
+    d = sub.add_parser("drift", help="PSI por feature de un dataset contra el detector actual")
+    d.add_argument("entrada")
+    d.add_argument("--dir", default=MODELO_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "info":
+        det = DetectorOutliers.cargar(args.dir)
+        if det is None:
+            print(f"⚠️ No hay detector en {args.dir}")
+            return 1
+        print(f"🧽 Detector {det.version}: {det.filas} filas, contaminación {det.contaminacion}, "
+              f"max_samples {det.max_samples}")
+        return 0
+
+    from dataset import cargar_dataset
+    df = cargar_dataset(args.entrada)
+    if args.cmd == "reentrenar":
+        puntuar(df, refit=True, directorio=args.dir)
+        return 0
+    det = DetectorOutliers.cargar(args.dir)
+    if det is None:
+        print(f"⚠️ No hay detector en {args.dir}")
+        return 1
+    for c, v in sorted(det.drift(df).items(), key=lambda kv: -kv[1]):
+        print(f"   {v:6.3f}  {c}{'  ⚠️' if v > OUTLIERS_DRIFT_PSI else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# parsers.py
+# Capa de parseo con backends intercambiables. "bs4" es el parseo original
+# (BeautifulSoup + html.parser); "lxml" lee los mismos nodos con XPath
+# precompilados, sin armar el árbol de BeautifulSoup. Ambos devuelven lo mismo.
+# Las coordenadas (lat/lon) salen del primer elemento con data-latitude/data-longitude
+# (el mapa del aviso); si la página no lo tiene quedan en None.
+# OJO: ese selector todavía no está verificado contra fichas reales. Sólo lo tienen
+# las fixtures de tests/ (sintéticas); no hay HTML real guardado en el repo y los CSV
+# de output/data no traen coordenadas. Hasta confirmarlo con el caché de HTML
+# (tests/test_parsers.py lo recorre si existe) lat/lon pueden venir siempre en None
+# y la asignación por polígono (features.add_features) no se activa.
+from config import PARSER_BACKEND
+
+
+def _clase(c):
+    # Equivalente XPath de class_="c" en BeautifulSoup (match por token de clase)
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')"
+
+
+class BsParser:
+    nombre = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._bs = BeautifulSoup
+
+    def ids(self, html):
+        soup = self._bs(html, "html.parser")
+        holder = soup.find(id="ga-dimension-list")
+        if not holder: return None
+        return holder.get("data-ids-avisos-mostrados","").split(",")
+
+    def paginas(self, html):
+        soup = self._bs(html, "html.parser")
+        pag = soup.find("ul", class_="pagination pagination--links")
+        if not pag: return 1
+        lis = pag.find_all("li")
+        try: return int(lis[-2].text)
+        except: return 1
+
+    def detalle(self, html, link):
+        soup = self._bs(html, "html.parser")
+        main = soup.find(class_="property-main")
+        if not main:
+            return None
+        feats = main.find(class_="property-main-features")
+        precio = main.find("p", class_="titlebar__price")
+        expensa = main.find("p", class_="titlebar__expenses")
+        barrio = main.find("h2", class_="titlebar__title")
+
+        mapa = soup.find(attrs={"data-latitude": True, "data-longitude": True})
+
+        data = {
+            "Link": link,
+            "precio": precio.text if precio else None,
+            "expensas": expensa.text if expensa else None,
+            "Barrio": barrio.text if barrio else None,
+            "lat": mapa.get("data-latitude") if mapa else None,
+            "lon": mapa.get("data-longitude") if mapa else None,
+        }
+        if feats:
+            for e in feats.find_all(recursive=False):
+                titulo = e.get("title")
+                v = e.find("p", class_="strong")
+                if titulo and v: data[titulo] = v.text.strip()
+        return data
+
+
+class LxmlParser:
+    nombre = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._fromstring = lxml.html.fromstring
+        self._errores = (etree.ParserError, ValueError)
+        X = etree.XPath
+        self._holder = X('//*[@id="ga-dimension-list"]')
+        self._lis = X('(//ul[@class="pagination pagination--links"])[1]//li')
+        self._pag = X('//ul[@class="pagination pagination--links"]')
+        self._main = X(f'//*[{_clase("property-main")}]')
+        self._feats = X(f'.//*[{_clase("property-main-features")}]')
+        self._precio = X(f'.//p[{_clase("titlebar__price")}]')
+        self._expensa = X(f'.//p[{_clase("titlebar__expenses")}]')
+        self._barrio = X(f'.//h2[{_clase("titlebar__title")}]')
+        self._strong = X(f'.//p[{_clase("strong")}]')
+        self._mapa = X('(//*[@data-latitude and @data-longitude])[1]')
+
+    def _doc(self, html):
+        try: return self._fromstring(html) if html else None
+        except self._errores: return None
+
+    @staticmethod
+    def _primero(xpath, nodo):
+        r = xpath(nodo)
+        return r[0] if r else None
+
+    def ids(self, html):
+        doc = self._doc(html)
+        holder = self._primero(self._holder, doc) if doc is not None else None
+        if holder is None: return None
+        return holder.get("data-ids-avisos-mostrados","").split(",")
+
+    def paginas(self, html):
+        doc = self._doc(html)
+        if doc is None or not self._pag(doc): return 1
+        lis = self._lis(doc)
+        try: return int(lis[-2].text_content())
+        except: return 1
+
+    def detalle(self, html, link):
+        doc = self._doc(html)
+        main = self._primero(self._main, doc) if doc is not None else None
+        if main is None:
+            return None
+        feats = self._primero(self._feats, main)
+        precio = self._primero(self._precio, main)
+        expensa = self._primero(self._expensa, main)
+        barrio = self._primero(self._barrio, main)
+        mapa = self._primero(self._mapa, doc)
+
+        data = {
+            "Link": link,
+            "precio": precio.text_content() if precio is not None else None,
+            "expensas": expensa.text_content() if expensa is not None else None,
+            "Barrio": barrio.text_content() if barrio is not None else None,
+            "lat": mapa.get("data-latitude") if mapa is not None else None,
+            "lon": mapa.get("data-longitude") if mapa is not None else None,
+        }
+        if feats is not None:
+            for e in feats:
+                if not isinstance(e.tag, str): continue  # comentarios / PIs
+                titulo = e.get("title")
+                v = self._primero(self._strong, e)
+                if titulo and v is not None: data[titulo] = v.text_content().strip()
+        return data
+
+
+PARSERS = {"bs4": BsParser, "lxml": LxmlParser}
+_instancias = {}
+
+
+def get_parser(nombre=PARSER_BACKEND):
+    """Instancia (cacheada) del backend pedido; si lxml no está instalado, cae a bs4."""
+    if nombre not in PARSERS:
+        raise ValueError(f"parser desconocido: {nombre!r} (opciones: {', '.join(PARSERS)})")
+    if nombre not in _instancias:
+        try:
+            _instancias[nombre] = PARSERS[nombre]()
+        except ImportError:
+            if nombre == "bs4": raise
+            print(f"⚠️ Parser {nombre} no disponible, usando bs4")
+            _instancias[nombre] = get_parser("bs4")
+    return _instancias[nombre]
+
+
+def parse_ids(html):
+    return get_parser().ids(html)
+
+def parse_paginas(html):
+    return get_parser().paginas(html)
+
+def parse_detalle(html, link):
+    return get_parser().detalle(html, link)
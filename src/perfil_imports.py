@@ -0,0 +1,55 @@
+# perfil_imports.py
+# Reporte de tiempo de import (python -X importtime) de un módulo, en un proceso
+# limpio para que no influya lo que ya esté cargado:
+#   python src/perfil_imports.py                 # main (arranque del pipeline)
+#   python src/perfil_imports.py insights_advanced --top 30
+#   python src/main.py --perfil-imports
+import os, sys, argparse, subprocess
+
+_SRC = os.path.dirname(os.path.abspath(__file__))
+
+
+def medir_imports(modulo="main"):
+    """Devuelve [(paquete, self_us, acumulado_us, nivel)] en el orden de -X importtime."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                       cwd=_SRC, capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{r.stderr.strip().splitlines()[-1]}")
+    filas = []
+    for linea in r.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        nivel = (len(nombre) - len(nombre.lstrip())) // 2
+        filas.append((nombre.strip(), int(propio), int(acumulado), nivel))
+    return filas
+
+
+def perfil_imports(modulo="main", top=15):
+    """Imprime el total y los paquetes de primer nivel más caros. Devuelve el total en segundos."""
+    filas = medir_imports(modulo)
+    raiz = next((f for f in filas if f[0] == modulo), None)
+    total = (raiz[2] if raiz else sum(f[2] for f in filas if f[3] == 0)) / 1e6
+    # Paquetes raíz (sin punto) importados directa o indirectamente, agregados por nombre
+    paquetes = {}
+    for nombre, _, acumulado, nivel in filas:
+        if nivel > 0 and "." not in nombre:
+            paquetes[nombre] = max(paquetes.get(nombre, 0), acumulado)
+    print(f"⏱️ import {modulo}: {total:.2f}s")
+    for nombre, us in sorted(paquetes.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"   {us / 1e6:7.3f}s  {nombre}")
+    return total
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tiempo de import por paquete (python -X importtime)")
+    ap.add_argument("modulos", nargs="*", default=["main"])
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args(argv)
+    for m in args.modulos:
+        perfil_imports(m, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# pipeline.py
+# Modo streaming: las filas salen del scraper a medida que terminan, se limpian y
+# enriquecen en micro-batches y se agregan al archivo de salida. La memoria queda
+# acotada por el tamaño del batch y los primeros resultados están antes de que
+# termine el crawl.
+import os
+import pandas as pd
+from cleaning import clean_data
+from features import add_features
+from dataset import tipar, esquema_arrow, tabla_arrow, formato_efectivo, _arrow
+from config import PIPELINE_BATCH, DATASET_COMPRESION
+
+# Orden de columnas del CSV base (crudas del scraper + limpieza + features)
+COLUMNAS_BASE = [
+    "Link", "precio", "expensas", "Barrio", "Sup. cubierta", "Antiguedad", "Baños", "Ambientes",
+    "Disposición", "Orientación", "Dormitorios", "Toilettes", "Estado", "Cocheras",
+    "Apto profesional", "Permite mascota", "Moneda", "Total", "Barrio_simplificado",
+    "m2", "precio_m2", "expensas_ratio", "amb_m2", "Antig_binned", "log_total",
+    "lat", "lon", "Barrio_geo",
+]
+
+
+class CsvSink:
+    """Agrega micro-batches a un CSV con un esquema de columnas fijo."""
+
+    def __init__(self, path, columnas=COLUMNAS_BASE):
+        self.path = path
+        self.columnas = list(columnas)
+        self.filas = 0
+        self._ignoradas = set()
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        self._tmp = f"{path}.parcial"
+        if os.path.exists(self._tmp): os.remove(self._tmp)
+
+    def append(self, df):
+        nuevas = set(df.columns) - set(self.columnas) - self._ignoradas
+        if nuevas:
+            print(f"⚠️ Columnas fuera del esquema, se ignoran: {sorted(nuevas)}")
+            self._ignoradas |= nuevas
+        df.reindex(columns=self.columnas).to_csv(
+            self._tmp, mode="a", header=self.filas == 0, index=False, encoding="utf-8-sig" if self.filas == 0 else "utf-8")
+        self.filas += len(df)
+
+    def close(self):
+        # Se publica recién al final: un corte a mitad de camino no pisa el CSV anterior
+        if self.filas:
+            os.replace(self._tmp, self.path)
+        return self.filas
+
+
+class ParquetSink(CsvSink):
+    """Como CsvSink, pero cada micro-batch es un row group Parquet tipado (ESQUEMA de dataset.py)."""
+
+    def __init__(self, path, columnas=COLUMNAS_BASE):
+        super().__init__(path, columnas)
+        self._schema = esquema_arrow(self.columnas)
+        self._writer = None
+
+    def append(self, df):
+        nuevas = set(df.columns) - set(self.columnas) - self._ignoradas
+        if nuevas:
+            print(f"⚠️ Columnas fuera del esquema, se ignoran: {sorted(nuevas)}")
+            self._ignoradas |= nuevas
+        if self._writer is None:
+            _, pq = _arrow()
+            self._writer = pq.ParquetWriter(self._tmp, self._schema, compression=DATASET_COMPRESION)
+        self._writer.write_table(tabla_arrow(tipar(df.reindex(columns=self.columnas)), self._schema))
+        self.filas += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return super().close()
+
+
+def nuevo_sink(path, columnas=COLUMNAS_BASE):
+    """Sink según la extensión de `path` (.parquet o .csv)."""
+    if path.endswith(".parquet") and formato_efectivo("parquet") == "parquet":
+        return ParquetSink(path, columnas)
+    return CsvSink(path, columnas)
+
+
+def _procesar(filas, cotizacion_usd):
+    df = clean_data(pd.DataFrame(filas), cotizacion_usd=cotizacion_usd, copy=False)
+    return add_features(df, copy=False)
+
+
+def stream_pipeline(filas, sink, batch=PIPELINE_BATCH, cotizacion_usd=1350):
+    """Consume un iterable de filas crudas (p. ej. `iter_scraper_caba()`), limpia y
+    genera features cada `batch` filas y las agrega a `sink`. Devuelve las filas escritas."""
+    buffer, crudas = [], 0
+    for fila in filas:
+        buffer.append(fila)
+        if len(buffer) >= batch:
+            sink.append(_procesar(buffer, cotizacion_usd))
+            crudas += len(buffer)
+            buffer = []
+            print(f"🌊 {crudas} filas procesadas → {sink.filas} guardadas")
+    if buffer:
+        sink.append(_procesar(buffer, cotizacion_usd))
+        crudas += len(buffer)
+    escritas = sink.close()
+    print(f"🌊 Streaming terminado: {crudas} filas crudas → {escritas} guardadas")
+    return escritas
@@ -0,0 +1,86 @@
+# regresion.py
+# Regresión lineal simple y = ordenada + pendiente·x para todos los grupos a la vez, en forma
+# cerrada desde estadísticos suficientes por grupo: n, medias, sumas de cuadrados y de
+# productos centradas (Sxx, Sxy, Syy), mínimo y máximo de x. Se calculan con un groupby sobre
+# las filas y se pueden unir (fórmula de Chan), así que se acumulan por barrio, fecha o lo que
+# sea sin volver a las filas. Reemplaza a trendline="ols" de plotly (statsmodels, un ajuste
+# por traza) y al LinearRegression de la elasticidad:
+#   est = suficientes(df, "m2", "Total", por="Barrio_simplificado")
+#   ajustar(est)               # pendiente, ordenada, r2, error estándar e IC por grupo
+#   elasticidades(df)          # log(Total) ~ log(m²) por barrio
+import numpy as np
+import pandas as pd
+from config import REGRESION_NIVEL, REGRESION_MIN_N
+
+TOTAL = "total"     # índice del grupo único cuando no hay `por`
+
+
+def suficientes(df, x, y, por=None):
+    """Estadísticos suficientes de y ~ x por grupo de `por` (columna, lista o None)."""
+    d = pd.DataFrame({"x": pd.to_numeric(df[x], errors="coerce").to_numpy(dtype=np.float64),
+                      "y": pd.to_numeric(df[y], errors="coerce").to_numpy(dtype=np.float64)}, index=df.index)
+    claves = [df[c] for c in ([por] if isinstance(por, str) else por)] if por is not None \
+        else [pd.Series(TOTAL, index=df.index)]
+    ok = np.isfinite(d["x"]) & np.isfinite(d["y"])
+    for c in claves:
+        ok &= c.notna()
+    d, claves = d[ok], [c[ok] for c in claves]
+    g = d.groupby(claves, observed=True, sort=True)
+    # Centrado por grupo antes de sumar: estable aunque x e y sean del orden de 1e6
+    dx, dy = d["x"] - g["x"].transform("mean"), d["y"] - g["y"].transform("mean")
+    c = (pd.DataFrame({"dxx": dx * dx, "dxy": dx * dy, "dyy": dy * dy})
+         .groupby(claves, observed=True, sort=True).sum())
+    est = pd.DataFrame({"n": g.size(), "mx": g["x"].mean(), "my": g["y"].mean(),
+                        "sxx": c["dxx"], "sxy": c["dxy"], "syy": c["dyy"],
+                        "xmin": g["x"].min(), "xmax": g["x"].max()})
+    if por is None:
+        est.index = pd.Index([TOTAL])
+    return est
+
+
+def unir(*ests):
+    """Estadísticos de la unión de los grupos con el mismo índice (Chan et al.)."""
+    todos = pd.concat(ests)
+    g = todos.groupby(level=list(range(todos.index.nlevels)), sort=True)
+    gi = g.ngroup().to_numpy()
+    k = todos["n"].to_numpy(dtype=np.float64)
+    n = np.bincount(gi, weights=k)
+    mx = np.bincount(gi, weights=k * todos["mx"].to_numpy()) / n
+    my = np.bincount(gi, weights=k * todos["my"].to_numpy()) / n
+    # Cada parte aporta su suma centrada más n_parte·(media parcial - media total)²
+    ex, ey = todos["mx"].to_numpy() - mx[gi], todos["my"].to_numpy() - my[gi]
+    suma = lambda c, extra: np.bincount(gi, weights=todos[c].to_numpy() + k * extra)
+    return pd.DataFrame({"n": n.astype(np.int64), "mx": mx, "my": my, "sxx": suma("sxx", ex * ex),
+                         "sxy": suma("sxy", ex * ey), "syy": suma("syy", ey * ey),
+                         "xmin": g["xmin"].min().to_numpy(), "xmax": g["xmax"].max().to_numpy()},
+                        index=g.size().index)
+
+
+def ajustar(est, nivel=REGRESION_NIVEL, min_n=3):
+    """Ajuste de cada grupo: pendiente, ordenada, r2, ee (error estándar de la pendiente) e
+    IC de la pendiente al `nivel` (t de Student con n-2 grados de libertad). Los grupos con
+    menos de `min_n` filas o sin variación en x quedan con NaN."""
+    from scipy.stats import t
+    n, sxx, sxy, syy = (est[c].to_numpy(dtype=np.float64) for c in ("n", "sxx", "sxy", "syy"))
+    valido = (n >= max(min_n, 3)) & (sxx > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = np.where(valido, sxy / sxx, np.nan)
+        a = est["my"].to_numpy() - b * est["mx"].to_numpy()
+        sse = np.clip(syy - b * sxy, 0, None)
+        r2 = np.where(syy > 0, 1 - sse / syy, 1.0)
+        ee = np.sqrt(sse / (n - 2) / sxx)
+        tc = t.ppf((1 + nivel) / 2, np.maximum(n - 2, 1))
+    return pd.DataFrame({"n": est["n"], "pendiente": b, "ordenada": a, "r2": np.where(valido, r2, np.nan),
+                         "ee": np.where(valido, ee, np.nan), "ic_bajo": b - tc * ee, "ic_alto": b + tc * ee,
+                         "xmin": est["xmin"], "xmax": est["xmax"]}, index=est.index)
+
+
+def elasticidades(df, por="Barrio_simplificado", x="m2", y="Total", nivel=REGRESION_NIVEL,
+                  min_n=REGRESION_MIN_N):
+    """Elasticidad de `y` respecto de `x` (pendiente de log y ~ log x) por grupo, con IC."""
+    d = df[(pd.to_numeric(df[x], errors="coerce") > 0) & (pd.to_numeric(df[y], errors="coerce") > 0)]
+    logs = pd.DataFrame({"log_x": np.log(d[x].astype("float64")), "log_y": np.log(d[y].astype("float64"))},
+                        index=d.index)
+    if por is not None:
+        logs[por] = d[por]
+    return ajustar(suficientes(logs, "log_x", "log_y", por), nivel, min_n)
@@ -0,0 +1,188 @@
+# render.py
+# Escritura de las figuras plotly de una etapa. Antes cada write_html embebía plotly.js
+# (~4.8 MB por archivo); con PLOTS_PLOTLYJS:
+#   "compartido": un solo plotly.min.js por árbol de salida y cada HTML lo referencia,
+#   "dashboard":  un único HTML por etapa con todas sus figuras (y plotly.js una vez),
+#   "cdn":        los HTML cargan plotly.js del CDN (necesita internet para verlos),
+#   "embebido":   como antes, cada archivo autocontenido.
+# Bajo el runner de etapas (stages.py) plotly.min.js no se copia en el directorio de
+# cada etapa: lo escribe una vez StageRunner._publicar en el out_dir final.
+# Las figuras se juntan y se escriben juntas al final:
+#   figs = Figuras(out_dir, "insights", titulo="Insights avanzados")
+#   figs.agregar(fig, "precio_m2_por_barrio.html")
+#   ...
+#   figs.escribir()
+#
+# Scatter con muchos puntos (scatter()): WebGL desde PLOTS_WEBGL_DESDE filas y, por encima
+# de PLOTS_MAX_PUNTOS, una muestra que conserva la densidad y todos los puntos aislados;
+# las rectas OLS salen de regresion.py (todas las filas, todos los grupos de una vez).
+#
+# Histogramas y boxplots de agregados (histograma_cubo, box_cubo) salen del cubo (cubo.py).
+import os, html
+import numpy as np
+import pandas as pd
+from config import PLOTS_PLOTLYJS, PLOTS_WEBGL_DESDE, PLOTS_MAX_PUNTOS, PLOTS_GRILLA
+
+PLOTLYJS = "plotly.min.js"
+MODOS = ("compartido", "dashboard", "cdn", "embebido")
+COPIAR_PLOTLYJS = True  # False: otro (StageRunner) deja plotly.min.js en el árbol publicado
+
+
+def usa_plotlyjs(modo=PLOTS_PLOTLYJS):
+    """Si los HTML de `modo` referencian un plotly.min.js al lado."""
+    return modo in ("compartido", "dashboard")
+
+
+def escribir_plotlyjs(out_dir):
+    """Copia plotly.min.js (el del paquete instalado) a out_dir si no está o cambió de versión."""
+    from plotly.offline import get_plotlyjs
+    js = get_plotlyjs()
+    path = os.path.join(out_dir, PLOTLYJS)
+    if not (os.path.exists(path) and os.path.getsize(path) == len(js.encode("utf-8"))):
+        with open(f"{path}.parcial", "w", encoding="utf-8") as f:
+            f.write(js)
+        os.replace(f"{path}.parcial", path)
+    return path
+
+
+class Figuras:
+    """Junta las figuras plotly de una etapa para escribirlas juntas en `out_dir`."""
+
+    def __init__(self, out_dir, nombre, titulo=None, modo=PLOTS_PLOTLYJS):
+        if modo not in MODOS:
+            raise ValueError(f"PLOTS_PLOTLYJS desconocido: {modo} (opciones: {', '.join(MODOS)})")
+        self.out_dir = out_dir
+        self.modo = modo
+        self.nombre = nombre        # modo dashboard: dashboard_<nombre>.html
+        self.titulo = titulo or nombre
+        self.figuras = []
+
+    def agregar(self, fig, archivo):
+        self.figuras.append((fig, archivo))
+
+    def _html(self, fig, completo):
+        incluir = {"compartido": PLOTLYJS, "cdn": "cdn", "embebido": True}.get(self.modo, False)
+        return fig.to_html(full_html=completo, include_plotlyjs=incluir if completo else False)
+
+    def _escribir_uno(self, fig, archivo):
+        path = os.path.join(self.out_dir, archivo)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._html(fig, completo=True))
+        return path
+
+    def escribir(self):
+        """Escribe las figuras juntadas y devuelve las rutas."""
+        if not self.figuras:
+            return []
+        os.makedirs(self.out_dir, exist_ok=True)
+        if usa_plotlyjs(self.modo) and COPIAR_PLOTLYJS:
+            escribir_plotlyjs(self.out_dir)
+        # En serie: to_html es Python puro (tiene el GIL) y pasar las figuras a otro
+        # proceso cuesta lo mismo que serializarlas, así que paralelizar no rinde
+        if self.modo != "dashboard":
+            paths = [self._escribir_uno(fig, archivo) for fig, archivo in self.figuras]
+        else:
+            paths = [self._dashboard([self._html(fig, completo=False) for fig, _ in self.figuras])]
+        self.figuras = []
+        return paths
+
+    def _dashboard(self, divs):
+        ids = [html.escape(os.path.splitext(a)[0]) for _, a in self.figuras]
+        indice = " · ".join(f'<a href="#{i}">{i}</a>' for i in ids)
+        secciones = "\n".join(f'<section id="{i}">{div}</section>' for i, div in zip(ids, divs))
+        path = os.path.join(self.out_dir, f"dashboard_{self.nombre}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(self.titulo)}</title>'
+                    f'<script src="{PLOTLYJS}"></script></head>\n<body><h1>{html.escape(self.titulo)}</h1>'
+                    f'<nav>{indice}</nav>\n{secciones}\n</body></html>\n')
+        return path
+
+
+def muestra_densidad(df, x, y, max_puntos=PLOTS_MAX_PUNTOS, grilla=PLOTS_GRILLA, piso=3, conservar=None,
+                     random_state=42):
+    """Submuestra de `df` de ~max_puntos filas para graficar x vs y.
+
+    Se arma una grilla de grilla x grilla celdas sobre (x, y): las celdas con hasta `piso`
+    filas (puntos aislados, outliers) se conservan enteras y el resto se muestrea con la
+    misma tasa en todas las celdas, así la densidad relativa no cambia. `conservar`: máscara
+    de filas que siempre quedan. Las filas sin x o y se descartan (no se grafican igual)."""
+    df = df[df[x].notna() & df[y].notna()]
+    if len(df) <= max_puntos:
+        return df
+    vx, vy = df[x].to_numpy(dtype=np.float64), df[y].to_numpy(dtype=np.float64)
+    ix = np.clip(((vx - vx.min()) / (np.ptp(vx) or 1) * grilla).astype(np.int64), 0, grilla - 1)
+    iy = np.clip(((vy - vy.min()) / (np.ptp(vy) or 1) * grilla).astype(np.int64), 0, grilla - 1)
+    celda = ix * grilla + iy
+    por_celda = np.bincount(celda, minlength=grilla * grilla)[celda]
+    fijas = por_celda <= piso
+    if conservar is not None:
+        fijas |= np.asarray(conservar.loc[df.index] if hasattr(conservar, "loc") else conservar, dtype=bool)
+    resto = (~fijas).sum()
+    tasa = max(max_puntos - fijas.sum(), 0) / resto if resto else 0.0
+    elegidas = fijas | (np.random.default_rng(random_state).random(len(df)) < tasa)
+    return df[elegidas]
+
+
+def _agregar_tendencias(fig, ajuste, x, y):
+    # Una recta por grupo (ajuste de regresion.ajustar) con el color de la traza de su grupo
+    import plotly.graph_objects as go
+    colores = {t.name: t.marker.color for t in fig.data}
+    # Mismo tipo de traza que los puntos: no mezclar WebGL y SVG en una figura
+    traza = go.Scattergl if any(t.type == "scattergl" for t in fig.data) else go.Scatter
+    un_grupo = len(ajuste) == 1
+    for nombre, r in ajuste.dropna(subset=["pendiente"]).iterrows():
+        clave = None if un_grupo else str(nombre)
+        color = colores.get(clave) or (fig.data[0].marker.color if un_grupo and fig.data else None)
+        x0, x1 = r["xmin"], r["xmax"]
+        fig.add_trace(traza(
+            x=[x0, x1], y=[r["ordenada"] + r["pendiente"] * x0, r["ordenada"] + r["pendiente"] * x1],
+            mode="lines", showlegend=False, legendgroup=clave, name=f"OLS {clave or ''}".strip(),
+            line=dict(color=color) if color else None,
+            hovertemplate=(f"{y} = {r['pendiente']:.4g}·{x} + {r['ordenada']:.4g}<br>"
+                           f"IC pendiente [{r['ic_bajo']:.4g}, {r['ic_alto']:.4g}]<br>"
+                           f"R² = {r['r2']:.3f} ({int(r['n']):,} filas)<extra></extra>")))
+
+
+def scatter(df, x, y, color=None, trendline=False, max_puntos=PLOTS_MAX_PUNTOS, conservar=None,
+            title=None, tendencias=None, **kwargs):
+    """px.scatter que escala: igual que antes hasta PLOTS_WEBGL_DESDE filas; después WebGL y,
+    con más de `max_puntos`, muestra por densidad. Las rectas OLS (trendline=True) se ajustan
+    con todas las filas en forma cerrada (regresion.py), o vienen ya calculadas en `tendencias`."""
+    import plotly.express as px
+    grande = len(df) > PLOTS_WEBGL_DESDE
+    muestra = muestra_densidad(df, x, y, max_puntos, conservar=conservar) if len(df) > max_puntos else df
+    if len(muestra) < len(df):
+        title = f"{title} — {len(muestra):,} de {len(df):,} puntos (muestra por densidad)"
+    fig = px.scatter(muestra, x=x, y=y, color=color, title=title,
+                     render_mode="webgl" if grande else "auto", **kwargs)
+    if trendline and tendencias is None:
+        from regresion import suficientes, ajustar
+        tendencias = ajustar(suficientes(df, x, y, por=color))
+    if tendencias is not None:
+        _agregar_tendencias(fig, tendencias, x, y)
+    return fig
+
+
+def histograma_cubo(cubo, metrica, bins=60, title=None):
+    """Histograma de `metrica` desde el cubo de agregados (cubo.py), sin las filas."""
+    import plotly.graph_objects as go
+    bordes, conteos = cubo.histograma(metrica, bins)
+    fig = go.Figure(go.Bar(x=(bordes[:-1] + bordes[1:]) / 2, y=conteos, width=np.diff(bordes),
+                           name=metrica, hovertemplate=f"{metrica} %{{x:,.0f}}: %{{y}}<extra></extra>"))
+    fig.update_layout(title=title, bargap=0)
+    return fig
+
+
+def box_cubo(cubo, metrica, por="barrio", title=None):
+    """Boxplot por `por` con cuartiles y medias del cubo; los bigotes van hasta 1.5 IQR
+    acotados por el mínimo y el máximo (no se dibujan los puntos atípicos)."""
+    import plotly.graph_objects as go
+    q = cubo.cuantiles([por], metrica)
+    r = cubo.resumen([por], [metrica]).set_index(por).reindex(q.index)
+    iqr = q[0.75] - q[0.25]
+    fig = go.Figure(go.Box(
+        x=q.index.astype(str), q1=q[0.25], median=q[0.5], q3=q[0.75], mean=r[f"{metrica}_media"],
+        lowerfence=np.maximum(r[f"{metrica}_min"], q[0.25] - 1.5 * iqr),
+        upperfence=np.minimum(r[f"{metrica}_max"], q[0.75] + 1.5 * iqr), name=metrica))
+    fig.update_layout(title=title)
+    return fig
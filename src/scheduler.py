@@ -0,0 +1,158 @@
+# scheduler.py
+# Planificador global del descubrimiento de IDs: encola trabajo a nivel página
+# entre todos los barrios, reparte MAX_PROPS_POR_BARRIO de forma pareja,
+# reasigna el cupo que un barrio no llega a usar y corta apenas se alcanza
+# MAX_PROPS_TOTAL (cancelando lo que quedó pendiente).
+import asyncio, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import MAX_PROPS_TOTAL, MAX_PROPS_POR_BARRIO
+
+IDS_POR_PAGINA_ESTIMADOS = 20   # hasta conocer el real (se aprende de la página 1)
+
+
+class CrawlScheduler:
+    """Máquina de estados sin I/O: `siguientes(n)` da tareas (barrio, página) y
+    `registrar(...)` recibe su resultado. Los ejecutores (threads o asyncio) sólo
+    despachan y reportan."""
+
+    def __init__(self, barrios, cupo_barrio=MAX_PROPS_POR_BARRIO, tope_total=MAX_PROPS_TOTAL):
+        self.barrios = list(barrios)
+        self.tope_total = tope_total
+        self.cupo = {b: cupo_barrio for b in self.barrios}
+        self.ids = {b: [] for b in self.barrios}
+        self.total_paginas = {}                 # barrio -> páginas (tras la 1)
+        self.proxima = {b: 1 for b in self.barrios}
+        self.en_vuelo = {b: 0 for b in self.barrios}
+        self.pedidas = {b: 0 for b in self.barrios}
+        self.cerrados = set()                   # barrios sin más páginas
+        self.reserva = {b: [] for b in self.barrios}  # IDs leídos por encima del cupo
+        self.fallidos = []                      # barrios cuya página 1 no se pudo leer
+        self._vistos = set()
+        self._ids_por_pagina = IDS_POR_PAGINA_ESTIMADOS
+        self._orden = {b: i for i, b in enumerate(self.barrios)}
+
+    # --- Estado ------------------------------------------------------------
+    @property
+    def total(self):
+        return len(self._vistos)
+
+    def terminado(self):
+        if self.total >= self.tope_total:
+            return True
+        activos = any(b not in self.cerrados and self._faltan(b) > 0 for b in self.barrios)
+        return not activos and not any(self.en_vuelo.values())
+
+    def _faltan(self, b):
+        return self.cupo[b] - len(self.ids[b])
+
+    def _quedan_paginas(self, b):
+        if b in self.cerrados: return False
+        if b not in self.total_paginas: return self.proxima[b] == 1
+        return self.proxima[b] <= self.total_paginas[b]
+
+    # --- Despacho ----------------------------------------------------------
+    def siguientes(self, n):
+        """Hasta `n` tareas nuevas, priorizando a los barrios con menos páginas pedidas."""
+        if n <= 0 or self.terminado(): return []
+        heap = [(self.pedidas[b], self._orden[b], b) for b in self.barrios if self._quedan_paginas(b)]
+        heapq.heapify(heap)
+        tareas = []
+        while heap and len(tareas) < n:
+            _, _, b = heapq.heappop(heap)
+            # Página 1 de un barrio: hay que esperarla para saber cuántas páginas tiene
+            if b not in self.total_paginas and self.en_vuelo[b]: continue
+            necesarias = -(-self._faltan(b) // self._ids_por_pagina)
+            if self.en_vuelo[b] >= max(necesarias, 1 if b not in self.total_paginas else 0): continue
+            tareas.append((b, self.proxima[b]))
+            self.proxima[b] += 1
+            self.en_vuelo[b] += 1
+            self.pedidas[b] += 1
+            if self._quedan_paginas(b):
+                heapq.heappush(heap, (self.pedidas[b], self._orden[b], b))
+        return tareas
+
+    def registrar(self, barrio, pagina, ids, total_paginas=None):
+        """Resultado de una página. ids=None si no se pudo leer."""
+        self.en_vuelo[barrio] -= 1
+        if pagina == 1:
+            if ids is None:
+                self.fallidos.append(barrio)
+                self._cerrar(barrio)
+                return
+            self.total_paginas[barrio] = total_paginas or 1
+            if ids: self._ids_por_pagina = max(len([i for i in ids if i]), 1)
+        self.reserva[barrio].extend(i for i in ids or [] if i)
+        self._promover(barrio)
+        if not self._quedan_paginas(barrio) and not self.en_vuelo[barrio]:
+            self._cerrar(barrio)
+
+    def _promover(self, b):
+        reserva = self.reserva[b]
+        while reserva and self._faltan(b) > 0:
+            i = reserva.pop(0)
+            if i in self._vistos: continue
+            self._vistos.add(i)
+            self.ids[b].append(i)
+
+    def _cerrar(self, b):
+        if b in self.cerrados: return
+        self.cerrados.add(b)
+        # Cupo no usado → se reparte entre los barrios que todavía tienen páginas
+        sobrante = max(self._faltan(b), 0)
+        self.cupo[b] = len(self.ids[b])
+        abiertos = [x for x in self.barrios if x not in self.cerrados]
+        for i, x in enumerate(abiertos):
+            self.cupo[x] += sobrante // len(abiertos) + (1 if i < sobrante % len(abiertos) else 0)
+            self._promover(x)
+
+    def resultado(self):
+        """IDs únicos intercalados entre barrios (reparto parejo), hasta el tope total."""
+        inter = itertools.chain.from_iterable(itertools.zip_longest(*self.ids.values()))
+        return [i for i in inter if i is not None][:self.tope_total]
+
+
+def ejecutar_threads(sched, fetch_pagina, workers):
+    """Corre el scheduler con `fetch_pagina(barrio, pagina) -> (ids, total_paginas)` en threads."""
+    ex = ThreadPoolExecutor(max_workers=workers)
+    pendientes = {}
+    try:
+        for t in sched.siguientes(workers):
+            pendientes[ex.submit(fetch_pagina, *t)] = t
+        while pendientes and not sched.terminado():
+            hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for f in hechos:
+                b, p = pendientes.pop(f)
+                try: ids, total = f.result()
+                except Exception as e:
+                    print(f"⚠️ Falló {b} pág. {p}: {e}")
+                    ids, total = None, None
+                sched.registrar(b, p, ids, total)
+            for t in sched.siguientes(workers - len(pendientes)):
+                pendientes[ex.submit(fetch_pagina, *t)] = t
+    finally:
+        # Tope alcanzado: no esperamos a las páginas que quedaron en curso
+        ex.shutdown(wait=False, cancel_futures=True)
+    return sched.resultado()
+
+
+async def ejecutar_async(sched, fetch_pagina, concurrencia):
+    """Igual que `ejecutar_threads` pero con una corutina `fetch_pagina`."""
+    pendientes = {}
+    try:
+        for t in sched.siguientes(concurrencia):
+            pendientes[asyncio.create_task(fetch_pagina(*t))] = t
+        while pendientes and not sched.terminado():
+            hechos, _ = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for f in hechos:
+                b, p = pendientes.pop(f)
+                try: ids, total = f.result()
+                except Exception as e:
+                    print(f"⚠️ Falló {b} pág. {p}: {e}")
+                    ids, total = None, None
+                sched.registrar(b, p, ids, total)
+            for t in sched.siguientes(concurrencia - len(pendientes)):
+                pendientes[asyncio.create_task(fetch_pagina(*t))] = t
+    finally:
+        for t in pendientes: t.cancel()
+        if pendientes: await asyncio.gather(*pendientes, return_exceptions=True)
+    return sched.resultado()
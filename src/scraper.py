@@ -1,111 +1,368 @@
 # scraper.py
-import time, itertools, math
+import time, itertools, math, queue, threading
+from contextlib import contextmanager
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup as bs
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from config import url_barrio, BARRIOS_CABA, MAX_PROPS_TOTAL, MAX_PROPS_POR_BARRIO, N_DRIVERS, HEADLESS
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from config import (url_pagina, url_detalle, BASE_URL, BARRIOS_CABA, MAX_PROPS_TOTAL,
+                    N_DRIVERS, HEADLESS, DRIVER_MAX_PAGINAS, SCRAPER_ENGINE, STORE_PATH, STORE_TTL_HORAS,
+                    STORE_TTL_DESCUBRIMIENTO_HORAS, HTML_CACHE_DIR, ESPERA_MAX,
+                    BROWSER_LIVIANO, BROWSER_BLOQUEAR_TIPOS, BROWSER_BLOQUEAR_DOMINIOS, BROWSER_MAX_MEMORIA_MB)
+from store import ListingStore
+from parsers import parse_ids, parse_paginas, parse_detalle
+from scheduler import CrawlScheduler, ejecutar_threads
+from throttle import AimdController, es_captcha
+from html_cache import HtmlCache, read_objeto
 
-BASE_ITEM_URL = "https://www.argenprop.com"
+BASE_ITEM_URL = BASE_URL
 
-def _init_driver():
+# Patrones de URL por tipo de recurso (CDP Network.setBlockedURLs sólo acepta URLs)
+_PATRONES_TIPO = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.avif*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "stylesheet": ["*.css*"],
+}
+
+def _init_driver(liviano=BROWSER_LIVIANO):
     opts = Options()
     if HEADLESS: opts.add_argument("--headless=new")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
-    return webdriver.Chrome(options=opts)
+    if liviano:
+        # Perfil liviano: no bajamos lo que nunca leemos (imágenes, fuentes, ads, analytics)
+        opts.page_load_strategy = "eager"   # DOM listo alcanza, no esperamos subrecursos
+        for a in ("--disable-extensions", "--disable-gpu", "--disable-background-networking",
+                  "--disable-sync", "--disable-default-apps", "--mute-audio", "--no-first-run",
+                  "--blink-settings=imagesEnabled=false",
+                  f"--js-flags=--max-old-space-size={BROWSER_MAX_MEMORIA_MB}",
+                  f"--disk-cache-size={8 * 1024 * 1024}"):
+            opts.add_argument(a)
+        opts.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    driver = webdriver.Chrome(options=opts)
+    if liviano:
+        patrones = [p for t in BROWSER_BLOQUEAR_TIPOS for p in _PATRONES_TIPO.get(t, [])]
+        patrones += [f"*{d}*" for d in BROWSER_BLOQUEAR_DOMINIOS]
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones})
+    return driver
+
+
+# Bytes transferidos de la página según Resource Timing. Ojo: recursos cross-origin sin
+# Timing-Allow-Origin reportan 0, así que es un piso (alcanza para comparar perfiles).
+_JS_BYTES = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const res = performance.getEntriesByType('resource');
+let bytes = nav.transferSize || 0;
+for (const r of res) bytes += r.transferSize || 0;
+return [bytes, res.length];
+"""
+
+
+class MedidorPaginas:
+    """Bytes transferidos y tiempo de carga por página (para medir el perfil liviano)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.paginas = []   # dicts {url, bytes, recursos, segundos}
+
+    def registrar(self, url, bytes_, recursos, segundos):
+        with self._lock:
+            self.paginas.append({"url": url, "bytes": bytes_, "recursos": recursos, "segundos": segundos})
+
+    def stats(self):
+        with self._lock:
+            n = len(self.paginas)
+            if not n: return {"paginas": 0}
+            total = sum(p["bytes"] for p in self.paginas)
+            return {"paginas": n, "mb_total": total / 1e6, "kb_por_pagina": total / n / 1e3,
+                    "recursos_por_pagina": sum(p["recursos"] for p in self.paginas) / n,
+                    "seg_por_pagina": sum(p["segundos"] for p in self.paginas) / n}
+
+    def resumen(self):
+        s = self.stats()
+        if not s["paginas"]: return "🌐 sin páginas cargadas en el navegador"
+        return (f"🌐 {s['paginas']} páginas | {s['mb_total']:.1f} MB "
+                f"({s['kb_por_pagina']:.0f} KB/pág, {s['recursos_por_pagina']:.0f} recursos/pág) | "
+                f"{s['seg_por_pagina']:.2f} s/pág")
+
+
+class PaginaBloqueada(Exception):
+    """La página devuelta es un captcha/bloqueo en lugar del contenido."""
+
 
-def _get_ids_de_pagina(driver, url):
+def _cargar(driver, url, selector, medidor=None):
+    """driver.get + espera a que exista el nodo que vamos a leer (o a que la página
+    termine de cargar sin él), en lugar de un sleep fijo."""
+    t0 = time.perf_counter()
     driver.get(url)
-    time.sleep(1.5)
-    soup = bs(driver.page_source, "html.parser")
-    holder = soup.find(id="ga-dimension-list")
-    if not holder: return []
-    return holder.get("data-ids-avisos-mostrados","").split(",")
-
-def _get_paginas(driver):
-    soup = bs(driver.page_source, "html.parser")
-    pag = soup.find("ul", class_="pagination pagination--links")
-    if not pag: return 1
-    lis = pag.find_all("li")
-    try: return int(lis[-2].text)
-    except: return 1
-
-def _scrape_ids_barrio(barrio):
-    driver = _init_driver()
-    ids = []
     try:
-        url1 = url_barrio(barrio)
-        driver.get(url1)
-        time.sleep(1.5)
-        total_pages = _get_paginas(driver)
-        for p in range(1, total_pages+1):
-            if len(ids) >= MAX_PROPS_POR_BARRIO: break
-            urlp = url1 if p==1 else f"{url1}-pagina-{p}"
-            ids += _get_ids_de_pagina(driver, urlp)
-    finally:
-        driver.quit()
-    # Limitar y limpiar
-    ids = [i for i in ids if i]
-    return ids[:MAX_PROPS_POR_BARRIO]
+        WebDriverWait(driver, ESPERA_MAX, poll_frequency=0.1).until(EC.any_of(
+            EC.presence_of_element_located(selector),
+            lambda d: d.execute_script("return document.readyState") == "complete",
+        ))
+    except TimeoutException:
+        pass
+    if medidor:
+        segundos = time.perf_counter() - t0
+        try: bytes_, recursos = driver.execute_script(_JS_BYTES)
+        except Exception: bytes_, recursos = 0, 0
+        medidor.registrar(url, bytes_, recursos, segundos)
+    html = driver.page_source
+    if es_captcha(html):
+        raise PaginaBloqueada(url)
+    return html
+
+
+class DriverPool:
+    """Pool fijo de drivers de Chrome reutilizables entre barrios y fichas.
+
+    Cada driver se recicla después de `max_paginas` páginas o si se cae,
+    y se limpian cookies/storage al devolverlo al pool.
+    """
+
+    def __init__(self, size=N_DRIVERS, max_paginas=DRIVER_MAX_PAGINAS, throttle=None):
+        self.size = size
+        self.max_paginas = max_paginas
+        # AIMD: cuántos de los `size` drivers se usan a la vez según la salud de las respuestas
+        self.throttle = throttle or AimdController(size, maximo=size)
+        self.medidor = MedidorPaginas()
+        self._libres = queue.Queue()
+        self._usos = {}
+        self._lock = threading.Lock()
+        self._cerrado = False
+        for _ in range(size):
+            self._libres.put(None)  # se crean a demanda (lazy)
+
+    def _nuevo(self):
+        d = _init_driver()
+        with self._lock:
+            self._usos[id(d)] = 0
+        return d
+
+    def _descartar(self, d):
+        with self._lock:
+            self._usos.pop(id(d), None)
+        try: d.quit()
+        except Exception: pass
+
+    def _limpiar(self, d):
+        d.delete_all_cookies()
+        d.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+
+    @contextmanager
+    def driver(self):
+        """Checkout de un driver: `with pool.driver() as d: ...`."""
+        with self.throttle.slot() as r:
+            d = self._libres.get()
+            try:
+                if d is None:
+                    d = self._nuevo()
+                yield d
+            except Exception as e:
+                if isinstance(e, PaginaBloqueada): r.estado = "saturado"
+                # Driver caído, bloqueado o en estado dudoso: se recicla
+                if d is not None:
+                    self._descartar(d)
+                d = None
+                raise
+            finally:
+                self._devolver(d)
+
+    def _devolver(self, d):
+        if d is not None:
+            with self._lock:
+                self._usos[id(d)] = self._usos.get(id(d), 0) + 1
+                agotado = self._usos[id(d)] >= self.max_paginas
+            if agotado or self._cerrado:
+                self._descartar(d)
+                d = None
+            else:
+                try:
+                    self._limpiar(d)
+                except Exception:
+                    self._descartar(d)
+                    d = None
+        self._libres.put(d)
+
+    def close(self):
+        self._cerrado = True
+        for _ in range(self.size):
+            d = self._libres.get()
+            if d is not None:
+                self._descartar(d)
 
-def _scrape_detalle(pid):
-    driver = _init_driver()
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pagina_selenium(barrio, pagina, pool, cache=None):
+    """Una página de listado: (ids, total_paginas si es la página 1).
+
+    ids=None si la página no tiene el listado (no cargó o cambió el HTML): en la
+    página 1 el scheduler marca el barrio como fallido en vez de darlo por vacío."""
+    url = url_pagina(barrio, pagina)
+    with pool.driver() as driver:
+        html = _cargar(driver, url, (By.ID, "ga-dimension-list"), pool.medidor)
+        final = driver.current_url
+    ids = parse_ids(html)
+    if ids is None: return None, None
+    if cache: cache.put(url, html, final, tipo="listado")
+    return ids, (parse_paginas(html) if pagina == 1 else None)
+
+def _scrape_detalle(pid, pool, cache=None):
     try:
-        # Tip: muchas fichas comparten la misma raíz /{filtros}--{id}
-        # Usamos una ruta neutra de deptos en CABA para abrir por id:
-        url = f"{BASE_ITEM_URL}/departamento-alquiler--{pid}"
-        driver.get(url)
-        time.sleep(1.2)
-        soup = bs(driver.page_source, "html.parser")
-        main = soup.find(class_="property-main")
-        if not main:
-            return None
-        feats = main.find(class_="property-main-features")
-        precio = main.find("p", class_="titlebar__price")
-        expensa = main.find("p", class_="titlebar__expenses")
-        barrio = main.find("h2", class_="titlebar__title")
-
-        data = {
-            "Link": driver.current_url,
-            "precio": precio.text if precio else None,
-            "expensas": expensa.text if expensa else None,
-            "Barrio": barrio.text if barrio else None,
-        }
-        if feats:
-            for e in feats.find_all(recursive=False):
-                titulo = e.get("title")
-                v = e.find("p", class_="strong")
-                if titulo and v: data[titulo] = v.text.strip()
-        return data
+        with pool.driver() as driver:
+            url = url_detalle(pid, BASE_ITEM_URL)
+            html = _cargar(driver, url, (By.CLASS_NAME, "property-main"), pool.medidor)
+            link = driver.current_url
     except Exception:
         return None
-    finally:
-        driver.quit()
-
-def run_scraper_caba():
-    # 1) IDs por barrio (paralelo)
-    ids_total = []
-    with ThreadPoolExecutor(max_workers=N_DRIVERS) as ex:
-        futures = {ex.submit(_scrape_ids_barrio, b): b for b in BARRIOS_CABA}
-        for f in as_completed(futures):
-            ids_total.extend(f.result() or [])
-            if len(ids_total) >= MAX_PROPS_TOTAL:
-                break
-    ids_total = list(dict.fromkeys(ids_total))[:MAX_PROPS_TOTAL]  # únicos y tope
-    print(f"🔎 IDs recolectados CABA: {len(ids_total)}")
-
-    # 2) Detalles por ID (paralelo)
-    rows = []
-    with ThreadPoolExecutor(max_workers=N_DRIVERS) as ex:
-        futures = {ex.submit(_scrape_detalle, pid): pid for pid in ids_total}
+    if cache: cache.put(url, html, link, tipo="detalle")
+    return parse_detalle(html, link)
+
+def _parse_objeto_cache(args):
+    link, path = args
+    try: return parse_detalle(read_objeto(path), link)
+    except (OSError, EOFError): return None  # objeto desalojado o truncado
+
+
+def _ids_selenium(barrios, pool, cache=None, tope=MAX_PROPS_TOTAL):
+    sched = CrawlScheduler(barrios, tope_total=tope)
+    ids = ejecutar_threads(sched, lambda b, p: _pagina_selenium(b, p, pool, cache), N_DRIVERS)
+    if sched.fallidos:
+        print(f"⚠️ {len(sched.fallidos)} barrios sin listado (no cargó la página 1): {', '.join(sched.fallidos)}")
+    return ids
+
+def _iter_detalles_selenium(ids, pool, cache=None):
+    """Genera (pid, row) a medida que termina cada ficha (row=None si falló)."""
+    ex = ThreadPoolExecutor(max_workers=N_DRIVERS)
+    try:
+        futures = {ex.submit(_scrape_detalle, pid, pool, cache): pid for pid in ids}
         for i, f in enumerate(as_completed(futures), 1):
-            r = f.result()
-            if r: rows.append(r)
-            if i % 50 == 0: print(f"Scrapeados {i}/{len(ids_total)} detalles...")
+            yield futures[f], f.result()
+            if i % 50 == 0: print(f"Scrapeados {i}/{len(ids)} detalles... {pool.throttle.resumen()}")
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+def _replay_iter(cache_dir):
+    """Filas sólo desde el caché de HTML, parseando en paralelo (todos los cores)."""
+    cache = HtmlCache(cache_dir)
+    paginas = cache.ultimas("detalle")
+    cache.close()
+    print(f"📼 Replay: re-parseando {len(paginas)} fichas cacheadas...")
+    with ProcessPoolExecutor() as ex:
+        for r in ex.map(_parse_objeto_cache, paginas, chunksize=64):
+            if r: yield r
+
+def iter_scraper_caba(engine=SCRAPER_ENGINE, base_url=BASE_URL, store_path=STORE_PATH, ttl_horas=STORE_TTL_HORAS,
+                      cache_dir=HTML_CACHE_DIR, stats=None, ttl_descubrimiento_horas=STORE_TTL_DESCUBRIMIENTO_HORAS):
+    """Genera las filas de detalle a medida que se completan (ver `run_scraper_caba`).
+
+    Si se pasa `stats` (dict), al terminar se completa con las métricas de throttling
+    y del navegador.
+    """
+    if engine not in ("selenium", "http", "replay"):
+        raise ValueError(f"engine desconocido: {engine!r}")
+    if engine == "replay":
+        if not cache_dir:
+            raise ValueError("engine='replay' necesita cache_dir")
+        yield from _replay_iter(cache_dir)
+        return
+
+    store = ListingStore(store_path) if store_path else None
+    cache = HtmlCache(cache_dir) if cache_dir else None
+    ctrl = None
+
+    try:
+        with DriverPool(N_DRIVERS) as pool:  # los drivers se crean recién cuando se usan
+            # 1) IDs por barrio (scheduler global a nivel página). Los listados se recorren en
+            # cada corrida (así aparecen los avisos nuevos); sólo se reutiliza un descubrimiento
+            # de hace menos de `ttl_descubrimiento_horas`, para retomar una corrida cortada
+            ids_total = store.ids_descubiertos(ttl_descubrimiento_horas) if store else None
+            if ids_total:
+                print(f"♻️ Reutilizando {len(ids_total)} IDs descubiertos en las últimas "
+                      f"{ttl_descubrimiento_horas}h")
+            elif engine == "http":
+                from http_engine import scrape_ids_http, nuevo_throttle
+                ctrl = nuevo_throttle()
+                ids_total, barrios_fallidos = scrape_ids_http(BARRIOS_CABA, base_url=base_url, ctrl=ctrl, cache=cache)
+                if barrios_fallidos:
+                    print(f"↩️ {len(barrios_fallidos)} barrios sin parsear por HTTP, reintentando con Selenium...")
+                    ids_total += _ids_selenium(barrios_fallidos, pool, cache, tope=MAX_PROPS_TOTAL - len(ids_total))
+            else:
+                ids_total = _ids_selenium(BARRIOS_CABA, pool, cache)
+            ids_total = list(dict.fromkeys(ids_total))[:MAX_PROPS_TOTAL]  # únicos y tope
+            print(f"🔎 IDs recolectados CABA: {len(ids_total)}")
+
+            ids_a_buscar = ids_total
+            if store:
+                store.agregar_ids(ids_total)
+                ids_a_buscar = store.pendientes(ids_total, ttl_horas)
+                print(f"🗃️ {len(ids_total) - len(ids_a_buscar)} avisos vigentes en el store, "
+                      f"{len(ids_a_buscar)} por buscar")
+                # Los vigentes ya están listos: salen primero
+                a_buscar = set(ids_a_buscar)
+                yield from store.filas([p for p in ids_total if p not in a_buscar])
+
+            # 2) Detalles por ID (paralelo), emitidos a medida que terminan
+            ids_fallidos = []
+            if engine == "http":
+                from http_engine import iter_detalles_http, nuevo_throttle, NO_EXISTE
+                ctrl = ctrl or nuevo_throttle()
+                resultados = iter_detalles_http(ids_a_buscar, base_url=base_url, ctrl=ctrl, cache=cache)
+            else:
+                resultados = _iter_detalles_selenium(ids_a_buscar, pool, cache)
+            for pid, r in resultados:
+                if engine == "http" and r is NO_EXISTE:
+                    if store: store.registrar(pid, None)  # dado de baja: sin fallback
+                    continue
+                if engine == "http" and not r:
+                    ids_fallidos.append(pid)  # se registra en el store tras el fallback
+                    continue
+                if store: store.registrar(pid, r)
+                if r: yield r
+            if ids_fallidos:
+                print(f"↩️ {len(ids_fallidos)} fichas sin parsear por HTTP, reintentando con Selenium...")
+                for pid, r in _iter_detalles_selenium(ids_fallidos, pool, cache):
+                    if store: store.registrar(pid, r)
+                    if r: yield r
+
+            if stats is not None:
+                stats["throttle"] = {"selenium": pool.throttle.stats()}
+                if ctrl: stats["throttle"]["http"] = ctrl.stats()
+                stats["browser"] = pool.medidor.stats()
+            if ctrl: print(f"http {ctrl.resumen()}")
+            print(f"selenium {pool.throttle.resumen()}")
+            if pool.medidor.stats()["paginas"]: print(pool.medidor.resumen())
+    finally:
+        if store: store.close()
+        if cache: cache.close()
+
+def run_scraper_caba(engine=SCRAPER_ENGINE, base_url=BASE_URL, store_path=STORE_PATH, ttl_horas=STORE_TTL_HORAS,
+                     cache_dir=HTML_CACHE_DIR, ttl_descubrimiento_horas=STORE_TTL_DESCUBRIMIENTO_HORAS):
+    """engine: "selenium" (Chrome), "http" (asyncio sin navegador, con fallback a Selenium)
+    o "replay" (sin red: re-parsea el HTML guardado en `cache_dir`).
 
-    df = pd.DataFrame(rows)
+    Con `store_path`, IDs y filas se persisten en SQLite a medida que llegan: un
+    reinicio retoma sólo los IDs pendientes y una corrida diaria recorre los listados
+    y re-busca sólo las fichas de avisos nuevos o con más de `ttl_horas`. Los IDs de
+    un listado se reutilizan sólo dentro de `ttl_descubrimiento_horas`.
+    """
+    stats = {}
+    df = pd.DataFrame(list(iter_scraper_caba(engine, base_url, store_path, ttl_horas, cache_dir, stats,
+                                             ttl_descubrimiento_horas)))
+    df.attrs.update(stats)  # throttle: tasa/latencia/límite por motor; browser: bytes y s por página
     print(f"🏁 Publicaciones con detalle: {len(df)}")
     return df
@@ -0,0 +1,373 @@
+# stages.py
+# El pipeline como grafo de etapas con caché por contenido:
+#   scrape → clean → features → dedup → outliers → {cubo → {plots, insights}, model}
+# La clave de cada etapa es el hash de (código de la etapa y de todos los módulos de src/
+# que alcanza por sus imports, valores de config.py que esos módulos leen, parámetros,
+# claves de sus entradas); si ya hay un artefacto con esa clave la etapa no se corre.
+# Las etapas listas que no dependen entre sí corren en paralelo en procesos separados.
+import os, ast, json, time, shutil, hashlib, inspect
+from functools import lru_cache
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from config import ETAPAS_CACHE_DIR, ETAPAS_CACHE_MAX, ETAPAS_WORKERS, MODELO_DIR
+
+_SRC = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---- Funciones de cada etapa (a nivel de módulo para poder mandarlas a otro proceso;
+# los imports pesados se hacen adentro, sólo en el proceso que corre la etapa)
+def _clean(raw, cotizacion_usd=1350):
+    from cleaning import clean_data
+    return clean_data(raw, cotizacion_usd=cotizacion_usd)
+
+def _features(df):
+    from features import add_features
+    return add_features(df)
+
+def _dedup(df):
+    from dedup import deduplicar
+    return deduplicar(df)
+
+def _outliers(df, refit_outliers=False):
+    # Una fila por grupo de duplicados, con `anomalia` y `es_outlier`; las etapas siguientes
+    # filtran con sin_outliers
+    from analysis_interactive import puntuar_outliers
+    from dedup import canonicas
+    return puntuar_outliers(canonicas(df), refit=refit_outliers)
+
+def _cubo(puntuado):
+    # Agregados del dataset limpio, compartidos por plots e insights (ver cubo.py); parte del
+    # cubo de la corrida anterior y suma sólo lo que cambió
+    from cubo import actualizar
+    from outliers import sin_outliers
+    return actualizar(sin_outliers(puntuado)).datos
+
+def _plots(base, puntuado, cubo, out_dir):
+    from analysis_interactive import plot_interactive
+    from outliers import sin_outliers
+    from cubo import Cubo
+    plot_interactive(base, out_dir=out_dir, clean=sin_outliers(puntuado), cubo=Cubo(cubo))
+
+def _model(puntuado, out_dir, motor=None):
+    from ml_model import train_model
+    from outliers import sin_outliers
+    train_model(sin_outliers(puntuado), out_dir=out_dir, **({"motor": motor} if motor else {}))
+
+def _insights(puntuado, cubo, out_dir):
+    from insights_advanced import run_advanced_insights
+    from outliers import sin_outliers
+    from cubo import Cubo
+    run_advanced_insights(sin_outliers(puntuado), out_dir=out_dir, cubo=Cubo(cubo))
+
+def _geojson():
+    # Polígonos de barrios que usa el gazetteer (Barrio_geo y mapas coropléticos)
+    from gazetteer import ruta_geojson
+    return ruta_geojson()
+
+def _version_guardada(archivo):
+    # "version" de un puntero de MODELO_DIR, sin importar sklearn ni joblib (None si no hay)
+    try:
+        with open(os.path.join(MODELO_DIR, archivo), encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except (OSError, ValueError):
+        return None
+
+def _version_modelo():
+    # Versión que lee cargar_modelo() (actual.json de ml_model.guardar_modelo)
+    return _version_guardada("actual.json")
+
+def _version_outliers():
+    # Detector que lee DetectorOutliers.cargar() (outliers_actual.json): tras un
+    # reentrenamiento (CLI, drift o --refit-outliers) los scores cacheados ya no sirven
+    return _version_guardada("outliers_actual.json")
+
+
+class Etapa:
+    def __init__(self, nombre, deps, fn, modulos, params=(), archivos=False, mensaje="", despues=(),
+                 externo=None, datos=()):
+        self.nombre = nombre
+        self.deps = deps
+        self.despues = list(despues)  # si están en la corrida, espera a que terminen (no las agrega)
+        self.externo = externo      # () -> estado fuera del caché que lee la etapa (entra en la clave)
+        self.datos = list(datos)    # archivos que no son código (ruta en src/ o () -> ruta) cuyo contenido entra
+        self.fn = fn
+        self.modulos = modulos      # archivos de src/ que usa (además de los que importa `fn`)
+        self.params = params        # parámetros del runner que entran en la clave
+        self.archivos = archivos    # True: produce archivos en out_dir (no un DataFrame)
+        self.mensaje = mensaje
+
+
+ETAPAS = {e.nombre: e for e in [
+    Etapa("scrape", [], None, [], mensaje="🕸️ Scrapeando CABA"),
+    Etapa("clean", ["scrape"], _clean, ["cleaning.py"], params=("cotizacion_usd",), mensaje="🧹 Limpiando datos"),
+    Etapa("features", ["clean"], _features, ["features.py", "gazetteer.py"], datos=[_geojson],
+          mensaje="🧪 Generando features"),
+    # El detector se guarda en MODELO_DIR y se reentrena sólo con refit_outliers o drift
+    Etapa("dedup", ["features"], _dedup, ["dedup.py"], mensaje="🧬 Buscando avisos duplicados"),
+    Etapa("outliers", ["dedup"], _outliers, ["analysis_interactive.py", "outliers.py", "dedup.py"],
+          params=("refit_outliers",), mensaje="🧽 Puntuando outliers", externo=_version_outliers),
+    Etapa("cubo", ["outliers"], _cubo, ["cubo.py", "outliers.py"], mensaje="🧊 Armando el cubo de agregados"),
+    Etapa("plots", ["features", "outliers", "cubo"], _plots,
+          ["analysis_interactive.py", "outliers.py", "render.py", "cubo.py", "gazetteer.py", "regresion.py"],
+          datos=[_geojson], archivos=True, mensaje="📊 Generando visualizaciones interactivas"),
+    Etapa("model", ["outliers"], _model, ["ml_model.py", "render.py"], params=("motor",), archivos=True,
+          mensaje="🤖 Entrenando modelo de predicción"),
+    # La sección SHAP explica el último modelo guardado: su versión entra en la clave y, si
+    # "model" también corre, se espera a que termine (pedir sólo insights no reentrena)
+    Etapa("insights", ["outliers", "cubo"], _insights,
+          ["insights_advanced.py", "explicaciones.py", "render.py", "cubo.py", "gazetteer.py", "regresion.py"],
+          datos=[_geojson], archivos=True, mensaje="🔍 Generando insights avanzados", despues=["model"],
+          externo=_version_modelo),
+]}
+FINALES = ["plots", "model", "insights"]
+
+
+def hash_df(df):
+    """Hash del contenido (columnas, tipos y valores; no el índice)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c) for c in df.columns], [str(t) for t in df.dtypes]]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _imports(modulo):
+    """(módulos de src/, nombres de config) que importa `modulo` en cualquier parte del
+    archivo, también dentro de funciones (los imports pesados son perezosos)."""
+    with open(os.path.join(_SRC, modulo), "rb") as f:
+        return _imports_de(f.read())
+
+
+def _imports_de(codigo):
+    mods, nombres = set(), set()
+    for nodo in ast.walk(ast.parse(codigo)):
+        if isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+            raiz = nodo.module.split(".")[0]
+            mods.add(raiz)
+            if raiz == "config":
+                nombres |= {a.name for a in nodo.names}
+        elif isinstance(nodo, ast.Import):
+            mods |= {a.name.split(".")[0] for a in nodo.names}
+        elif isinstance(nodo, ast.Attribute) and isinstance(nodo.value, ast.Name) and nodo.value.id == "config":
+            nombres.add(nodo.attr)  # import config; config.X
+    return {f"{m}.py" for m in mods if os.path.exists(os.path.join(_SRC, f"{m}.py"))}, nombres
+
+
+def dependencias(e):
+    """Módulos de src/ que alcanza la etapa `e` (cierre de imports desde `fn` y `modulos`)
+    y nombres de config.py que leen. Sobran algunos (imports de los CLI), nunca faltan."""
+    mods, nombres = _imports_de(inspect.getsource(e.fn)) if e.fn else (set(), set())
+    pila, vistos, nombres = list(mods | set(e.modulos)), set(), set(nombres)
+    while pila:
+        m = pila.pop()
+        if m in vistos:
+            continue
+        vistos.add(m)
+        hijos, leidos = _imports(m)
+        nombres |= leidos
+        pila.extend(hijos - vistos)
+    return sorted(vistos - {"config.py"}), sorted(nombres)
+
+
+def _valor_config(config, nombre):
+    v = getattr(config, nombre, None)
+    return inspect.getsource(v) if callable(v) else repr(v)  # funciones (url_*): su código
+
+
+def _hash_codigo(e):
+    import config
+    archivos, nombres = dependencias(e)
+    h = hashlib.sha256(inspect.getsource(e.fn).encode() if e.fn else b"")
+    for m in archivos:
+        h.update(m.encode())
+        with open(os.path.join(_SRC, m), "rb") as f:
+            h.update(f.read())
+    h.update(json.dumps({n: _valor_config(config, n) for n in nombres}, sort_keys=True).encode())
+    for d in e.datos:
+        ruta = d() if callable(d) else os.path.join(_SRC, d)
+        h.update(ruta.encode())
+        if os.path.exists(ruta):
+            with open(ruta, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _correr(nombre, entradas, destino, params):
+    """Corre una etapa en un proceso del pool: lee entradas del caché y publica `destino`."""
+    e = ETAPAS[nombre]
+    t0 = time.perf_counter()
+    dfs = [pd.read_pickle(p) for p in entradas]
+    kwargs = {k: params[k] for k in e.params if k in params}
+    if e.archivos:
+        import render
+        render.COPIAR_PLOTLYJS = False  # lo escribe _publicar una sola vez en out_dir
+        tmp = f"{destino}.parcial"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            e.fn(*dfs, out_dir=tmp, **kwargs)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(tmp, destino)
+    else:
+        e.fn(*dfs, **kwargs).to_pickle(f"{destino}.parcial")
+        os.replace(f"{destino}.parcial", destino)
+    return time.perf_counter() - t0
+
+
+class StageRunner:
+    """Ejecuta las etapas necesarias para `objetivos`, salteando las que ya están en caché.
+
+    Las entradas externas (filas scrapeadas o un dataset ya guardado) se registran con
+    `semilla(etapa, df)`: su clave es el hash del contenido, así que si no cambiaron
+    todo lo que depende de ellas sale del caché.
+    """
+
+    def __init__(self, out_dir="output/plots", cache_dir=ETAPAS_CACHE_DIR, workers=ETAPAS_WORKERS,
+                 forzar=(), params=None):
+        self.out_dir = out_dir
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.forzar = set(forzar)
+        self.params = dict(params or {})
+        self.claves = {}
+        self.corridas, self.salteadas = [], []
+        self.fallidas = {}
+
+    def _ruta(self, nombre, clave=None):
+        e = ETAPAS[nombre]
+        clave = clave or self.claves[nombre]
+        return os.path.join(self.cache_dir, nombre, clave if e.archivos else f"{clave}.pkl")
+
+    def _clave(self, e):
+        partes = [e.nombre, _hash_codigo(e), {k: self.params.get(k) for k in e.params},
+                  [self.claves[d] for d in e.deps], e.externo() if e.externo else None]
+        return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+    def semilla(self, nombre, df):
+        clave = hash_df(df)
+        ruta = self._ruta(nombre, clave)
+        if os.path.exists(ruta):
+            os.utime(ruta)
+        else:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            df.to_pickle(f"{ruta}.parcial")
+            os.replace(f"{ruta}.parcial", ruta)
+        self.claves[nombre] = clave
+        return clave
+
+    def cargar(self, nombre):
+        return pd.read_pickle(self._ruta(nombre))
+
+    def publicar_df(self, nombre, path, guardar):
+        """guardar(df, path) con el artefacto de `nombre`, salvo que `path` ya tenga esa versión."""
+        registro = os.path.join(self.cache_dir, "publicados.json")
+        try:
+            with open(registro, encoding="utf-8") as f:
+                publicados = json.load(f)
+        except (OSError, ValueError):
+            publicados = {}
+        clave = self.claves[nombre]
+        if publicados.get(os.path.abspath(path)) == clave and os.path.exists(path):
+            return False
+        guardar(self.cargar(nombre), path)
+        publicados[os.path.abspath(path)] = clave
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(registro, "w", encoding="utf-8") as f:
+            json.dump(publicados, f, indent=1)
+        return True
+
+    def _necesarias(self, objetivos):
+        # Clausura de dependencias, cortando en las etapas que ya tienen semilla
+        vistas, pila = set(), list(objetivos)
+        while pila:
+            n = pila.pop()
+            if n in vistas or n in self.claves:
+                continue
+            if n not in ETAPAS:
+                raise ValueError(f"Etapa desconocida: {n} (opciones: {', '.join(ETAPAS)})")
+            if ETAPAS[n].fn is None:
+                raise ValueError(f"La etapa '{n}' necesita una semilla (scrape o dataset guardado)")
+            vistas.add(n)
+            pila.extend(ETAPAS[n].deps)
+        return vistas
+
+    def _publicar(self, e):
+        # Los archivos de la etapa se copian a out_dir (también en cache hit)
+        if not e.archivos:
+            return
+        from render import PLOTLYJS, usa_plotlyjs, escribir_plotlyjs
+        origen = self._ruta(e.nombre)
+        os.makedirs(self.out_dir, exist_ok=True)
+        if usa_plotlyjs():
+            escribir_plotlyjs(self.out_dir)  # uno para todo el árbol, no uno por etapa
+        for f in os.listdir(origen):
+            if f == PLOTLYJS: continue  # artefactos cacheados antes de compartirlo
+            src, dst = os.path.join(origen, f), os.path.join(self.out_dir, f)
+            st = os.stat(src)
+            if os.path.exists(dst) and (os.path.getsize(dst), os.path.getmtime(dst)) == (st.st_size, st.st_mtime):
+                continue  # ya publicado (copy2 conserva el mtime)
+            shutil.copy2(src, dst)
+
+    def _podar(self, nombre):
+        # LRU por mtime: quedan los ETAPAS_CACHE_MAX artefactos más recientes
+        d = os.path.join(self.cache_dir, nombre)
+        if not os.path.isdir(d):
+            return
+        entradas = [os.path.join(d, f) for f in os.listdir(d) if not f.endswith(".parcial")]
+        for p in sorted(entradas, key=os.path.getmtime, reverse=True)[ETAPAS_CACHE_MAX:]:
+            shutil.rmtree(p) if os.path.isdir(p) else os.remove(p)
+
+    def ejecutar(self, objetivos=FINALES):
+        pendientes = self._necesarias(objetivos)
+        hechas = set(self.claves)
+        with ProcessPoolExecutor(max_workers=self.workers) as ex:
+            en_curso = {}
+            while pendientes or en_curso:
+                for n in sorted(pendientes):
+                    e = ETAPAS[n]
+                    caidas = [d for d in e.deps if d in self.fallidas]
+                    if caidas:
+                        pendientes.discard(n)
+                        self.fallidas[n] = f"depende de {', '.join(caidas)}"
+                        continue
+                    if not all(d in hechas for d in e.deps):
+                        continue
+                    if any(d in pendientes or d in en_curso.values() for d in e.despues):
+                        continue
+                    pendientes.discard(n)
+                    self.claves[n] = self._clave(e)
+                    ruta = self._ruta(n)
+                    if n not in self.forzar and os.path.exists(ruta):
+                        os.utime(ruta)
+                        print(f"⏭️  {n}: sin cambios, se usa el caché ({self.claves[n][:10]})")
+                        self.salteadas.append(n)
+                        self._publicar(e)
+                        hechas.add(n)
+                        continue
+                    print(f"{e.mensaje}...")
+                    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                    entradas = [self._ruta(d) for d in e.deps]
+                    en_curso[ex.submit(_correr, n, entradas, ruta, self.params)] = n
+                if not en_curso:
+                    continue
+                listas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for fut in listas:
+                    n = en_curso.pop(fut)
+                    try:
+                        segundos = fut.result()
+                    except Exception as err:
+                        # Las demás etapas siguen; sólo se saltean las que dependen de ésta
+                        print(f"❌ {n}: {type(err).__name__}: {err}")
+                        self.fallidas[n] = f"{type(err).__name__}: {err}"
+                        del self.claves[n]
+                        continue
+                    print(f"✅ {n} ({segundos:.1f}s)")
+                    self.corridas.append(n)
+                    self._publicar(ETAPAS[n])
+                    hechas.add(n)
+        for n in ETAPAS:
+            self._podar(n)
+        return {n: self._ruta(n) for n in self.claves}
@@ -0,0 +1,105 @@
+# store.py
+# Store embebido (SQLite) de IDs descubiertos, estado de fetch por ID y filas de detalle.
+# Permite retomar un scraping cortado y refrescar sólo avisos nuevos o vencidos (TTL).
+import os, json, time, sqlite3
+from config import STORE_BATCH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ids (
+    pid TEXT PRIMARY KEY,
+    descubierto REAL NOT NULL,
+    visto REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',   -- pendiente | ok | fallido
+    actualizado REAL,
+    intentos INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS filas (
+    pid TEXT PRIMARY KEY,
+    datos TEXT NOT NULL,
+    actualizado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_ids_estado ON ids(estado, actualizado);
+"""
+
+
+class ListingStore:
+    def __init__(self, path, batch=STORE_BATCH):
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.batch = batch
+        self._buffer = []
+        self.con = sqlite3.connect(path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(_SCHEMA)
+
+    # --- IDs ---------------------------------------------------------------
+    def agregar_ids(self, ids):
+        ahora = time.time()
+        with self.con:
+            self.con.executemany(
+                "INSERT INTO ids(pid, descubierto, visto) VALUES (?, ?, ?) "
+                "ON CONFLICT(pid) DO UPDATE SET visto = excluded.visto",
+                [(str(p), ahora, ahora) for p in ids])
+            self.con.execute("INSERT OR REPLACE INTO meta VALUES ('ultimo_descubrimiento', ?)", (str(ahora),))
+
+    def ids_descubiertos(self, ttl_horas):
+        """IDs del último descubrimiento si tiene menos de `ttl_horas`, si no None.
+
+        Es un TTL propio, más corto que el de las fichas: sirve para retomar una corrida
+        cortada sin volver a recorrer los listados, no para saltear el descubrimiento."""
+        r = self.con.execute("SELECT valor FROM meta WHERE clave = 'ultimo_descubrimiento'").fetchone()
+        if not ttl_horas or not r or time.time() - float(r[0]) > ttl_horas * 3600:
+            return None
+        desde = float(r[0])
+        return [p for (p,) in self.con.execute(
+            "SELECT pid FROM ids WHERE visto >= ? ORDER BY descubierto, pid", (desde,))]
+
+    def pendientes(self, ids, ttl_horas):
+        """De `ids`, los que hay que (re)buscar: nuevos, pendientes, fallidos o más viejos que el TTL."""
+        limite = time.time() - ttl_horas * 3600
+        frescos = {p for (p,) in self.con.execute(
+            "SELECT pid FROM ids WHERE estado = 'ok' AND actualizado >= ?", (limite,))}
+        return [p for p in ids if str(p) not in frescos]
+
+    # --- Filas -------------------------------------------------------------
+    def registrar(self, pid, row):
+        """Encola el resultado de un ID (row=None → fallido); commitea cada `batch`."""
+        self._buffer.append((str(pid), row, time.time()))
+        if len(self._buffer) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer: return
+        ok = [(p, json.dumps(r, ensure_ascii=False), t) for p, r, t in self._buffer if r]
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO filas VALUES (?, ?, ?)", ok)
+            self.con.executemany(
+                "UPDATE ids SET estado = ?, actualizado = ?, intentos = intentos + 1 WHERE pid = ?",
+                [("ok" if r else "fallido", t, p) for p, r, t in self._buffer])
+        self._buffer = []
+
+    def filas(self, ids):
+        """Filas de detalle guardadas para `ids`, en el mismo orden."""
+        ids = [str(p) for p in ids]
+        out = {}
+        for i in range(0, len(ids), 900):  # límite de parámetros de SQLite
+            chunk = ids[i:i+900]
+            q = f"SELECT pid, datos FROM filas WHERE pid IN ({','.join('?' * len(chunk))})"
+            out.update((p, json.loads(d)) for p, d in self.con.execute(q, chunk))
+        return [out[p] for p in ids if p in out]
+
+    def close(self):
+        self.flush()
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,140 @@
+# throttle.py
+# Control adaptativo de concurrencia AIMD (como TCP): sube el límite de requests
+# simultáneos de a poco mientras las respuestas vienen sanas y lo recorta a la
+# mitad ante errores, 429 o páginas de captcha. Sirve para threads y para asyncio.
+import time, asyncio, threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+_MARCAS_CAPTCHA = ("captcha", "cf-challenge", "challenge-form", "access denied", "are you a robot")
+
+
+def es_captcha(html):
+    """Heurística barata: páginas de desafío/bloqueo en lugar del contenido."""
+    if not html: return False
+    cabeza = html[:20000].lower()
+    return any(m in cabeza for m in _MARCAS_CAPTCHA)
+
+
+class Resultado:
+    """Lo que el llamador reporta al liberar un slot: "ok", "error" o "saturado" (429/captcha)."""
+    __slots__ = ("estado",)
+
+    def __init__(self):
+        self.estado = "ok"
+
+
+class AimdController:
+    def __init__(self, inicial, minimo=1, maximo=None, aumento=1.0, factor=0.5, ventana=200):
+        self.minimo = minimo
+        self.maximo = maximo or inicial
+        self.limite = float(min(max(inicial, minimo), self.maximo))
+        self.aumento = aumento
+        self.factor = factor
+        self._en_vuelo = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._esperas = deque()                 # futures de corutinas esperando slot
+        self._muestras = deque(maxlen=ventana)  # (t_fin, latencia)
+        self._ultimo_recorte = 0.0
+        self.ok = self.errores = self.saturados = self.recortes = 0
+
+    # --- Slots -------------------------------------------------------------
+    def acquire(self):
+        with self._cond:
+            while self._en_vuelo >= int(self.limite):
+                self._cond.wait()
+            self._en_vuelo += 1
+
+    async def acquire_async(self):
+        while True:
+            with self._lock:
+                if self._en_vuelo < int(self.limite):
+                    self._en_vuelo += 1
+                    return
+                fut = asyncio.get_running_loop().create_future()
+                self._esperas.append(fut)
+            await fut  # se despierta en un release; vuelve a chequear
+
+    def release(self, latencia, estado="ok"):
+        with self._cond:
+            self._en_vuelo -= 1
+            ahora = time.monotonic()
+            self._muestras.append((ahora, latencia))
+            if estado == "ok":
+                self.ok += 1
+                # +aumento por "ronda" completa de `limite` respuestas sanas
+                self.limite = min(self.maximo, self.limite + self.aumento / self.limite)
+            else:
+                if estado == "saturado": self.saturados += 1
+                else: self.errores += 1
+                # Un solo recorte por latencia típica: una ráfaga de errores cuenta como uno
+                if ahora - self._ultimo_recorte > max(self._latencia_media(), 0.5):
+                    self.limite = max(self.minimo, self.limite * self.factor)
+                    self._ultimo_recorte = ahora
+                    self.recortes += 1
+            self._cond.notify_all()
+            libres = int(self.limite) - self._en_vuelo
+            despertar = []
+            while self._esperas and libres > 0:
+                fut = self._esperas.popleft()
+                if not fut.done():
+                    despertar.append(fut)
+                    libres -= 1
+        for fut in despertar:
+            fut.get_loop().call_soon_threadsafe(_resolver, fut)
+
+    @contextmanager
+    def slot(self):
+        """`with ctrl.slot() as r: ...; r.estado = "saturado"`; excepciones cuentan como error."""
+        self.acquire()
+        r, t0 = Resultado(), time.perf_counter()
+        try:
+            yield r
+        except BaseException:
+            r.estado = "error" if r.estado == "ok" else r.estado
+            raise
+        finally:
+            self.release(time.perf_counter() - t0, r.estado)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        await self.acquire_async()
+        r, t0 = Resultado(), time.perf_counter()
+        try:
+            yield r
+        except BaseException:
+            r.estado = "error" if r.estado == "ok" else r.estado
+            raise
+        finally:
+            self.release(time.perf_counter() - t0, r.estado)
+
+    # --- Métricas ----------------------------------------------------------
+    def _latencia_media(self):
+        if not self._muestras: return 0.0
+        return sum(l for _, l in self._muestras) / len(self._muestras)
+
+    def stats(self):
+        with self._lock:
+            lat = sorted(l for _, l in self._muestras)
+            if len(self._muestras) > 1:
+                dt = self._muestras[-1][0] - self._muestras[0][0]
+                rate = (len(self._muestras) - 1) / dt if dt > 0 else 0.0
+            else:
+                rate = 0.0
+            return {
+                "limite": int(self.limite), "en_vuelo": self._en_vuelo, "req_s": rate,
+                "latencia_media": sum(lat) / len(lat) if lat else 0.0,
+                "latencia_p95": lat[int(0.95 * (len(lat) - 1))] if lat else 0.0,
+                "ok": self.ok, "errores": self.errores, "saturados": self.saturados, "recortes": self.recortes,
+            }
+
+    def resumen(self):
+        s = self.stats()
+        return (f"⚙️ concurrencia {s['limite']} | {s['req_s']:.1f} req/s | "
+                f"latencia media {s['latencia_media']:.2f}s p95 {s['latencia_p95']:.2f}s | "
+                f"errores {s['errores']} | 429/captcha {s['saturados']}")
+
+
+def _resolver(fut):
+    if not fut.done(): fut.set_result(None)
@@ -0,0 +1,4 @@
+# Los módulos del proyecto viven planos en src/ (como cuando se corre python src/main.py)
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
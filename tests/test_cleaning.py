@@ -0,0 +1,90 @@
+# Paridad de la limpieza: clean_data (pandas), clean_data_polars y la versión original
+# (referencia_cleaning.py) sobre filas crudas como las que devuelven los parsers.
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleaning import clean_data, COORD_COLS
+import referencia_cleaning
+
+CRUDO = [
+    # USD con expensas, subzona + "Capital Federal", coordenadas
+    {"Link": "https://x/--1", "precio": "USD 650", "expensas": "+ $ 85.000 expensas",
+     "Barrio": "Departamento en Palermo Soho, Capital Federal", "Sup. cubierta": "45 m²",
+     "Cant. Ambientes": "2 ambientes", "Ambientes": "2 ambientes", "Dormitorios": "1 dormitorio",
+     "Baños": "1 baño", "Antiguedad": "15 años", "lat": "-34.5889", "lon": "-58.4301"},
+    # ARS sin expensas, "Subzona, Barrio", antigüedad 2025 (a estrenar)
+    {"Link": "https://x/--2", "precio": "$ 1.200.000", "expensas": None, "Barrio": "Belgrano R, Belgrano",
+     "Sup. cubierta": "78 m²", "Ambientes": "3 ambientes", "Antiguedad": "2025", "lat": None, "lon": None},
+    # "Consultar" con expensas: queda sólo con expensas
+    {"Link": "https://x/--3", "precio": "Consultar precio", "expensas": "$ 50.000",
+     "Barrio": "Las Cañitas, Capital Federal", "Ambientes": "1 ambiente", "Antiguedad": "A estrenar",
+     "lat": "-34.5702", "lon": "-58.4349"},
+    # "Consultar" sin expensas ni barrio: Total 0, se descarta
+    {"Link": "https://x/--4", "precio": "Consultar precio", "expensas": None, "Barrio": None,
+     "Ambientes": None, "Antiguedad": None, "lat": None, "lon": None},
+    # Barrio None
+    {"Link": "https://x/--5", "precio": "$ 950.000", "expensas": "$ 120.000", "Barrio": None,
+     "Sup. cubierta": "60 m²", "Ambientes": "2", "Cocheras": "1 cochera", "Antiguedad": "40 años",
+     "lat": "sin mapa", "lon": None},
+    # Otra grafía de dólares y barrio con acento
+    {"Link": "https://x/--6", "precio": "u$s 900", "expensas": "$ 95.000", "Barrio": "Departamento en Núñez",
+     "Sup. cubierta": "52 m²", "Ambientes": "2 ambientes", "Toilettes": "1 toilette", "Antiguedad": "8 años",
+     "lat": "-34.5440", "lon": "-58.4630"},
+    {"Link": "https://x/--7", "precio": "$ 780.000", "expensas": "Sin expensas",
+     "Barrio": "Villa Crespo, Capital Federal", "Sup. cubierta": "40 m²", "Ambientes": "2 ambientes",
+     "Antiguedad": "2025.0", "lat": None, "lon": None},
+    # Subzona sin coma
+    {"Link": "https://x/--8", "precio": "USD 1.100", "expensas": "$ 200.000", "Barrio": "Caballito Norte",
+     "Sup. cubierta": "90 m²", "Ambientes": "4 ambientes", "Antiguedad": "30 años", "lat": None, "lon": None},
+    # Zona que no es barrio ni subzona conocida
+    {"Link": "https://x/--9", "precio": "$ 650.000", "expensas": "$ 70.000",
+     "Barrio": "Barrio Norte, Capital Federal", "Sup. cubierta": "38 m²", "Ambientes": "1 ambiente",
+     "lat": None, "lon": None},
+]
+
+
+@pytest.fixture
+def crudo():
+    return pd.DataFrame(CRUDO)
+
+
+def test_pandas_igual_que_la_version_original(crudo):
+    # Las coordenadas se agregaron después: la versión original no las convierte
+    esperado = referencia_cleaning.clean_data(crudo.drop(columns=COORD_COLS))
+    obtenido = clean_data(crudo, engine="pandas").drop(columns=COORD_COLS)
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_polars_igual_que_pandas(crudo):
+    pytest.importorskip("polars")
+    from cleaning_polars import clean_data_polars, verificar_paridad
+    pd.testing.assert_frame_equal(clean_data_polars(crudo), clean_data(crudo, engine="pandas"))
+    assert verificar_paridad(crudo) == []
+
+
+def test_casos_puntuales(crudo):
+    df = clean_data(crudo, engine="pandas").set_index("Link")
+    assert "https://x/--4" not in df.index                       # sin precio ni expensas
+    assert df.loc["https://x/--1", "precio"] == 650 * 1350        # USD al tipo de cambio
+    assert df.loc["https://x/--1", "Barrio_simplificado"] == "Palermo"
+    assert df.loc["https://x/--2", "Antiguedad"] == 1.0           # "2025" → a estrenar
+    assert df.loc["https://x/--2", "expensas"] == 0.0
+    assert df.loc["https://x/--3", "Total"] == 50_000             # "Consultar": sólo expensas
+    assert np.isnan(df.loc["https://x/--3", "precio"])
+    assert pd.isna(df.loc["https://x/--5", "Barrio_simplificado"])
+    assert np.isnan(df.loc["https://x/--5", "lat"])               # coordenada ilegible
+    assert df.loc["https://x/--8", "Barrio_simplificado"] == "Caballito"
+
+
+def test_engine_polars_desde_clean_data(crudo):
+    pytest.importorskip("polars")
+    pd.testing.assert_frame_equal(clean_data(crudo, engine="polars"), clean_data(crudo, engine="pandas"))
+
+
+@pytest.mark.parametrize("engine", ["pandas", "polars"])
+def test_conservar_filas_sin_total(crudo, engine):
+    if engine == "polars": pytest.importorskip("polars")
+    df = clean_data(crudo, engine=engine, descartar_sin_total=False)
+    assert list(df["Link"]) == list(crudo["Link"])
+    assert df.set_index("Link").loc["https://x/--4", "Total"] == 0
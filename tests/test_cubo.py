@@ -0,0 +1,75 @@
+# Cubo de agregados: sumar por partes da lo mismo que armarlo de una, y actualizar() (la
+# etapa "cubo") reproduce Cubo.desde_filas tras altas, bajas, cambios y filas repetidas.
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+from cubo import Cubo, DIMENSIONES, actualizar
+
+BARRIOS = ["Palermo", "Caballito", "Belgrano", None]
+ANTIG = ["0-5", "5-20", "20+", None]
+
+
+def _filas(n, semilla, desde=0):
+    rng = np.random.default_rng(semilla)
+    m2 = rng.uniform(25, 120, n)
+    total = rng.lognormal(13.3, 0.4, n)
+    return pd.DataFrame({
+        "Link": [f"https://x/departamento-alquiler--{i}" for i in range(desde, desde + n)],
+        "Barrio_simplificado": rng.choice(BARRIOS, n),
+        "Ambientes": rng.choice([1.0, 2.0, 3.0, np.nan], n),
+        "Antig_binned": rng.choice(ANTIG, n),
+        "Total": total, "m2": m2, "precio_m2": total / m2,
+        "expensas_ratio": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 0.4, n)),
+    })
+
+
+def _igual(a, b):
+    # Mismas celdas y baldes con los mismos estadísticos (las sumas, a menos del redondeo)
+    claves = DIMENSIONES + ["metrica", "balde"]
+    x, y = (c.datos.drop(columns="ejemplo").astype({"barrio": str, "Antig_binned": str, "fecha": str})
+            .sort_values(claves).reset_index(drop=True) for c in (a, b))
+    pd.testing.assert_frame_equal(x, y, check_dtype=False, rtol=1e-9)
+
+
+def test_partes_unidas_igual_al_total():
+    df = _filas(600, 1)
+    partes = [df.iloc[:250], df.iloc[250:400], df.iloc[400:]]
+    cubo = Cubo.desde_filas(partes[0])
+    for p in partes[1:]:
+        cubo = cubo.agregar(p)
+    _igual(cubo, Cubo.desde_filas(df))
+    _igual(Cubo.desde_filas(partes[0]).unir(*[Cubo.desde_filas(p) for p in partes[1:]]), Cubo.desde_filas(df))
+    pd.testing.assert_frame_equal(cubo.resumen(["barrio"]).drop(columns="ejemplo"),
+                                  Cubo.desde_filas(df).resumen(["barrio"]).drop(columns="ejemplo"))
+
+
+def test_actualizar_igual_a_armarlo_de_cero(tmp_path):
+    d = str(tmp_path / "cubo")
+    ayer = _filas(500, 2)
+    _igual(actualizar(ayer, directorio=d), Cubo.desde_filas(ayer))
+    # Bajas, un cambio de precio, altas y una fila repetida
+    hoy = ayer.drop(index=range(0, 40)).copy()
+    hoy.loc[100, "Total"] *= 1.1
+    hoy = pd.concat([hoy, _filas(80, 3, desde=500), hoy.loc[[200]]], ignore_index=True)
+    _igual(actualizar(hoy, directorio=d), Cubo.desde_filas(hoy))
+    # Sin cambios: sale del estado guardado
+    _igual(actualizar(hoy, directorio=d), Cubo.desde_filas(hoy))
+
+
+def test_actualizar_sin_bajas_solo_suma_las_nuevas(tmp_path, capsys):
+    d = str(tmp_path / "cubo")
+    ayer = _filas(300, 4)
+    actualizar(ayer, directorio=d)
+    hoy = pd.concat([ayer, _filas(20, 5, desde=300)], ignore_index=True)
+    _igual(actualizar(hoy, directorio=d), Cubo.desde_filas(hoy))
+    assert "+20 filas nuevas, 0 celdas recalculadas" in capsys.readouterr().out
+
+
+def test_estado_de_otra_fecha_no_se_usa(tmp_path, capsys):
+    d = str(tmp_path / "cubo")
+    df = _filas(100, 6)
+    actualizar(df, fecha="2025-01-30", directorio=d)
+    _igual(actualizar(df, fecha="2025-01-31", directorio=d), Cubo.desde_filas(df, "2025-01-31"))
+    assert capsys.readouterr().out.count("armado entero") == 2
@@ -0,0 +1,63 @@
+# Duplicados sobre un conjunto armado a mano con los grupos conocidos.
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+from dedup import deduplicar, canonicas
+
+
+def _aviso(link, barrio="Palermo", m2=50.0, precio=500_000.0, expensas=80_000.0, amb=2, dorm=1, banos=1,
+           cocheras=np.nan, antig=10.0):
+    return {"Link": f"https://x/--{link}", "Barrio_simplificado": barrio, "m2": m2, "precio": precio,
+            "expensas": expensas, "Ambientes": amb, "Dormitorios": dorm, "Baños": banos,
+            "Cocheras": cocheras, "Antiguedad": antig}
+
+
+AVISOS = pd.DataFrame([
+    # Re-publicación exacta
+    _aviso("a1", barrio="Caballito", m2=70, precio=700_000),
+    _aviso("a2", barrio="Caballito", m2=70, precio=700_000),
+    # Mismo depto en otra inmobiliaria: m² y precio redondeados distinto, una sin cocheras
+    _aviso("b1", cocheras=1),
+    _aviso("b2", m2=51, precio=505_000),
+    _aviso("b3", m2=50.5, precio=498_000, cocheras=1),
+    # Igual que b1 pero en otro barrio
+    _aviso("c1", barrio="Belgrano", cocheras=1),
+    # Mismo barrio y m², 20% más caro
+    _aviso("d1", precio=600_000, cocheras=1),
+    # Otro tipo de depto (ambientes distintos)
+    _aviso("e1", amb=3, dorm=2, cocheras=1),
+    # Sin m²: no se puede confirmar como duplicado
+    _aviso("f1", m2=np.nan, cocheras=1),
+    _aviso("f2", m2=np.nan, precio=501_000, cocheras=1),
+])
+GRUPOS = [{"a1", "a2"}, {"b1", "b2", "b3"}, {"c1"}, {"d1"}, {"e1"}, {"f1"}, {"f2"}]
+
+
+def _grupos(out):
+    ids = out["Link"].str.rsplit("--", n=1).str[1]
+    return sorted((set(g) for g in ids.groupby(out["cluster_dup"]).agg(list)), key=sorted)
+
+
+def test_grupos_conocidos():
+    out = deduplicar(AVISOS)
+    assert _grupos(out) == sorted(GRUPOS, key=sorted)
+    assert out.set_index("Link")["publicaciones"].to_dict()["https://x/--b2"] == 3
+    # Canónica: la más completa y, a igualdad, el Link menor
+    canon = set(canonicas(out)["Link"].str.rsplit("--", n=1).str[1])
+    assert canon == {"a1", "b1", "c1", "d1", "e1", "f1", "f2"}
+
+
+def test_no_depende_del_orden():
+    out = deduplicar(AVISOS).set_index("Link")
+    mezclado = deduplicar(AVISOS.sample(frac=1, random_state=3)).set_index("Link").loc[out.index]
+    pd.testing.assert_series_equal(out["cluster_dup"], mezclado["cluster_dup"])
+    pd.testing.assert_series_equal(out["es_canonica"], mezclado["es_canonica"])
+
+
+def test_vacio_y_sin_duplicados():
+    assert list(deduplicar(AVISOS.iloc[:0]).columns[-3:]) == ["cluster_dup", "publicaciones", "es_canonica"]
+    unicos = AVISOS[AVISOS["Link"].str.endswith(("c1", "d1", "e1"))]
+    out = deduplicar(unicos)
+    assert out["es_canonica"].all() and (out["publicaciones"] == 1).all()
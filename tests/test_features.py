@@ -0,0 +1,50 @@
+# Barrio por coordenadas: con los polígonos aproximados incluidos queda sólo en
+# Barrio_geo; con límites oficiales completa Barrio_simplificado.
+import json
+import pandas as pd
+import pytest
+
+import gazetteer
+from cleaning import clean_data
+from features import add_features
+from test_cleaning import CRUDO
+
+
+@pytest.fixture
+def limpio():
+    df = clean_data(pd.DataFrame(CRUDO), engine="pandas")
+    # --5 no trae barrio en el texto: le damos coordenadas en Caballito
+    df.loc[df["Link"] == "https://x/--5", ["lat", "lon"]] = [-34.6160, -58.4400]
+    return df
+
+
+def _geo(monkeypatch, path):
+    monkeypatch.setattr(gazetteer, "BARRIOS_GEOJSON", path)
+    gazetteer.gazetteer.cache_clear()
+
+
+def test_poligonos_aproximados_no_completan_el_barrio(limpio, monkeypatch):
+    _geo(monkeypatch, None)
+    assert gazetteer.gazetteer().aproximado
+    df = add_features(limpio).set_index("Link")
+    assert df.loc["https://x/--5", "Barrio_geo"] == "Caballito"
+    assert pd.isna(df.loc["https://x/--5", "Barrio_simplificado"])
+    assert df["Barrio_simplificado"].isna().sum() == limpio["Barrio_simplificado"].isna().sum()
+
+
+def test_poligonos_oficiales_completan_el_barrio(limpio, monkeypatch, tmp_path):
+    geo = json.load(open(gazetteer.GEOJSON_INCLUIDO, encoding="utf-8"))
+    for f in geo["features"]:
+        f["properties"] = {"BARRIO": f["properties"]["nombre"].upper()}  # como el de la Ciudad
+    path = tmp_path / "barrios.geojson"
+    path.write_text(json.dumps(geo))
+    _geo(monkeypatch, str(path))
+    assert not gazetteer.gazetteer().aproximado
+
+    df = add_features(limpio).set_index("Link")
+    assert df.loc["https://x/--5", "Barrio_simplificado"] == "Caballito"
+    assert df.loc["https://x/--1", "Barrio_simplificado"] == "Palermo"  # el texto manda
+
+
+def teardown_module():
+    gazetteer.gazetteer.cache_clear()
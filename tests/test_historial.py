@@ -0,0 +1,86 @@
+# Historial: snapshots diarios → job incremental (estado, eventos, agregados, cubo) →
+# compactación del mes cerrado → series y consultas, sobre un directorio temporal.
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+import historial
+
+
+def _aviso(pid, total, barrio="Palermo", m2=50.0):
+    return {"Link": f"https://x/departamento-alquiler--{pid}", "Barrio_simplificado": barrio, "Moneda": "$",
+            "precio": total - 50_000.0, "expensas": 50_000.0, "Total": float(total), "m2": m2,
+            "precio_m2": total / m2, "Ambientes": 2.0, "Dormitorios": 1.0}
+
+
+DIAS = {
+    "2025-01-30": [_aviso(1, 500_000), _aviso(2, 600_000), _aviso(3, 700_000, "Caballito")],
+    # 1 sube 10%, 3 se da de baja, 4 es nuevo
+    "2025-01-31": [_aviso(1, 550_000), _aviso(2, 600_000), _aviso(4, 800_000)],
+    # Mes siguiente: 3 reaparece, 2 se da de baja
+    "2025-02-01": [_aviso(1, 550_000), _aviso(3, 700_000, "Caballito"), _aviso(4, 800_000)],
+}
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    d = str(tmp_path / "historial")
+    for fecha, filas in DIAS.items():
+        historial.agregar_snapshot(pd.DataFrame(filas), fecha, directorio=d)
+    assert historial.actualizar(d) == list(DIAS)
+    return d
+
+
+def _archivos(d, sub, mes):
+    return sorted(os.listdir(os.path.join(d, sub, f"mes={mes}")))
+
+
+def test_snapshot_no_se_reescribe(directorio):
+    assert historial.agregar_snapshot(pd.DataFrame(DIAS["2025-01-30"][:1]), "2025-01-30", directorio=directorio) is None
+    assert historial.actualizar(directorio) == []
+
+
+def test_compacta_el_mes_cerrado(directorio):
+    assert _archivos(directorio, "agregados", "2025-01") == ["agregado.parquet"]
+    assert _archivos(directorio, "agregados", "2025-02") == ["fecha=2025-02-01.parquet"]
+    assert _archivos(directorio, "cubo", "2025-01") == ["cubo.parquet"]
+    assert historial.fechas(directorio, "estado") == ["2025-02-01"]
+
+
+def test_serie_ida_y_vuelta(directorio):
+    s = historial.serie("Palermo", directorio=directorio).set_index("fecha")
+    assert list(s.index.strftime("%Y-%m-%d")) == list(DIAS)
+    assert list(s["avisos"]) == [2, 3, 2]
+    assert list(s["altas"]) == [2, 1, 0]
+    assert list(s["cambios"]) == [0, 1, 0]
+    assert list(s["bajas"]) == [0, 0, 1]
+    assert list(s["total_mediana"]) == [550_000, 600_000, 675_000]
+
+    ciudad = historial.serie("CABA", desde="2025-01-31", directorio=directorio)
+    assert list(ciudad["avisos"]) == [3, 3]
+    assert list(ciudad["reapariciones"]) == [0, 1]
+
+
+def test_eventos_y_estado(directorio):
+    ev = historial.historia_aviso("https://x/departamento-alquiler--1", directorio=directorio)
+    assert list(ev["tipo"]) == ["alta", "cambio"]
+    assert ev["delta_pct"].iloc[1] == pytest.approx(100 * 50_000 / 450_000)
+    assert list(historial.historia_aviso(3, directorio=directorio)["tipo"]) == ["alta", "baja", "reaparicion"]
+    estado = historial.estado_actual(directorio).set_index("id")
+    assert not estado.loc[2, "activo"] and estado.loc[3, "reapariciones"] == 1
+    assert estado.loc[1, "precio_inicial"] == 450_000 and estado.loc[1, "precio"] == 500_000
+
+
+def test_cubo_por_fecha(directorio):
+    c = historial.cubo(directorio=directorio)
+    por_fecha = c.resumen(["fecha"]).set_index("fecha")["filas"]
+    assert list(por_fecha) == [len(f) for f in DIAS.values()]
+    enero = historial.cubo(hasta="2025-01-31", barrios=["Palermo"], directorio=directorio)
+    assert enero.resumen(None)["filas"].iloc[0] == 2 + 3
+
+
+def test_reconstruir_da_lo_mismo(directorio):
+    antes = historial.serie(directorio=directorio)
+    assert historial.reconstruir(directorio) == list(DIAS)
+    pd.testing.assert_frame_equal(historial.serie(directorio=directorio), antes)
@@ -0,0 +1,87 @@
+# Caché de HTML crudo: dedup por contenido, última versión por URL, desalojo y replay
+# offline sobre las páginas de fixtures/html.
+import os, gzip
+
+import html_cache as html_cache_mod
+from html_cache import HtmlCache
+from parsers import parse_detalle
+from scraper import iter_scraper_caba
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+IDS = ["17001001", "17001002", "17001003"]
+
+
+def _leer(nombre):
+    with open(os.path.join(FIXTURES, nombre), encoding="utf-8") as f:
+        return f.read()
+
+
+def _objetos(root):
+    return sorted(f for _, _, fs in os.walk(os.path.join(root, "objetos")) for f in fs)
+
+
+def test_dedup_por_contenido(tmp_path):
+    root = str(tmp_path / "html")
+    html = _leer("detalle_17001001.html")
+    cache = HtmlCache(root)
+    h1 = cache.put("https://x/a", html)
+    h2 = cache.put("https://x/b", html, tipo="detalle")
+    assert h1 == h2
+    assert len(_objetos(root)) == 1
+    assert cache.get(h1) == html
+    assert sorted(u for u, _ in cache.ultimas("detalle")) == ["https://x/a", "https://x/b"]
+    cache.close()
+
+
+def test_ultima_version_por_url(tmp_path, monkeypatch):
+    t = [1000.0]
+    monkeypatch.setattr(html_cache_mod.time, "time", lambda: t[0])
+    cache = HtmlCache(str(tmp_path / "html"))
+    cache.put("https://x/a", "<html>v1</html>", "https://x/a-final")
+    t[0] += 1
+    cache.put("https://x/a", "<html>v2</html>", "https://x/a-final")
+    cache.put("https://x/lista", "<html>listado</html>", tipo="listado")
+    (url, path), = cache.ultimas("detalle")
+    assert url == "https://x/a-final"
+    assert html_cache_mod.read_objeto(path) == "<html>v2</html>"
+    assert [u for u, _ in cache.ultimas("listado")] == ["https://x/lista"]
+    cache.close()
+
+
+def test_desalojo_lru(tmp_path, monkeypatch):
+    t = [1000.0]
+    monkeypatch.setattr(html_cache_mod.time, "time", lambda: t[0])
+    root = str(tmp_path / "html")
+    paginas = [os.urandom(2048).hex() for _ in range(3)]
+    n = len(gzip.compress(paginas[0].encode(), compresslevel=6))
+    cache = HtmlCache(root, max_mb=2.5 * n / 2**20)  # entran dos objetos
+    for i, html in enumerate(paginas[:2]):
+        cache.put(f"https://x/{i}", html)
+        t[0] += 1
+    cache.put("https://x/0", paginas[0])  # vuelve a usarse: el menos usado es el 1
+    t[0] += 1
+    cache.put("https://x/2", paginas[2])
+    assert sorted(u for u, _ in cache.ultimas()) == ["https://x/0", "https://x/2"]
+    assert len(_objetos(root)) == 2
+    assert cache._total <= cache.max_bytes
+    cache.close()
+    # El total se reconstruye desde el índice al reabrir
+    assert HtmlCache(root)._total == sum(
+        os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(os.path.join(root, "objetos")) for f in fs)
+
+
+def test_replay_reparsea_las_fichas_cacheadas(tmp_path):
+    root = str(tmp_path / "html")
+    cache = HtmlCache(root)
+    esperado = []
+    for pid in IDS:
+        link = f"https://x/departamento-alquiler--{pid}"
+        html = _leer(f"detalle_{pid}.html")
+        cache.put(link, html, link, tipo="detalle")
+        esperado.append(parse_detalle(html, link))
+    cache.put("https://x/lista", _leer("listado_palermo.html"), tipo="listado")
+    cache.close()
+
+    filas = list(iter_scraper_caba(engine="replay", cache_dir=root))
+    key = lambda r: r["Link"]
+    assert sorted(filas, key=key) == sorted(esperado, key=key)
@@ -0,0 +1,100 @@
+# El motor HTTP contra un servidor local (aiohttp.web) que sirve HTML guardado:
+# tiene que devolver los mismos dicts que el parseo de la ruta Selenium.
+import os, re, asyncio, threading
+import pytest
+from aiohttp import web
+
+from config import url_detalle
+from parsers import BsParser, parse_detalle
+from http_engine import scrape_ids_http, iter_detalles_http, nuevo_throttle, NO_EXISTE
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+IDS = ["17001001", "17001002", "17001003"]
+
+
+def _archivo(ruta):
+    if m := re.fullmatch(r"departamento-alquiler-barrio-([a-z-]+?)(?:-pagina-(\d+))?", ruta):
+        barrio, pagina = m.groups()
+        return f"listado_{barrio}" + (f"_pagina_{pagina}" if pagina else "") + ".html"
+    if m := re.fullmatch(r"departamento-alquiler--(\d+)", ruta):
+        return f"detalle_{m.group(1)}.html"
+    return None
+
+
+def _leer(nombre):
+    with open(os.path.join(FIXTURES, nombre), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def stub():
+    """URL base de un servidor local con las páginas de fixtures/html (404 si no hay archivo)."""
+    pedidos, listo, parar, base = [], threading.Event(), threading.Event(), []
+
+    async def handler(request):
+        ruta = request.match_info["ruta"]
+        pedidos.append(ruta)
+        nombre = _archivo(ruta)
+        if not nombre or not os.path.exists(os.path.join(FIXTURES, nombre)):
+            raise web.HTTPNotFound()
+        return web.Response(text=_leer(nombre), content_type="text/html")
+
+    async def servir():
+        app = web.Application()
+        app.router.add_get("/{ruta}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        base.append(f"http://127.0.0.1:{runner.addresses[0][1]}")
+        listo.set()
+        while not parar.is_set():
+            await asyncio.sleep(0.02)
+        await runner.cleanup()
+
+    th = threading.Thread(target=asyncio.run, args=(servir(),), daemon=True)
+    th.start()
+    assert listo.wait(10), "no levantó el servidor local"
+    yield base[0], pedidos
+    parar.set()
+    th.join(10)
+
+
+def _detalles(ids, base):
+    return dict(iter_detalles_http(ids, base_url=base, ctrl=nuevo_throttle(2, 4)))
+
+
+def test_ids_recorren_todas_las_paginas(stub):
+    base, pedidos = stub
+    ids, fallidos = scrape_ids_http(["palermo"], base_url=base, ctrl=nuevo_throttle(2, 4))
+    assert sorted(ids) == IDS
+    assert fallidos == []
+    assert "departamento-alquiler-barrio-palermo-pagina-2" in pedidos
+
+
+def test_detalles_igual_que_selenium(stub):
+    base, _ = stub
+    rows = list(_detalles(IDS, base).values())
+    assert all(rows)
+    # La ruta Selenium parsea el page_source de la misma URL con el parser original (bs4)
+    esperado = {url_detalle(pid, base): BsParser().detalle(_leer(f"detalle_{pid}.html"), url_detalle(pid, base))
+                for pid in IDS}
+    assert {r["Link"]: r for r in rows} == esperado
+    # y con el backend configurado (lxml por defecto) da lo mismo
+    assert all(parse_detalle(_leer(f"detalle_{pid}.html"), url_detalle(pid, base)) == esperado[url_detalle(pid, base)]
+               for pid in IDS)
+
+
+def test_detalle_inexistente_es_baja_definitiva(stub):
+    base, pedidos = stub
+    res = _detalles(["17001001", "17009999"], base)
+    assert res["17001001"]["Link"] == url_detalle("17001001", base)
+    # 404: no es un error de parseo (no va al fallback) ni se reintenta
+    assert res["17009999"] is NO_EXISTE
+    assert pedidos.count("departamento-alquiler--17009999") == 1
+
+
+def test_barrio_inexistente_no_queda_como_fallido(stub):
+    base, _ = stub
+    ids, fallidos = scrape_ids_http(["palermo", "inexistente"], base_url=base, ctrl=nuevo_throttle(2, 4))
+    assert sorted(ids) == IDS
+    assert fallidos == []
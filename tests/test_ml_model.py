@@ -0,0 +1,53 @@
+# Modelo de precio: sin variables calculadas con el objetivo y una predicción por
+# cada aviso de entrada, tenga precio o no.
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+import ml_model
+from ml_model import NUMERICAS, CATEGORICAS, OBJETIVO, entrenar, predict_batch
+from cleaning import clean_data
+from features import add_features
+from test_cleaning import CRUDO
+
+
+def _entrenado(motor="hgb"):
+    rng = np.random.default_rng(0)
+    n = 400
+    m2 = rng.uniform(25, 120, n)
+    crudo = pd.DataFrame({
+        "Link": [f"https://x/--{i}" for i in range(n)],
+        "precio": [f"$ {int(v):,}".replace(",", ".") for v in m2 * 15_000 + rng.normal(0, 50_000, n)],
+        "expensas": [f"$ {int(v):,}".replace(",", ".") for v in m2 * 1_500],
+        "Barrio": rng.choice(["Palermo", "Caballito", "Flores"], n),
+        "Sup. cubierta": [f"{int(v)} m²" for v in m2],
+        "Ambientes": [f"{int(v // 30) + 1} ambientes" for v in m2],
+        "Dormitorios": [f"{int(v // 30)} dormitorios" for v in m2],
+        "Baños": [f"{int(v // 60) + 1} baños" for v in m2],
+        "Cocheras": [f"{v} cochera" for v in rng.integers(0, 2, n)],
+        "Toilettes": [f"{v} toilette" for v in rng.integers(0, 2, n)],
+        "Antiguedad": [f"{int(v)} años" for v in rng.integers(0, 60, n)],
+    })
+    df = add_features(clean_data(crudo, engine="pandas"))
+    model, esquema, metricas, _ = entrenar(df, motor, presupuesto=30)
+    return {"modelo": model, "esquema": esquema, "version": "test", "metricas": metricas}
+
+
+def test_sin_variables_derivadas_del_objetivo():
+    assert not {"precio_m2", "expensas_ratio", "log_total", OBJETIVO} & set(NUMERICAS + CATEGORICAS)
+    esquema = _entrenado()["esquema"]
+    assert not {"precio_m2", "expensas_ratio"} & set(esquema["numericas"])
+
+
+@pytest.mark.parametrize("motor", list(ml_model.MOTORES))
+def test_una_prediccion_por_fila_de_entrada(motor):
+    artefacto = _entrenado(motor)
+    crudo = pd.DataFrame(CRUDO, index=range(100, 100 + len(CRUDO)))
+    out = predict_batch(crudo, artefacto, chunk=3, workers=2)
+    assert list(out.index) == list(crudo.index)
+    assert list(out["Link"]) == list(crudo["Link"])
+    assert out["Total_predicho"].notna().all()
+    # Sin precio ni expensas: también se tasa (y sin leer su propio Total)
+    sin_precio = out.set_index("Link").loc["https://x/--4"]
+    assert sin_precio["Total"] == 0 and sin_precio["Total_predicho"] > 0
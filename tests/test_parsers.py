@@ -0,0 +1,56 @@
+# Paridad de backends de parseo: lxml tiene que devolver exactamente lo mismo que
+# bs4 (el parseo original) sobre las fixtures, casos borde y, si existe, el caché
+# de HTML real (mismo chequeo que bench_parsers.py, pero como test).
+import os
+import pytest
+
+from config import HTML_CACHE_DIR
+from parsers import get_parser
+from bench_parsers import _cargar_paginas, _parsear
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BORDES = [
+    ("detalle", "sin-main", "<html><body><p>Aviso dado de baja</p></body></html>"),
+    ("detalle", "vacio", ""),
+    ("detalle", "sin-mapa-ni-features",
+     '<div class="property-main"><h2 class="titlebar__title">Depto en Boedo</h2></div>'),
+    ("detalle", "comentarios",
+     '<div class="property-main x"><ul class="property-main-features"><!-- nada -->'
+     '<li title="Baños"><p class="strong"> 2 baños </p></li><li title="Vacío"></li></ul>'
+     '<p class="titlebar__price other">USD 700</p></div>'
+     '<span data-latitude="-34.6" data-longitude="-58.4"></span>'
+     '<span data-latitude="-1" data-longitude="-1"></span>'),
+    ("listado", "sin-holder", "<html><body>Error</body></html>"),
+    ("listado", "paginacion-rara",
+     '<div id="ga-dimension-list" data-ids-avisos-mostrados=""></div>'
+     '<ul class="pagination pagination--links"><li>1</li><li>siguiente</li></ul>'),
+]
+
+
+def _paridad(paginas):
+    esperado = _parsear(get_parser("bs4"), paginas)
+    obtenido = _parsear(get_parser("lxml"), paginas)
+    return [p[1] for p, a, b in zip(paginas, obtenido, esperado) if a != b]
+
+
+def test_paridad_fixtures():
+    paginas = _cargar_paginas(directorio=FIXTURES)
+    assert {t for t, _, _ in paginas} == {"listado", "detalle"}
+    assert _paridad(paginas) == []
+
+
+def test_paridad_casos_borde():
+    assert _paridad(BORDES) == []
+    sin_mapa = get_parser("lxml").detalle(BORDES[2][2], "x")
+    assert (sin_mapa["lat"], sin_mapa["lon"]) == (None, None)
+    assert get_parser("lxml").detalle(BORDES[3][2], "x")["lat"] == "-34.6"  # el primero
+
+
+def test_paridad_cache_real():
+    cache = os.path.join(RAIZ, HTML_CACHE_DIR)
+    if not os.path.exists(os.path.join(cache, "index.sqlite")):
+        pytest.skip("no hay caché de HTML real (output/cache/html)")
+    paginas = _cargar_paginas(cache_dir=cache, limite=500)
+    assert _paridad(paginas) == []
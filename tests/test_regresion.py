@@ -0,0 +1,68 @@
+# Regresiones en forma cerrada: pendientes, ordenadas, r² e intervalos de confianza contra
+# scipy.stats.linregress / numpy.polyfit, y estadísticos unidos por partes contra el total.
+import numpy as np
+import pandas as pd
+import pytest
+
+stats = pytest.importorskip("scipy.stats")
+from regresion import suficientes, unir, ajustar, elasticidades, TOTAL
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(7)
+    n = 400
+    barrio = rng.choice(["Palermo", "Caballito", "Belgrano"], n)
+    m2 = rng.uniform(25, 150, n)
+    pendiente = pd.Series({"Palermo": 9000.0, "Caballito": 6500.0, "Belgrano": 8000.0})[barrio].to_numpy()
+    total = 150_000 + pendiente * m2 + rng.normal(0, 60_000, n)
+    return pd.DataFrame({"Barrio_simplificado": barrio, "m2": m2, "Total": total})
+
+
+def _ic(x, y, nivel):
+    r = stats.linregress(x, y)
+    tc = stats.t.ppf((1 + nivel) / 2, len(x) - 2)
+    return r, (r.slope - tc * r.stderr, r.slope + tc * r.stderr)
+
+
+def test_ajuste_por_grupo_igual_a_linregress(df):
+    res = ajustar(suficientes(df, "m2", "Total", por="Barrio_simplificado"), nivel=0.9)
+    for barrio, g in df.groupby("Barrio_simplificado"):
+        r, (bajo, alto) = _ic(g["m2"], g["Total"], 0.9)
+        fila = res.loc[barrio]
+        assert fila["n"] == len(g)
+        assert fila["pendiente"] == pytest.approx(r.slope, rel=1e-9)
+        assert fila["ordenada"] == pytest.approx(r.intercept, rel=1e-9)
+        assert fila["r2"] == pytest.approx(r.rvalue ** 2, rel=1e-9)
+        assert fila["ee"] == pytest.approx(r.stderr, rel=1e-9)
+        assert (fila["ic_bajo"], fila["ic_alto"]) == pytest.approx((bajo, alto), rel=1e-9)
+        assert np.polyfit(g["m2"], g["Total"], 1) == pytest.approx([fila["pendiente"], fila["ordenada"]], rel=1e-9)
+
+
+def test_sin_grupos_y_valores_grandes(df):
+    # Centrado por grupo: sin pérdida de precisión aunque x esté lejos del origen
+    d = df.assign(m2=df["m2"] + 1e6)
+    fila = ajustar(suficientes(d, "m2", "Total")).loc[TOTAL]
+    r = stats.linregress(d["m2"], d["Total"])
+    assert fila["pendiente"] == pytest.approx(r.slope, rel=1e-7)
+    assert fila["ordenada"] == pytest.approx(r.intercept, rel=1e-7)
+
+
+def test_unir_partes_igual_al_total(df):
+    partes = [df.iloc[:120], df.iloc[120:300], df.iloc[300:]]
+    unido = unir(*[suficientes(p, "m2", "Total", por="Barrio_simplificado") for p in partes])
+    total = suficientes(df, "m2", "Total", por="Barrio_simplificado")
+    pd.testing.assert_frame_equal(unido, total, check_dtype=False, check_names=False, rtol=1e-9)
+
+
+def test_grupos_chicos_o_sin_variacion_quedan_nan():
+    d = pd.DataFrame({"g": ["a", "a", "b", "b", "b"], "x": [1.0, 2.0, 3.0, 3.0, 3.0], "y": [1.0, 2.0, 1.0, 2.0, 3.0]})
+    res = ajustar(suficientes(d, "x", "y", por="g"))
+    assert res[["pendiente", "r2", "ic_bajo", "ic_alto"]].isna().all().all()
+
+
+def test_elasticidad_igual_a_polyfit_de_logs(df):
+    res = elasticidades(df, min_n=3)
+    for barrio, g in df[df["Total"] > 0].groupby("Barrio_simplificado"):
+        b, _ = np.polyfit(np.log(g["m2"]), np.log(g["Total"]), 1)
+        assert res.loc[barrio, "pendiente"] == pytest.approx(b, rel=1e-9)
@@ -0,0 +1,53 @@
+# Escritura de figuras: plotly.min.js una vez por árbol de salida y rectas de
+# tendencia del mismo tipo de traza (SVG o WebGL) que los puntos.
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("plotly")
+import render
+from render import Figuras, scatter, PLOTLYJS
+
+
+def _df(n):
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 100, n)
+    return pd.DataFrame({"x": x, "y": 2 * x + rng.normal(0, 5, n), "g": rng.choice(["a", "b"], n)})
+
+
+@pytest.mark.parametrize("n, tipo", [(200, "scatter"), (render.PLOTS_WEBGL_DESDE + 1, "scattergl")])
+def test_tendencias_del_mismo_tipo_que_los_puntos(n, tipo):
+    fig = scatter(_df(n), x="x", y="y", color="g", trendline=True)
+    assert len(fig.data) == 4  # dos grupos + dos rectas
+    assert {t.type for t in fig.data} == {tipo}
+
+
+def test_compartido_escribe_plotlyjs_salvo_bajo_el_runner(tmp_path, monkeypatch):
+    fig = scatter(_df(50), x="x", y="y")
+    figs = Figuras(str(tmp_path / "suelto"), "t", modo="compartido")
+    figs.agregar(fig, "a.html")
+    figs.escribir()
+    assert os.path.exists(tmp_path / "suelto" / PLOTLYJS)
+
+    monkeypatch.setattr(render, "COPIAR_PLOTLYJS", False)
+    figs = Figuras(str(tmp_path / "etapa"), "t", modo="compartido")
+    figs.agregar(fig, "a.html")
+    figs.agregar(fig, "b.html")
+    paths = figs.escribir()
+    assert sorted(os.listdir(tmp_path / "etapa")) == ["a.html", "b.html"]
+    assert all(f'src="{PLOTLYJS}"' in open(p, encoding="utf-8").read() for p in paths)
+
+
+def test_publicar_deja_un_solo_plotlyjs(tmp_path):
+    import stages
+    r = stages.StageRunner(out_dir=str(tmp_path / "plots"), cache_dir=str(tmp_path / "cache"))
+    for nombre in ("plots", "model"):
+        r.claves[nombre] = f"clave_{nombre}"
+        origen = r._ruta(nombre)
+        os.makedirs(origen)
+        with open(os.path.join(origen, f"{nombre}.html"), "w") as f:
+            f.write("<html></html>")
+        r._publicar(stages.ETAPAS[nombre])
+    assert sorted(os.listdir(tmp_path / "plots")) == ["model.html", PLOTLYJS, "plots.html"]
+    assert not any(PLOTLYJS in fs for _, _, fs in os.walk(tmp_path / "cache"))
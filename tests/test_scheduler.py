@@ -0,0 +1,93 @@
+# Scheduler de descubrimiento sin red: un "sitio" en memoria de barrio -> páginas de IDs.
+import asyncio
+import pytest
+
+from scheduler import CrawlScheduler, ejecutar_threads, ejecutar_async
+
+
+def _sitio(**barrios):
+    """barrio -> lista de páginas; cada página es una lista de IDs (None = no carga)."""
+    def fetch(b, p):
+        paginas = barrios[b]
+        if paginas is None or paginas[p - 1] is None: raise RuntimeError("no cargó")
+        return list(paginas[p - 1]), (len(paginas) if p == 1 else None)
+    return fetch
+
+
+def _ids(prefijo, n, por_pagina=3):
+    ids = [f"{prefijo}{i}" for i in range(n)]
+    return [ids[i:i + por_pagina] for i in range(0, n, por_pagina)]
+
+
+def _correr(sched, fetch, n=2):
+    """Ejecutor secuencial: despacha de a `n` y registra en orden (determinístico)."""
+    while not sched.terminado():
+        tareas = sched.siguientes(n)
+        if not tareas: break
+        for b, p in tareas:
+            try: ids, total = fetch(b, p)
+            except RuntimeError: ids, total = None, None
+            sched.registrar(b, p, ids, total)
+    return sched.resultado()
+
+
+def test_reparte_parejo_entre_barrios():
+    fetch = _sitio(a=_ids("a", 12), b=_ids("b", 12))
+    ids = _correr(CrawlScheduler(["a", "b"], cupo_barrio=4, tope_total=100), fetch)
+    assert ids == ["a0", "b0", "a1", "b1", "a2", "b2", "a3", "b3"]
+
+
+def test_cupo_no_usado_se_reasigna():
+    fetch = _sitio(chico=_ids("c", 2), a=_ids("a", 20), b=_ids("b", 20))
+    sched = CrawlScheduler(["chico", "a", "b"], cupo_barrio=5, tope_total=100)
+    ids = _correr(sched, fetch)
+    # "chico" usa 2 de 5: los 3 que sobran van a los barrios que todavía tienen páginas
+    assert sorted(len([i for i in ids if i[0] == x]) for x in "cab") == [2, 6, 7]
+    assert len(ids) == 15
+
+
+def test_pagina_1_fallida_marca_el_barrio_y_libera_su_cupo():
+    fetch = _sitio(roto=None, a=_ids("a", 20))
+    sched = CrawlScheduler(["roto", "a"], cupo_barrio=4, tope_total=100)
+    ids = _correr(sched, fetch)
+    assert sched.fallidos == ["roto"]
+    assert ids == [f"a{i}" for i in range(8)]
+
+
+def test_pagina_intermedia_fallida_no_corta_el_barrio():
+    paginas = _ids("a", 9)
+    paginas[1] = None
+    sched = CrawlScheduler(["a"], cupo_barrio=10, tope_total=100)
+    ids = _correr(sched, _sitio(a=paginas))
+    assert sched.fallidos == []
+    assert ids == ["a0", "a1", "a2", "a6", "a7", "a8"]
+
+
+def test_ids_repetidos_entre_barrios_cuentan_una_vez():
+    fetch = _sitio(a=[["x", "y", "a1"]], b=[["x", "b1", "b2"]])
+    ids = _correr(CrawlScheduler(["a", "b"], cupo_barrio=10, tope_total=100), fetch)
+    assert sorted(ids) == ["a1", "b1", "b2", "x", "y"]
+
+
+def test_corta_en_el_tope_total():
+    fetch = _sitio(a=_ids("a", 30), b=_ids("b", 30))
+    sched = CrawlScheduler(["a", "b"], cupo_barrio=20, tope_total=7)
+    ids = _correr(sched, fetch)
+    assert len(ids) == 7
+    assert sum(sched.pedidas.values()) < 20  # no recorre todas las páginas
+
+
+@pytest.mark.parametrize("modo", ["threads", "async"])
+def test_ejecutores_reales(modo):
+    fetch = _sitio(roto=None, chico=_ids("c", 2), a=_ids("a", 20), b=_ids("b", 20))
+    sched = CrawlScheduler(["roto", "chico", "a", "b"], cupo_barrio=5, tope_total=100)
+    if modo == "threads":
+        ids = ejecutar_threads(sched, fetch, 3)
+    else:
+        async def afetch(b, p):
+            await asyncio.sleep(0)
+            return fetch(b, p)
+        ids = asyncio.run(ejecutar_async(sched, afetch, 3))
+    assert sched.fallidos == ["roto"]
+    assert len(ids) == len(set(ids)) == 20
+    assert sum(i.startswith("c") for i in ids) == 2
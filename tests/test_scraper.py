@@ -0,0 +1,37 @@
+# Ruta Selenium del listado sin Chrome: _cargar se reemplaza por el HTML de fixtures.
+import os
+from contextlib import contextmanager
+
+import scraper
+from scheduler import CrawlScheduler
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+
+class PoolFalso:
+    medidor = None
+
+    @contextmanager
+    def driver(self):
+        class D: current_url = "https://x"
+        yield D()
+
+
+def _servir(monkeypatch, paginas):
+    def cargar(driver, url, selector, medidor=None):
+        if url not in paginas: return "<html><body>Error del servidor</body></html>"
+        with open(os.path.join(FIXTURES, paginas[url]), encoding="utf-8") as f:
+            return f.read()
+    monkeypatch.setattr(scraper, "_cargar", cargar)
+    monkeypatch.setattr(scraper, "N_DRIVERS", 2)
+
+
+def test_pagina_1_sin_listado_marca_el_barrio_fallido(monkeypatch):
+    _servir(monkeypatch, {scraper.url_pagina("palermo", 1): "listado_palermo.html",
+                          scraper.url_pagina("palermo", 2): "listado_palermo_pagina_2.html"})
+    assert scraper._pagina_selenium("recoleta", 1, PoolFalso()) == (None, None)
+
+    sched = CrawlScheduler(["palermo", "recoleta"], tope_total=100)
+    ids = scraper.ejecutar_threads(sched, lambda b, p: scraper._pagina_selenium(b, p, PoolFalso()), 2)
+    assert sorted(ids) == ["17001001", "17001002", "17001003"]
+    assert sched.fallidos == ["recoleta"]
@@ -0,0 +1,67 @@
+# Clave de caché de las etapas: tiene que cambiar con el código que alcanzan por sus imports,
+# con los valores de config.py que leen y con los datos que no son código.
+import pytest
+
+import config
+import gazetteer
+import stages
+
+
+@pytest.mark.parametrize("etapa", ["plots", "insights"])
+def test_reportes_dependen_de_regresion_y_gazetteer(etapa):
+    archivos, nombres = stages.dependencias(stages.ETAPAS[etapa])
+    assert {"regresion.py", "gazetteer.py", "cubo.py", "render.py"} <= set(archivos)
+    assert {"REGRESION_NIVEL", "REGRESION_MIN_N", "GAZETTEER_GRILLA", "BARRIOS_GEOJSON",
+            "CUBO_ERROR_RELATIVO", "PLOTS_MAX_PUNTOS"} <= set(nombres)
+
+
+def test_insights_sigue_los_imports_del_modelo():
+    archivos, nombres = stages.dependencias(stages.ETAPAS["insights"])
+    assert {"ml_model.py", "explicaciones.py"} <= set(archivos)
+    assert {"SHAP_FONDO", "MODELO_MOTOR"} <= set(nombres)
+
+
+@pytest.mark.parametrize("etapa, nombre, valor", [
+    ("plots", "REGRESION_NIVEL", 0.9),
+    ("insights", "REGRESION_MIN_N", 3),
+    ("dedup", "DEDUP_VENTANA", 9),
+    ("model", "MODELO_MOTOR", "hgb"),
+])
+def test_config_cambia_la_clave(monkeypatch, etapa, nombre, valor):
+    e = stages.ETAPAS[etapa]
+    antes = stages._hash_codigo(e)
+    monkeypatch.setattr(config, nombre, valor)
+    assert stages._hash_codigo(e) != antes
+
+
+def test_config_ajena_no_cambia_la_clave(monkeypatch):
+    e = stages.ETAPAS["cubo"]
+    antes = stages._hash_codigo(e)
+    monkeypatch.setattr(config, "SHAP_FONDO", 7)
+    assert stages._hash_codigo(e) == antes
+
+
+def test_geojson_cambia_la_clave(monkeypatch, tmp_path):
+    otro = tmp_path / "barrios.geojson"
+    otro.write_bytes(open(gazetteer.GEOJSON_INCLUIDO, "rb").read() + b" ")
+    claves = {n: stages._hash_codigo(stages.ETAPAS[n]) for n in ("features", "plots", "insights")}
+    monkeypatch.setattr(gazetteer, "BARRIOS_GEOJSON", str(otro))
+    assert all(stages._hash_codigo(stages.ETAPAS[n]) != c for n, c in claves.items())
+
+
+def test_pedir_insights_no_agrega_model():
+    r = stages.StageRunner(cache_dir="/nonexistent")
+    r.claves["scrape"] = "x"
+    assert "model" not in r._necesarias(["insights"])
+
+
+def test_detector_de_outliers_nuevo_cambia_la_clave(monkeypatch, tmp_path):
+    monkeypatch.setattr(stages, "MODELO_DIR", str(tmp_path))
+    r = stages.StageRunner(cache_dir=str(tmp_path / "etapas"))
+    r.claves["dedup"] = "x"
+    anterior = r._clave(stages.ETAPAS["outliers"])
+    for version in ("v1", "v2"):
+        (tmp_path / "outliers_actual.json").write_text(f'{{"version": "{version}"}}')
+        clave = r._clave(stages.ETAPAS["outliers"])
+        assert clave != anterior
+        anterior = clave
@@ -0,0 +1,76 @@
+# Store SQLite: retomar una corrida cortada y TTL de fichas y de descubrimiento.
+import time
+import pytest
+
+import store as store_mod
+from store import ListingStore
+
+
+class Reloj:
+    """time.time() controlable para mover el store en el tiempo."""
+    def __init__(self, t=1_700_000_000.0): self.t = t
+    def __call__(self): return self.t
+    def avanzar(self, horas): self.t += horas * 3600
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(store_mod.time, "time", r)
+    return r
+
+
+def _fila(pid):
+    return {"Link": f"https://x/--{pid}", "precio": "$ 100"}
+
+
+def test_retoma_sin_rebuscar_los_ok(tmp_path, reloj):
+    path = str(tmp_path / "props.sqlite")
+    with ListingStore(path, batch=2) as s:
+        s.agregar_ids(["1", "2", "3", "4"])
+        s.registrar("1", _fila("1"))
+        s.registrar("2", None)  # falló
+        s.registrar("3", _fila("3"))
+        # corte antes de llegar al 4 (close() vacía el buffer pendiente)
+
+    with ListingStore(path) as s:
+        assert s.pendientes(["1", "2", "3", "4"], ttl_horas=24) == ["2", "4"]
+        assert s.filas(["3", "2", "1"]) == [_fila("3"), _fila("1")]
+
+
+def test_flush_por_batch(tmp_path, reloj):
+    path = str(tmp_path / "props.sqlite")
+    s = ListingStore(path, batch=2)
+    s.agregar_ids(["1", "2", "3"])
+    s.registrar("1", _fila("1"))
+    s.registrar("2", _fila("2"))  # completa el batch → commit
+    s.registrar("3", _fila("3"))  # queda en el buffer
+    with ListingStore(path) as otro:
+        assert otro.filas(["1", "2", "3"]) == [_fila("1"), _fila("2")]
+    s.close()
+
+
+def test_ttl_de_fichas(tmp_path, reloj):
+    with ListingStore(str(tmp_path / "props.sqlite")) as s:
+        s.agregar_ids(["1", "2"])
+        s.registrar("1", _fila("1"))
+        s.flush()
+        reloj.avanzar(5)
+        s.registrar("2", _fila("2"))
+        s.flush()
+        reloj.avanzar(20)  # "1" tiene 25h, "2" tiene 20h
+        assert s.pendientes(["1", "2", "5"], ttl_horas=24) == ["1", "5"]
+        # La fila vencida se sigue pudiendo leer hasta que se refresca
+        assert s.filas(["1"]) == [_fila("1")]
+
+
+def test_ttl_de_descubrimiento(tmp_path, reloj):
+    with ListingStore(str(tmp_path / "props.sqlite")) as s:
+        assert s.ids_descubiertos(6) is None
+        s.agregar_ids(["3", "1"])
+        reloj.avanzar(1)
+        s.agregar_ids(["1", "2"])  # "3" no apareció en el último descubrimiento
+        assert s.ids_descubiertos(6) == ["1", "2"]
+        assert s.ids_descubiertos(0) is None  # TTL 0: siempre se recorren los listados
+        reloj.avanzar(7)
+        assert s.ids_descubiertos(6) is None
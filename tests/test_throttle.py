@@ -0,0 +1,104 @@
+# Control AIMD: sube de a poco con respuestas sanas, recorta a la mitad ante
+# saturación (una vez por ráfaga) y nunca deja pasar más requests que el límite.
+import time, asyncio, threading
+import pytest
+
+import throttle
+from throttle import AimdController, es_captcha
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    t = [100.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: t[0])
+    return t
+
+
+def _responder(ctrl, estado, latencia=0.1):
+    ctrl.acquire()
+    ctrl.release(latencia, estado)
+
+
+def test_aumento_aditivo_hasta_el_maximo(reloj):
+    ctrl = AimdController(2, maximo=4)
+    for _ in range(2): _responder(ctrl, "ok")   # una ronda de `limite` respuestas ≈ +1
+    assert ctrl.limite == pytest.approx(2 + 1/2 + 1/2.5)
+    for _ in range(50): _responder(ctrl, "ok")
+    assert ctrl.limite == 4
+
+
+def test_recorte_multiplicativo_una_vez_por_rafaga(reloj):
+    ctrl = AimdController(8, maximo=8)
+    for _ in range(5): _responder(ctrl, "saturado")  # misma ráfaga: un solo recorte
+    assert (ctrl.limite, ctrl.recortes, ctrl.saturados) == (4, 1, 5)
+    reloj[0] += 1
+    _responder(ctrl, "error")
+    assert (ctrl.limite, ctrl.recortes, ctrl.errores) == (2, 2, 1)
+    for _ in range(5):
+        reloj[0] += 1
+        _responder(ctrl, "saturado")
+    assert ctrl.limite == ctrl.minimo == 1
+
+
+def test_excepcion_en_el_slot_cuenta_como_error(reloj):
+    ctrl = AimdController(2)
+    with pytest.raises(ValueError):
+        with ctrl.slot():
+            raise ValueError
+    with ctrl.slot() as r:
+        r.estado = "saturado"
+    assert (ctrl.errores, ctrl.saturados, ctrl.stats()["en_vuelo"]) == (1, 1, 0)
+
+
+def _pico(usar):
+    """Corre `usar(entrar, salir)` y devuelve la máxima concurrencia observada."""
+    actual, pico, lock = [0], [0], threading.Lock()
+
+    def entrar():
+        with lock:
+            actual[0] += 1
+            pico[0] = max(pico[0], actual[0])
+
+    def salir():
+        with lock: actual[0] -= 1
+
+    usar(entrar, salir)
+    return pico[0]
+
+
+def test_threads_respetan_el_limite():
+    ctrl = AimdController(3, maximo=3)
+
+    def usar(entrar, salir):
+        def trabajo():
+            with ctrl.slot():
+                entrar(); time.sleep(0.01); salir()
+        ths = [threading.Thread(target=trabajo) for _ in range(20)]
+        for t in ths: t.start()
+        for t in ths: t.join()
+
+    assert _pico(usar) == 3
+    assert ctrl.ok == 20
+
+
+def test_corutinas_respetan_el_limite_y_se_despiertan():
+    ctrl = AimdController(2, maximo=2)
+
+    def usar(entrar, salir):
+        async def trabajo():
+            async with ctrl.slot_async():
+                entrar(); await asyncio.sleep(0.01); salir()
+
+        async def todos():
+            await asyncio.wait_for(asyncio.gather(*(trabajo() for _ in range(15))), 5)
+        asyncio.run(todos())
+
+    assert _pico(usar) == 2
+    assert ctrl.ok == 15
+
+
+def test_es_captcha():
+    assert es_captcha("<html><title>Are you a robot?</title></html>")
+    assert es_captcha('<form id="challenge-form">')
+    assert not es_captcha('<div class="property-main">Depto</div>')
+    assert not es_captcha(None)